@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Per-message ingest cost of MessageAnalyzer as history grows.
+
+Feeds synthetic messages through `_add_message_internal` (without the
+database write) and reports the mean cost per message for each decade
+from 1k to --max messages, plus the cost of the dashboard reads at that
+size. Flat numbers across decades mean ingest and reads are O(1)/O(k).
+
+    python bench/analyzer_ingest.py --max 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+WORDS = ["hello", "world", "tls", "cert", "ping", "server", "client", "secure",
+         "message", "key", "rsa", "handshake", "session", "ticket", "cipher"]
+
+
+def make_messages(count, seed=42):
+    rng = random.Random(seed)
+    clients = [f"192.168.1.{i}:{50000 + i}" for i in range(50)] + [f"8.8.4.{i}:443" for i in range(10)]
+    start = datetime(2026, 1, 1)
+    for i in range(count):
+        text = " ".join(rng.choices(WORDS, k=rng.randint(1, 12)))
+        yield rng.choice(clients), text, start + timedelta(seconds=i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="analyzer_bench_")
+    os.chdir(workdir)  # AnalysisDB creates its database in the working directory
+    from message_analyzer import MessageAnalyzer
+    analyzer = MessageAnalyzer()
+
+    checkpoints = []
+    n = 1000
+    while n <= args.max:
+        checkpoints.append(n)
+        n *= 10
+
+    results = []
+    ingested = 0
+    messages = make_messages(args.max)
+    for checkpoint in checkpoints:
+        batch = [next(messages) for _ in range(checkpoint - ingested)]
+        start = time.perf_counter()
+        for client_address, text, timestamp in batch:
+            analyzer._add_message_internal(client_address, text, timestamp, save_to_db=False)
+        elapsed = time.perf_counter() - start
+        ingested = checkpoint
+
+        start = time.perf_counter()
+        analyzer.get_analysis()
+        analyzer.get_security_statistics()
+        read_ms = (time.perf_counter() - start) * 1000
+
+        results.append({
+            "messages": checkpoint,
+            "ingest_us_per_message": round(elapsed / len(batch) * 1e6, 2),
+            "dashboard_read_ms": round(read_ms, 3),
+        })
+
+    print(json.dumps({"benchmark": "analyzer_ingest", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
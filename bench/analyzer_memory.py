@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Process RSS of MessageAnalyzer after ingesting N messages.
+
+Runs each history configuration in a fresh subprocess so RSS numbers do
+not bleed into each other:
+
+  baseline  - every message kept in memory as the 7-key dict the analyzer
+              stored before the ring buffer (old behaviour)
+  unbounded - history_size=None, every message kept, new slotted record type
+  bounded   - the default ring buffer (HISTORY_SIZE messages)
+
+    python bench/analyzer_memory.py --messages 1000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "server"))
+
+
+def rss_mb():
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":")
+                values[key] = int(value.split()[0]) / 1024
+    return values
+
+
+def run_child(mode, count):
+    from analyzer_ingest import make_messages
+    os.chdir(tempfile.mkdtemp(prefix="analyzer_mem_"))
+    from message_analyzer import MessageAnalyzer, HISTORY_SIZE
+    before = rss_mb()["VmRSS"]
+    analyzer = MessageAnalyzer(history_size={"baseline": 0, "unbounded": None}.get(mode, HISTORY_SIZE))
+    history = []
+    for client_address, text, timestamp in make_messages(count):
+        analyzer._add_message_internal(client_address, text, timestamp, save_to_db=False)
+        if mode == "baseline":
+            # The record the analyzer appended per message before the ring buffer, with
+            # ip and port split out of the address each time
+            ip, port = client_address.split(':')
+            history.append({'client': client_address, 'ip': ip, 'port': port,
+                            'is_private': analyzer._parse_address(client_address)[2],
+                            'message': text, 'timestamp': timestamp, 'length': len(text)})
+    after = rss_mb()
+    return {
+        "mode": mode,
+        "messages": count,
+        "in_memory_messages": len(history) if mode == "baseline" else len(analyzer.messages),
+        "rss_mb": round(after["VmRSS"], 1),
+        "peak_rss_mb": round(after["VmHWM"], 1),
+        "growth_mb": round(after["VmRSS"] - before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--child", choices=["baseline", "unbounded", "bounded"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.messages)))
+        return
+
+    results = []
+    for mode in ("baseline", "unbounded", "bounded"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--messages", str(args.messages), "--child", mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    print(json.dumps({"benchmark": "analyzer_memory", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""MessageAnalyzer startup time with and without a state snapshot.
+
+For each history size, fills a fresh database with synthetic messages and
+connection events, then times:
+
+  cold - no snapshot, every row is replayed (previous behaviour)
+  warm - snapshot present, plus --tail rows written after it
+
+Warm startup should stay flat as the history grows.
+
+    python bench/analyzer_startup.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "server"))
+
+from analyzer_ingest import make_messages  # noqa: E402
+
+
+def fill(db, rows):
+    messages = list(rows)
+    for i in range(0, len(messages), 10000):
+        db.save_messages(messages[i:i + 10000])
+    db.save_connection_events([(addr, 'connect', ts) for addr, _, ts in messages[::20]])
+
+
+def timed_start():
+    from message_analyzer import MessageAnalyzer
+    start = time.perf_counter()
+    analyzer = MessageAnalyzer()
+    return analyzer, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--tail", type=int, default=1000)
+    args = parser.parse_args()
+
+    from analysis_db import AnalysisDB
+    results = []
+    for size in args.sizes:
+        os.chdir(tempfile.mkdtemp(prefix="analyzer_startup_"))
+        db = AnalysisDB()
+        fill(db, make_messages(size, seed=1))
+        db.close()
+
+        # First start replays everything and writes the snapshot
+        analyzer, cold = timed_start()
+        analyzer.close()
+
+        db = AnalysisDB()
+        fill(db, make_messages(args.tail, seed=2))
+        db.close()
+        analyzer, warm = timed_start()
+        total = analyzer.get_analysis()['total_messages']
+        analyzer.close()
+
+        results.append({
+            "history_messages": size,
+            "cold_start_seconds": round(cold, 3),
+            "warm_start_seconds": round(warm, 3),
+            "tail_messages": args.tail,
+            "total_after_warm_start": total,
+        })
+
+    print(json.dumps({"benchmark": "analyzer_startup", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
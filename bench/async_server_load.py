@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Load benchmark for the asyncio TLS server.
+
+Starts ``server/tls_server.py --mode async`` (or ``--mode thread``) in a
+subprocess, opens N idle TLS connections, then sends a steady stream of
+messages from random connections while every connection drains its
+broadcasts. Reports handshake time, server CPU and RSS as JSON.
+
+    ulimit -n 65536
+    python bench/async_server_load.py --connections 10000 --rate 5 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import ssl
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, ROOT)
+
+from common.framing import encode_frame, DATA  # noqa: E402
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def raise_fd_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = min(hard, max(soft, needed))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return target
+
+
+def proc_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+
+def proc_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+async def drain(reader, counters):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            counters["bytes_received"] += len(data)
+    except (ConnectionError, ssl.SSLError, OSError):
+        pass
+
+
+async def open_connections(args, context, counters, drainers):
+    semaphore = asyncio.Semaphore(args.handshake_concurrency)
+    conns = []
+    latencies = []
+
+    async def connect_one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.open_connection(
+                    args.host, args.port, ssl=context, server_hostname="localhost")
+            except (OSError, ssl.SSLError):
+                counters["failed"] += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            conns.append((reader, writer))
+            drainers.append(asyncio.ensure_future(drain(reader, counters)))
+
+    await asyncio.gather(*(connect_one() for _ in range(args.connections)))
+    return conns, latencies
+
+
+async def run_bench(args, server_pid):
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    counters = {"failed": 0, "bytes_received": 0}
+    drainers = []
+
+    await wait_for_port(args.host, args.port)
+    start = time.perf_counter()
+    conns, latencies = await open_connections(args, context, counters, drainers)
+    connect_time = time.perf_counter() - start
+
+    # Let the server settle, then measure CPU over the steady-state phase only.
+    await asyncio.sleep(1)
+    idle_cpu_start = proc_cpu_seconds(server_pid)
+    await asyncio.sleep(args.idle_seconds)
+    idle_cpu = proc_cpu_seconds(server_pid) - idle_cpu_start
+
+    sent = 0
+    cpu_start = proc_cpu_seconds(server_pid)
+    traffic_start = time.perf_counter()
+    interval = 1.0 / args.rate if args.rate > 0 else None
+    frame = encode_frame(DATA, b"x" * args.message_size)
+    while interval and time.perf_counter() - traffic_start < args.duration:
+        _, writer = random.choice(conns)
+        writer.write(frame)
+        sent += 1
+        await asyncio.sleep(interval)
+    traffic_time = time.perf_counter() - traffic_start
+    traffic_cpu = proc_cpu_seconds(server_pid) - cpu_start
+
+    latencies.sort()
+    result = {
+        "benchmark": "async_server_load",
+        "mode": args.mode,
+        "connections_requested": args.connections,
+        "connections_open": len(conns),
+        "connections_failed": counters["failed"],
+        "connect_seconds": round(connect_time, 3),
+        "handshake_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        "handshake_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        "idle_server_cpu_percent": round(idle_cpu / args.idle_seconds * 100, 2),
+        "messages_sent": sent,
+        "message_rate": round(sent / traffic_time, 2) if traffic_time else 0,
+        "broadcast_bytes_received": counters["bytes_received"],
+        "traffic_server_cpu_percent": round(traffic_cpu / traffic_time * 100, 2) if traffic_time else 0,
+        "server_rss_mb": round(proc_rss_mb(server_pid), 1),
+    }
+
+    for _, writer in conns:
+        writer.close()
+    for task in drainers:
+        task.cancel()
+    await asyncio.gather(*drainers, return_exceptions=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9443)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--handshake-concurrency", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=5.0, help="messages per second")
+    parser.add_argument("--message-size", type=int, default=64)
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args()
+
+    # Each connection needs a socket on both ends of the benchmark.
+    raise_fd_limit(args.connections * 2 + 256)
+
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        preexec_fn=lambda: raise_fd_limit(args.connections + 256),
+    )
+    try:
+        result = asyncio.run(run_bench(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
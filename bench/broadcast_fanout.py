@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Broadcast fan-out with one stalled reader, per slow-consumer policy.
+
+Starts ``server/tls_server.py`` in a subprocess for each policy, connects
+--readers clients that drain their broadcasts, one client that never reads,
+and one sender that pushes --messages frames. Reports how long the healthy
+readers took to receive everything and what happened to the stalled one.
+
+    python bench/broadcast_fanout.py --mode thread --readers 20 --messages 5000
+"""
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, ROOT)
+
+from common.framing import FrameReader, FrameError, send_frame, DATA  # noqa: E402
+
+
+def client_context():
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def connect(context, host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return context.wrap_socket(socket.create_connection((host, port)), server_hostname="localhost")
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def read_broadcasts(sock, expected, done, received):
+    reader = FrameReader(sock)
+    count = 0
+    try:
+        while count < expected:
+            frame = reader.read_frame()
+            if frame is None:
+                break
+            if frame[0] == DATA:
+                count += 1
+    except (OSError, FrameError):
+        pass
+    received.append(count)
+    done.append(time.perf_counter())
+
+
+def run(args, policy):
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode,
+         "--slow-consumer", policy, "--send-queue", str(args.send_queue)],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    context = client_context()
+    try:
+        stalled = connect(context, args.host, args.port)
+        readers = [connect(context, args.host, args.port) for _ in range(args.readers)]
+        sender = connect(context, args.host, args.port)
+        time.sleep(0.5)  # let the server register every connection
+
+        done, received = [], []
+        threads = [threading.Thread(target=read_broadcasts, args=(sock, args.messages, done, received))
+                   for sock in readers]
+        for t in threads:
+            t.start()
+        payload = b"x" * args.message_size
+        start = time.perf_counter()
+        for _ in range(args.messages):
+            send_frame(sender, DATA, payload)
+        send_seconds = time.perf_counter() - start
+        for t in threads:
+            t.join(timeout=args.timeout)
+
+        # A disconnected stalled client sees EOF once its buffered data is read
+        stalled.settimeout(2)
+        stalled_bytes, stalled_closed = 0, False
+        try:
+            while True:
+                data = stalled.recv(65536)
+                if not data:
+                    stalled_closed = True
+                    break
+                stalled_bytes += len(data)
+        except (socket.timeout, ssl.SSLError, OSError) as e:
+            stalled_closed = not isinstance(e, socket.timeout)
+
+        for sock in readers + [sender, stalled]:
+            sock.close()
+        finished = max(done) - start if len(done) == args.readers else None
+        return {
+            "policy": policy,
+            "sender_seconds": round(send_seconds, 3),
+            "readers_complete": sum(1 for n in received if n == args.messages),
+            "readers_total": args.readers,
+            "fanout_seconds": round(finished, 3) if finished else None,
+            "deliveries_per_sec": round(args.readers * args.messages / finished) if finished else None,
+            "stalled_client_messages": stalled_bytes // (args.message_size + 5),
+            "stalled_client_disconnected": stalled_closed,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9444)
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread")
+    parser.add_argument("--policies", nargs="+", default=["drop", "disconnect", "backpressure"])
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--message-size", type=int, default=4096)
+    parser.add_argument("--send-queue", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    results = [run(args, policy) for policy in args.policies]
+    print(json.dumps({"benchmark": "broadcast_fanout", "mode": args.mode, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
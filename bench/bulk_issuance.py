@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Bulk certificate issuance throughput for 1..N pool processes.
+
+Issues --count certificates with distinct CNs through
+common.bulk_issue.issue_many for each --workers value and reports
+certificates per second. Key generation is CPU-bound, so throughput should
+grow with workers up to the number of cores.
+
+    python bench/bulk_issuance.py --count 200 --workers 1 2 4 8 --algorithm rsa2048
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from common.bulk_issue import parse_specs, issue_many  # noqa: E402
+from common.cert_engine import KEY_ALGORITHMS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--algorithm", choices=KEY_ALGORITHMS, default="ecdsa-p256")
+    args = parser.parse_args()
+
+    specs = parse_specs([f"host-{i:05d}.lab" for i in range(args.count)])
+    results = []
+    for workers in args.workers:
+        start = time.perf_counter()
+        issued = issue_many(specs, days=30, algorithm=args.algorithm, workers=workers)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "workers": workers,
+            "certificates": len(issued),
+            "seconds": round(elapsed, 3),
+            "certs_per_sec": round(len(issued) / elapsed, 1),
+        })
+    base = results[0]["certs_per_sec"]
+    for r in results:
+        r["speedup"] = round(r["certs_per_sec"] / base, 2)
+    print(json.dumps({"benchmark": "bulk_issuance", "algorithm": args.algorithm, "cpus": os.cpu_count(),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Leaf certificate issuance throughput: self-signed vs local CA.
+
+Times --count issuances for each mode:
+  self_signed      new key, certificate signed by that key (the old path)
+  ca_new_key       new key, certificate signed by the cached CA key
+  ca_sign_only     pre-generated key (as from the key pool), CA signature only
+  ca_reload        CA key and certificate read from disk for every leaf
+Nothing is written except the CA in a temporary directory.
+
+    python bench/ca_issuance.py --count 200 --algorithm ecdsa-p256 --ca-algorithm ecdsa-p256
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from common.cert_engine import KEY_ALGORITHMS, generate_private_key, load_config, self_signed_certificate  # noqa: E402
+from common.local_ca import LocalCA  # noqa: E402
+
+
+def timed(count, issue):
+    start = time.perf_counter()
+    for i in range(count):
+        issue(i)
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "certs_per_sec": round(count / elapsed, 1),
+            "ms_per_cert": round(elapsed / count * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--algorithm", choices=KEY_ALGORITHMS, default="ecdsa-p256", help="leaf key algorithm")
+    parser.add_argument("--ca-algorithm", choices=KEY_ALGORITHMS, default="ecdsa-p256")
+    args = parser.parse_args()
+
+    subject, dns_names, ip_addresses = load_config()
+    ca_dir = tempfile.mkdtemp(prefix="ca_bench_")
+    ca = LocalCA.create(ca_dir, args.ca_algorithm)
+    keys = [generate_private_key(args.algorithm) for _ in range(args.count)]
+
+    results = {
+        "self_signed": timed(args.count, lambda i: self_signed_certificate(
+            generate_private_key(args.algorithm), 30, subject, dns_names, ip_addresses)),
+        "ca_new_key": timed(args.count, lambda i: ca.issue(
+            generate_private_key(args.algorithm), 30, subject, dns_names, ip_addresses)),
+        "ca_sign_only": timed(args.count, lambda i: ca.issue(keys[i], 30, subject, dns_names, ip_addresses)),
+        "ca_reload": timed(args.count, lambda i: LocalCA.load(ca_dir).issue(
+            keys[i], 30, subject, dns_names, ip_addresses)),
+    }
+    print(json.dumps({"benchmark": "ca_issuance", "algorithm": args.algorithm, "ca_algorithm": args.ca_algorithm,
+                      "count": args.count, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
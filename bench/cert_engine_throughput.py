@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Certificates per second: openssl subprocesses vs. the in-process engine.
+
+  subprocess - what web/app.py used to do: `openssl genpkey` then
+               `openssl req -x509`, each through a shell
+  engine     - common.cert_engine.generate_certificate (key, CSR and
+               certificate, written atomically)
+
+    python bench/cert_engine_throughput.py --count 50 --algorithms ecdsa-p256 rsa2048
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from common.cert_engine import generate_certificate, KEY_ALGORITHMS, OPENSSL_GENPKEY_OPTIONS, DEFAULT_CONFIG  # noqa: E402
+
+EXTENSIONS = {'ecdsa-p256': 'v3_req_sig', 'ecdsa-p384': 'v3_req_sig', 'ed25519': 'v3_req_sig'}
+
+
+def via_subprocess(algorithm, out_dir):
+    key = os.path.join(out_dir, "server.key")
+    crt = os.path.join(out_dir, "server.crt")
+    for cmd in (f'openssl genpkey {OPENSSL_GENPKEY_OPTIONS[algorithm]} -out {key}',
+                f'openssl req -x509 -new -nodes -key {key} -config {DEFAULT_CONFIG} '
+                f'-extensions {EXTENSIONS.get(algorithm, "v3_req")} -sha256 -days 365 -out {crt}'):
+        subprocess.run(cmd, shell=True, check=True, capture_output=True)
+
+
+def via_engine(algorithm, out_dir):
+    generate_certificate(days=365, algorithm=algorithm, out_dir=out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--algorithms", nargs="+", choices=KEY_ALGORITHMS, default=["ecdsa-p256", "ed25519", "rsa2048"])
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="cert_bench_")
+    results = []
+    for algorithm in args.algorithms:
+        row = {"algorithm": algorithm, "count": args.count}
+        for name, fn in (("subprocess", via_subprocess), ("engine", via_engine)):
+            start = time.perf_counter()
+            for _ in range(args.count):
+                fn(algorithm, out_dir)
+            elapsed = time.perf_counter() - start
+            row[f"{name}_certs_per_sec"] = round(args.count / elapsed, 1)
+            row[f"{name}_ms_per_cert"] = round(elapsed / args.count * 1000, 2)
+        row["speedup"] = round(row["engine_certs_per_sec"] / row["subprocess_certs_per_sec"], 2)
+        results.append(row)
+    print(json.dumps({"benchmark": "cert_engine_throughput", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
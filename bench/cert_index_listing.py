@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Certificate listing latency vs directory size: parsing every PEM vs the SQLite index.
+
+Grows a temporary directory to each --sizes count of certificates (random
+validity of 1-730 days) and measures:
+  parse_all_ms        parse every file and sort by expiry (no index)
+  index_build_ms      first CertIndex.refresh() into an empty index
+  refresh_ms          refresh with nothing changed (stat only)
+  refresh_changed_ms  refresh after --changed files were rewritten
+  page_ms             first page of 50 sorted by expiry
+  expiring_ms         first page of certificates expiring within 30 days
+  last_page_ms        page at the end of the listing
+
+    python bench/cert_index_listing.py --sizes 100 1000 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from common.cert_engine import generate_private_key, load_config, self_signed_certificate, to_pem  # noqa: E402
+from common.cert_index import CertIndex, parse_certificate_file  # noqa: E402
+
+
+def write_certificates(cert_dir, start, stop, key, subject, ips):
+    for i in range(start, stop):
+        cert = self_signed_certificate(key, random.randint(1, 730), dict(subject, CN=f"host-{i:06d}.lab"),
+                                       [f"host-{i:06d}.lab"], ips)
+        with open(os.path.join(cert_dir, f"host-{i:06d}.crt"), "wb") as f:
+            f.write(to_pem(cert))
+
+
+def ms(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return round((time.perf_counter() - start) / repeat * 1000, 3), result
+
+
+def parse_all(cert_dir):
+    rows = [parse_certificate_file(os.path.join(cert_dir, name)) for name in os.listdir(cert_dir)
+            if name.endswith(".crt")]
+    return sorted(rows, key=lambda row: row["not_after"])[:50]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--changed", type=int, default=10, help="files rewritten before refresh_changed_ms")
+    parser.add_argument("--repeat", type=int, default=20, help="runs averaged for the query timings")
+    args = parser.parse_args()
+
+    random.seed(1)
+    subject, _, ips = load_config()
+    key = generate_private_key("ecdsa-p256")
+    cert_dir = tempfile.mkdtemp(prefix="cert_index_bench_")
+    results = []
+    count = 0
+    for size in sorted(args.sizes):
+        write_certificates(cert_dir, count, size, key, subject, ips)
+        count = size
+        parse_all_ms, _ = ms(lambda: parse_all(cert_dir))
+
+        db_path = os.path.join(cert_dir, f".index-{size}.db")
+        index = CertIndex(cert_dir, db_path=db_path)
+        index_build_ms, _ = ms(index.refresh)
+        refresh_ms, _ = ms(index.refresh)
+        time.sleep(0.01)  # make sure rewritten files get a new mtime
+        write_certificates(cert_dir, 0, min(args.changed, size), key, subject, ips)
+        refresh_changed_ms, changed = ms(index.refresh)
+
+        page_ms, (total, _) = ms(lambda: index.query(limit=50), args.repeat)
+        expiring_ms, (expiring, _) = ms(lambda: index.query(limit=50, expiring_within=30), args.repeat)
+        last_page_ms, _ = ms(lambda: index.query(limit=50, offset=max(0, total - 50)), args.repeat)
+        index.close()
+        results.append({
+            "certificates": total,
+            "expiring_within_30_days": expiring,
+            "parse_all_ms": parse_all_ms,
+            "index_build_ms": index_build_ms,
+            "refresh_ms": refresh_ms,
+            "refresh_changed_ms": refresh_changed_ms,
+            "refresh_changed": changed["updated"],
+            "page_ms": page_ms,
+            "expiring_ms": expiring_ms,
+            "last_page_ms": last_page_ms,
+        })
+    print(json.dumps({"benchmark": "cert_index_listing", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Certificate hot reload: reload latency and handshake rate around a reload.
+
+Starts tls_server.py on a certificate in a temporary directory. Two chat
+connections stay open throughout, while --clients threads run full
+handshakes back to back. After --before seconds the certificate is
+regenerated in place. The benchmark reports how long it took until
+handshakes presented the new certificate, the handshake rate before, during
+and after the reload, and whether the open connections still relay a
+message afterwards.
+
+    python bench/cert_reload.py --mode async --interval 0.5 --clients 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread, Event
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, ROOT)
+
+from common.cert_engine import KEY_ALGORITHMS, generate_certificate  # noqa: E402
+from common.framing import FrameReader, send_frame, DATA  # noqa: E402
+
+
+def client_context():
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def handshake_loop(host, port, stop, records):
+    context = client_context()
+    while not stop.is_set():
+        try:
+            with context.wrap_socket(socket.create_connection((host, port)), server_hostname="localhost") as s:
+                fingerprint = hashlib.sha256(s.getpeercert(binary_form=True)).hexdigest()
+            records.append((time.monotonic(), fingerprint))
+        except (OSError, ssl.SSLError):
+            records.append((time.monotonic(), None))
+
+
+def rate(records, start, end):
+    count = sum(1 for t, fp in records if start <= t < end and fp)
+    return round(count / (end - start), 1) if end > start else None
+
+
+def connections_survive(sender, receiver, timeout=5):
+    """Send a chat message on one open connection and wait for its broadcast on the other."""
+    send_frame(sender, DATA, b"still connected")
+    receiver.settimeout(timeout)
+    reader = FrameReader(receiver)
+    try:
+        while True:
+            frame = reader.read_frame()
+            if frame is None:
+                return False
+            if frame[0] == DATA and b"still connected" in bytes(frame[1]):
+                return True
+    except (OSError, ssl.SSLError):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9446)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--interval", type=float, default=0.5, help="server --cert-reload interval")
+    parser.add_argument("--clients", type=int, default=4, help="handshake threads")
+    parser.add_argument("--before", type=float, default=3, help="seconds of handshakes before the reload")
+    parser.add_argument("--after", type=float, default=3, help="seconds of handshakes after the reload")
+    parser.add_argument("--algorithm", choices=KEY_ALGORITHMS, default="rsa2048")
+    args = parser.parse_args()
+
+    cert_dir = tempfile.mkdtemp(prefix="cert_reload_bench_")
+    old = generate_certificate(days=30, algorithm=args.algorithm, out_dir=cert_dir, write_csr=False)
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode,
+         "--cert", old["files"]["certificate"], "--key", old["files"]["key"], "--cert-reload", str(args.interval)],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        context = client_context()
+        sender, receiver = [context.wrap_socket(socket.create_connection((args.host, args.port)),
+                                                server_hostname="localhost") for _ in range(2)]
+
+        stop = Event()
+        records = []
+        threads = [Thread(target=handshake_loop, args=(args.host, args.port, stop, records), daemon=True)
+                   for _ in range(args.clients)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        time.sleep(args.before)
+        new = generate_certificate(days=30, algorithm=args.algorithm, out_dir=cert_dir, write_csr=False)
+        written = time.monotonic()
+        time.sleep(args.after)
+        stop.set()
+        for t in threads:
+            t.join()
+        end = time.monotonic()
+        survived = connections_survive(sender, receiver)
+        sender.close()
+        receiver.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    new_fp = new["fingerprint_sha256"]
+    first_new = min((t for t, fp in records if fp == new_fp), default=None)
+    reloaded = first_new if first_new is not None else end
+    print(json.dumps({
+        "benchmark": "cert_reload",
+        "mode": args.mode,
+        "algorithm": args.algorithm,
+        "reload_interval": args.interval,
+        "clients": args.clients,
+        "reload_latency_ms": round((first_new - written) * 1000, 1) if first_new is not None else None,
+        "handshakes": sum(1 for _, fp in records if fp),
+        "failed_handshakes": sum(1 for _, fp in records if fp is None),
+        "old_cert_after_write": sum(1 for t, fp in records if t >= written and fp == old["fingerprint_sha256"]),
+        "new_cert_before_write": sum(1 for t, fp in records if t < written and fp == new_fp),
+        "handshakes_per_sec": {
+            "before": rate(records, start, written),
+            "during": rate(records, written, reloaded),
+            "after": rate(records, reloaded, end),
+        },
+        "open_connections_survived": survived,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
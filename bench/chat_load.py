@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""End-to-end chat load: handshake, RTT, broadcast fan-out and throughput per server mode.
+
+Starts ``server/tls_server.py`` on a fresh certificate for each --modes
+entry and drives it with client/load_generator.py: --connections headless
+TLSClient connections, messages at --rate per second with sizes drawn from
+--size. The JSON output records the commit it ran on, so results from
+different versions can be compared directly.
+
+    python bench/chat_load.py --modes thread,async --connections 20 --rate 200 --duration 10 --size 64-1024
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "client"))
+
+from common.cert_engine import KEY_ALGORITHMS, generate_certificate  # noqa: E402
+from load_generator import LoadGenerator  # noqa: E402
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, mode, cert):
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", mode,
+         "--cert", cert["files"]["certificate"], "--key", cert["files"]["key"], "--cert-reload", "0"],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        # Verify the server like the real client does, against the certificate it was started with
+        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=cert["files"]["certificate"])
+        generator = LoadGenerator(args.host, args.port, args.connections, args.rate, args.duration, args.size,
+                                  args.poisson, context)
+        return dict(generator.run(), mode=mode)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9448)
+    parser.add_argument("--modes", default="thread,async", help="comma-separated server modes to run")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=100.0, help="messages per second, across all connections")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--size", default="64-1024", help="message bytes: N, MIN-MAX or N,N,...")
+    parser.add_argument("--poisson", action="store_true", help="exponential gaps between messages")
+    parser.add_argument("--algorithm", choices=KEY_ALGORITHMS, default="ecdsa-p256")
+    parser.add_argument("--output", help="also append the result as one JSON line to this file")
+    args = parser.parse_args()
+
+    cert = generate_certificate(days=1, algorithm=args.algorithm, out_dir=tempfile.mkdtemp(prefix="chat_load_"),
+                                write_csr=False)
+    result = {
+        "benchmark": "chat_load",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "openssl": ssl.OPENSSL_VERSION,
+        "cpus": os.cpu_count(),
+        "algorithm": args.algorithm,
+        "runs": [run(args, mode, cert) for mode in args.modes.split(",")],
+    }
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(result) + "\n")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
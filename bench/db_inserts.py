@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Sustained insert rate of AnalysisDB.
+
+Compares three write paths on a fresh database each:
+
+  per_row_connect - the previous behaviour: open a connection, insert,
+                    commit and close for every row
+  write_behind    - AnalysisDB.save_message with group commits
+  bulk            - AnalysisDB.save_messages (executemany) in chunks
+
+    python bench/db_inserts.py --rows 20000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+from analysis_db import AnalysisDB  # noqa: E402
+
+
+def per_row_connect(path, rows):
+    AnalysisDB(path).close()  # create the schema with WAL enabled
+    start = time.perf_counter()
+    for addr, msg, ts in rows:
+        conn = sqlite3.connect(path, timeout=5.0)
+        conn.execute('INSERT INTO messages (client_address, message, timestamp) VALUES (?, ?, ?)',
+                     (addr, msg, ts.isoformat()))
+        conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+
+def write_behind(path, rows):
+    db = AnalysisDB(path)
+    start = time.perf_counter()
+    for addr, msg, ts in rows:
+        db.save_message(addr, msg, ts)
+    db.flush()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def bulk(path, rows, chunk=1000):
+    db = AnalysisDB(path)
+    start = time.perf_counter()
+    for i in range(0, len(rows), chunk):
+        db.save_messages(rows[i:i + chunk])
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    rows = [(f"192.168.1.{i % 250}:{40000 + i % 1000}", f"message number {i}", now) for i in range(args.rows)]
+    workdir = tempfile.mkdtemp(prefix="db_bench_")
+
+    results = []
+    for name, fn in (("per_row_connect", per_row_connect), ("write_behind", write_behind), ("bulk", bulk)):
+        path = os.path.join(workdir, f"{name}.db")
+        elapsed = fn(path, rows)
+        with sqlite3.connect(path) as conn:
+            stored = conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+        results.append({
+            "mode": name,
+            "rows": stored,
+            "seconds": round(elapsed, 3),
+            "inserts_per_sec": round(len(rows) / elapsed),
+        })
+
+    print(json.dumps({"benchmark": "db_inserts", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
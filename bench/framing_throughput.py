@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Receive throughput of the old recv(1024) loop vs. the framed protocol.
+
+A sender thread pushes --total-mb of data over a local TLS connection in
+messages of --message-kb; the receiver either does the previous
+`recv(1024)` + `decode()` per chunk, or reads frames with FrameReader and
+decodes each complete message once.
+
+    python bench/framing_throughput.py --total-mb 200 --message-kb 4 1024 8192
+"""
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from common.framing import FrameReader, send_frame, DATA  # noqa: E402
+
+CERT = os.path.join(ROOT, "certs", "server.crt")
+KEY = os.path.join(ROOT, "certs", "server.key")
+
+
+def tls_pair():
+    server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ctx.load_cert_chain(CERT, KEY)
+    client_ctx = ssl.create_default_context()
+    client_ctx.check_hostname = False
+    client_ctx.verify_mode = ssl.CERT_NONE
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    accepted = {}
+
+    def accept():
+        sock, _ = listener.accept()
+        accepted["sock"] = server_ctx.wrap_socket(sock, server_side=True)
+
+    t = threading.Thread(target=accept)
+    t.start()
+    client = client_ctx.wrap_socket(socket.create_connection(listener.getsockname()), server_hostname="localhost")
+    t.join()
+    listener.close()
+    return client, accepted["sock"]
+
+
+def sender(sock, framed, payload, count):
+    for _ in range(count):
+        if framed:
+            send_frame(sock, DATA, payload)
+        else:
+            sock.sendall(payload)
+    # Half-close and drain: closing with unread data (TLS 1.3 session
+    # tickets) would reset the connection and discard data in flight.
+    sock.shutdown(socket.SHUT_WR)
+    try:
+        while sock.recv(65536):
+            pass
+    except (ssl.SSLError, OSError):
+        pass
+    sock.close()
+
+
+def receive_legacy(sock):
+    total = 0
+    while True:
+        data = sock.recv(1024)
+        if not data:
+            return total
+        data.decode(errors="replace")
+        total += len(data)
+
+
+def receive_framed(sock):
+    reader = FrameReader(sock)
+    total = 0
+    while True:
+        frame = reader.read_frame()
+        if frame is None:
+            return total
+        _, payload = frame
+        str(payload, "utf-8", "replace")
+        total += len(payload)
+
+
+def run(framed, message_bytes, total_bytes):
+    client, server = tls_pair()
+    payload = b"x" * message_bytes
+    count = max(1, total_bytes // message_bytes)
+    t = threading.Thread(target=sender, args=(client, framed, payload, count))
+    start = time.perf_counter()
+    t.start()
+    received = (receive_framed if framed else receive_legacy)(server)
+    elapsed = time.perf_counter() - start
+    server.close()
+    t.join()
+    return received, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--total-mb", type=int, default=200)
+    parser.add_argument("--message-kb", type=int, nargs="+", default=[4, 1024, 8192])
+    args = parser.parse_args()
+
+    results = []
+    for message_kb in args.message_kb:
+        for framed in (False, True):
+            received, elapsed = run(framed, message_kb * 1024, args.total_mb * 1024 * 1024)
+            results.append({
+                "receiver": "framed" if framed else "recv_1024",
+                "message_kb": message_kb,
+                "mb": round(received / 1024 / 1024, 1),
+                "seconds": round(elapsed, 3),
+                "mb_per_sec": round(received / 1024 / 1024 / elapsed, 1),
+            })
+    print(json.dumps({"benchmark": "framing_throughput", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Full TLS handshake throughput of tls_server.py with 1..N worker processes.
+
+For each --workers value the server is started with ``--workers N`` and
+--client-procs processes open and close TLS connections as fast as they can
+for --duration seconds. Handshakes are CPU-bound on the server (the RSA
+signature), so throughput should grow with workers until the cores, or the
+client processes, run out.
+
+    python bench/handshake_scaling.py --workers 1 2 4 8 --client-procs 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def handshake_loop(host, port, duration, results):
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    done = failed = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            with context.wrap_socket(socket.create_connection((host, port)), server_hostname="localhost"):
+                done += 1
+        except (OSError, ssl.SSLError):
+            failed += 1
+    results.put((done, failed))
+
+
+def run(args, workers):
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode,
+         "--workers", str(workers)],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        time.sleep(0.5)  # every worker has bound the port by now
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=handshake_loop, args=(args.host, args.port, args.duration, results))
+                 for _ in range(args.client_procs)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        counts = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - start
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    done = sum(c[0] for c in counts)
+    return {
+        "workers": workers,
+        "handshakes": done,
+        "failed": sum(c[1] for c in counts),
+        "handshakes_per_sec": round(done / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9445)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--client-procs", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = [run(args, workers) for workers in args.workers]
+    base = results[0]["handshakes_per_sec"] or 1
+    for r in results:
+        r["speedup"] = round(r["handshakes_per_sec"] / base, 2)
+    print(json.dumps({"benchmark": "handshake_scaling", "mode": args.mode, "cpus": os.cpu_count(),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
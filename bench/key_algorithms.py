@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Key generation time and TLSServer handshake rate per key algorithm.
+
+For each algorithm the key is generated --keygen-runs times with the same
+`openssl genpkey` options cert_generator.sh uses, a self-signed certificate
+is issued for the last key, and tls_server.py is started with it. A single
+client then does --handshakes sequential full handshakes.
+
+    python bench/key_algorithms.py --algorithms rsa2048 ecdsa-p256 ed25519
+"""
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, ROOT)
+
+from cryptography.hazmat.primitives.serialization import load_pem_private_key  # noqa: E402
+from common.cert_engine import KEY_ALGORITHMS, OPENSSL_GENPKEY_OPTIONS, self_signed_certificate, to_pem  # noqa: E402
+
+
+def keygen(algorithm, key_path, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(["openssl", "genpkey", *OPENSSL_GENPKEY_OPTIONS[algorithm].split(), "-out", key_path],
+                       check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times
+
+
+def self_signed(key_path, cert_path):
+    with open(key_path, "rb") as f:
+        key = load_pem_private_key(f.read(), password=None)
+    with open(cert_path, "wb") as f:
+        f.write(to_pem(self_signed_certificate(key, days=1)))
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def handshake_rate(args, cert_path, key_path):
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode,
+         "--cert", cert_path, "--key", key_path],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        start = time.perf_counter()
+        for _ in range(args.handshakes):
+            context.wrap_socket(socket.create_connection((args.host, args.port)),
+                                server_hostname="localhost").close()
+        return args.handshakes / (time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9447)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--algorithms", nargs="+", choices=list(KEY_ALGORITHMS), default=list(KEY_ALGORITHMS))
+    parser.add_argument("--keygen-runs", type=int, default=10)
+    parser.add_argument("--handshakes", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="key_bench_")
+    results = []
+    for algorithm in args.algorithms:
+        key_path = os.path.join(workdir, f"{algorithm}.key")
+        cert_path = os.path.join(workdir, f"{algorithm}.crt")
+        times = keygen(algorithm, key_path, args.keygen_runs)
+        self_signed(key_path, cert_path)
+        results.append({
+            "algorithm": algorithm,
+            "keygen_median_ms": round(times[len(times) // 2] * 1000, 1),
+            "keygen_max_ms": round(times[-1] * 1000, 1),
+            "handshakes_per_sec": round(handshake_rate(args, cert_path, key_path), 1),
+        })
+    print(json.dumps({"benchmark": "key_algorithms", "mode": args.mode, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Latency of the web /generate endpoint with and without the key pool.
+
+Calls /generate/<days>?algorithm=... through Flask's test client
+--requests times, one every --interval seconds, writing into a temporary
+directory. The first run generates every key inline. The second run takes
+keys from a KeyPool that was filled before the first request.
+
+    python bench/key_pool_latency.py --algorithm rsa2048 --requests 50 --interval 0.3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+os.environ.setdefault("KEY_POOL_SIZE", "0")  # the module-level pool is replaced below
+sys.path.insert(0, os.path.join(ROOT, "web"))
+sys.path.insert(0, ROOT)
+
+import app as web_app  # noqa: E402
+from common.key_pool import KeyPool  # noqa: E402
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def run(args, pool):
+    web_app.key_pool = pool
+    pool.start()
+    deadline = time.monotonic() + 60
+    while pool.enabled and pool.metrics()["algorithms"][args.algorithm]["ready"] < args.pool_size:
+        if time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    client = web_app.app.test_client()
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        response = client.get(f"/generate/30?algorithm={args.algorithm}")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+        time.sleep(args.interval)
+    metrics = pool.metrics()
+    pool.stop()
+    latencies.sort()
+    return {
+        "key_pool": pool.enabled,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+        "pool": metrics["algorithms"].get(args.algorithm),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--algorithm", default="rsa2048")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.3, help="seconds between requests")
+    parser.add_argument("--pool-size", type=int, default=8)
+    args = parser.parse_args()
+
+    web_app.CERT_DIR = tempfile.mkdtemp(prefix="key_pool_bench_")
+    results = [
+        run(args, KeyPool([args.algorithm], size=0)),
+        run(args, KeyPool([args.algorithm], size=args.pool_size)),
+    ]
+    print(json.dumps({"benchmark": "key_pool_latency", "algorithm": args.algorithm,
+                      "requests": args.requests, "interval": args.interval, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
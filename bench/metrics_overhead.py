@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Cost of the metrics and logging instrumentation, with TLS_METRICS=1 vs TLS_METRICS=0.
+
+Three parts:
+
+- micro: nanoseconds per metric update and per log call (filtered by
+  level, dropped by the rate limit, written), next to a print() call
+- server: server CPU per chat message under a fixed load from
+  client/load_generator.py, for each --modes entry, alternating metrics
+  off and on --repeats times (median reported)
+- analyzer: median MessageAnalyzer.ingest_events() time per batch, metrics
+  off vs on, in separate processes
+
+    python bench/metrics_overhead.py --modes thread,async --rate 300 --duration 5
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, os.path.join(ROOT, "client"))
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def proc_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+
+def per_call_ns(fn, n=200_000):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round((time.perf_counter() - start) / n * 1e9, 1)
+
+
+def micro():
+    from metrics import Registry
+    from log_config import setup_logging
+
+    registry = Registry(enabled=True)
+    counter = registry.counter('bench_total', 'bench')
+    histogram = registry.histogram('bench_seconds', 'bench')
+    null = Registry(enabled=False).histogram('bench_seconds', 'bench')
+
+    sink = io.StringIO()
+    setup_logging('info', stream=sink)
+    log = logging.getLogger('bench')
+    results = {
+        'counter_inc_ns': per_call_ns(counter.inc),
+        'histogram_observe_ns': per_call_ns(lambda: histogram.observe(0.0003)),
+        'disabled_observe_ns': per_call_ns(lambda: null.observe(0.0003)),
+        'perf_counter_ns': per_call_ns(time.perf_counter),
+        'log_below_level_ns': per_call_ns(lambda: log.debug("Client %s: %s", "127.0.0.1:5000", "hello")),
+        # After the first LOG_BURST records every call from this line is dropped by the rate limit
+        'log_rate_limited_ns': per_call_ns(lambda: log.info("Client %s: %s", "127.0.0.1:5000", "hello")),
+    }
+    setup_logging('info', burst=0, stream=sink)
+    results['log_written_ns'] = per_call_ns(lambda: log.info("Client %s: %s", "127.0.0.1:5000", "hello"), 50_000)
+    stdout, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        results['print_to_buffer_ns'] = per_call_ns(
+            lambda: print("\n[12:00:00] Client 127.0.0.1:5000: hello"), 50_000)
+    finally:
+        sys.stdout = stdout
+    setup_logging('warning')
+    return results
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def server_run(args, mode, metrics, cert):
+    import ssl
+    from load_generator import LoadGenerator
+
+    env = dict(os.environ, TLS_WEB_URL="", TLS_METRICS="1" if metrics else "0")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", mode,
+         "--cert", cert["files"]["certificate"], "--key", cert["files"]["key"], "--cert-reload", "0",
+         "--log-level", args.log_level],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=cert["files"]["certificate"])
+        generator = LoadGenerator(args.host, args.port, args.connections, args.rate, args.duration, args.size,
+                                  context=context)
+        cpu_start = proc_cpu_seconds(server.pid)
+        result = generator.run()
+        cpu = proc_cpu_seconds(server.pid) - cpu_start
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    sent = result['messages']['sent']
+    return {'cpu_us_per_message': cpu / sent * 1e6 if sent else None,
+            'fanout_p50_ms': (result['fanout_ms'] or {}).get('p50')}
+
+
+def server(args):
+    from common.cert_engine import generate_certificate
+
+    cert = generate_certificate(days=1, algorithm="ecdsa-p256", out_dir=tempfile.mkdtemp(prefix="metrics_bench_"),
+                                write_csr=False)
+    results = []
+    for mode in args.modes.split(","):
+        runs = {False: [], True: []}
+        for _ in range(args.repeats):
+            for metrics in (False, True):
+                runs[metrics].append(server_run(args, mode, metrics, cert))
+        off = statistics.median(r['cpu_us_per_message'] for r in runs[False])
+        on = statistics.median(r['cpu_us_per_message'] for r in runs[True])
+        results.append({
+            'mode': mode,
+            'cpu_us_per_message_off': round(off, 1),
+            'cpu_us_per_message_on': round(on, 1),
+            'overhead_percent': round((on - off) / off * 100, 2),
+            'fanout_p50_ms_off': statistics.median(r['fanout_p50_ms'] for r in runs[False]),
+            'fanout_p50_ms_on': statistics.median(r['fanout_p50_ms'] for r in runs[True]),
+        })
+    return results
+
+
+def ingest_only(batches, batch_size):
+    """Runs in a child process, so TLS_METRICS applies from the first import."""
+    os.chdir(tempfile.mkdtemp(prefix="metrics_bench_"))  # AnalysisDB creates its database here
+    from message_analyzer import MessageAnalyzer
+    analyzer = MessageAnalyzer()
+    timings = []
+    for b in range(batches):
+        now = datetime.now().isoformat()
+        events = [{'type': 'message', 'client_address': f'10.0.0.{i % 50}:{40000 + i % 50}', 'timestamp': now,
+                   'message': f'hello from batch {b} message {i}'} for i in range(batch_size)]
+        start = time.perf_counter()
+        analyzer.ingest_events(events)
+        timings.append(time.perf_counter() - start)
+    analyzer.close()
+    print(json.dumps({'batch_ms': statistics.median(timings) * 1000}))
+
+
+def analyzer(args):
+    result = {}
+    for metrics in ("0", "1", "0", "1"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--ingest-only", "--batches", str(args.batches), "--batch-size",
+             str(args.batch_size)], env=dict(os.environ, TLS_METRICS=metrics), capture_output=True, text=True,
+            check=True).stdout
+        result.setdefault(metrics, []).append(json.loads(out.splitlines()[-1])['batch_ms'])
+    off, on = min(result["0"]), min(result["1"])
+    return {'batch_size': args.batch_size, 'batch_ms_off': round(off, 3), 'batch_ms_on': round(on, 3),
+            'overhead_percent': round((on - off) / off * 100, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9449)
+    parser.add_argument("--modes", default="thread,async")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=300.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--size", default="64-512")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--log-level", default="info", help="server --log-level during the load runs")
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--ingest-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.ingest_only:
+        ingest_only(args.batches, args.batch_size)
+        return
+    print(json.dumps({
+        "benchmark": "metrics_overhead",
+        "micro": micro(),
+        "server": server(args),
+        "analyzer": analyzer(args),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Cost of mutual TLS and of looking up the client identity per connection.
+
+First times IdentityCache.lookup() on --certs distinct client certificates,
+cold (decoding each certificate) and warm (fingerprint + LRU hit). Then
+starts tls_server.py with --client-auth none and with --client-auth
+required, and times --handshakes sequential full handshakes against each.
+
+    python bench/mtls_identity.py --certs 1000 --handshakes 300
+"""
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, ROOT)
+
+from cryptography.hazmat.primitives.serialization import Encoding  # noqa: E402
+
+from common.cert_engine import generate_certificate, generate_private_key, load_config  # noqa: E402
+from common.local_ca import LocalCA  # noqa: E402
+from client_identity import IdentityCache  # noqa: E402
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def time_lookups(cache, ders):
+    start = time.perf_counter()
+    for der in ders:
+        cache.lookup(der)
+    return round((time.perf_counter() - start) / len(ders) * 1e6, 2)
+
+
+def run_server(args, cert_dir, client_auth, client_context):
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode,
+         "--cert", os.path.join(cert_dir, "server.crt"), "--key", os.path.join(cert_dir, "server.key"),
+         "--client-ca", os.path.join(cert_dir, "ca.crt"), "--client-auth", client_auth,
+         "--revoked", os.path.join(cert_dir, "revoked.txt")],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.host, args.port)
+        latencies = []
+        for _ in range(args.handshakes):
+            start = time.perf_counter()
+            with client_context.wrap_socket(socket.create_connection((args.host, args.port)),
+                                            server_hostname="localhost") as tls:
+                tls.do_handshake()
+                latencies.append(time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    latencies.sort()
+    return {
+        "client_auth": client_auth,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+        "handshakes_per_sec": round(len(latencies) / sum(latencies), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9448)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--certs", type=int, default=1000, help="distinct client certificates for the cache test")
+    parser.add_argument("--handshakes", type=int, default=300)
+    args = parser.parse_args()
+
+    cert_dir = tempfile.mkdtemp(prefix="mtls_bench_")
+    ca = LocalCA.create(cert_dir)
+    subject, _, _ = load_config()
+    key = generate_private_key("ecdsa-p256")
+    ders = [ca.issue(key, 30, dict(subject, CN=f"client-{i}"), [f"client-{i}"], []).public_bytes(Encoding.DER)
+            for i in range(args.certs)]
+    cache = IdentityCache(maxsize=args.certs)
+    cold_us = time_lookups(cache, ders)
+    warm_us = time_lookups(cache, ders)
+
+    generate_certificate(days=30, algorithm="ecdsa-p256", out_dir=cert_dir, write_csr=False, ca=ca)
+    client = generate_certificate(days=30, algorithm="ecdsa-p256", out_dir=cert_dir, name="client",
+                                  write_csr=False, ca=ca, subject=dict(subject, CN="bench"),
+                                  dns_names=["bench"], ip_addresses=[])
+    client_context = ssl.create_default_context(cafile=ca.cert_path)
+    client_context.load_cert_chain(client["files"]["certificate"], client["files"]["key"])
+    runs = [run_server(args, cert_dir, mode, client_context) for mode in ("none", "required")]
+
+    print(json.dumps({
+        "benchmark": "mtls_identity",
+        "mode": args.mode,
+        "identity_lookup_us": {"cold": cold_us, "warm": warm_us},
+        "cache": cache.metrics(),
+        "handshakes": runs,
+        "mtls_overhead_ms": round(runs[1]["p50_ms"] - runs[0]["p50_ms"], 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
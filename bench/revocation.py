@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""CRL build time and TLS handshake overhead with a large revocation list.
+
+Fills a temporary revoked.txt with --revoked random serials and reports:
+  load_ms            Revocations reading the list and building CRL entries
+  base_crl_ms        signing the full CRL (what every revocation would cost
+                     without delta CRLs), and its size
+  delta_crl_ms       average cost of one revoke() that only re-signs the delta
+  serial_set_load_ms RevokedSerialSet reading the whole list
+  serial_set_tail_ms picking up one appended line
+  lookup_ns          one is_revoked() call
+Then it runs --handshakes mutual-TLS handshakes against an in-process
+server, with and without TLSServer.is_revoked() on the client certificate,
+and times the check itself (check_us).
+
+    python bench/revocation.py --revoked 100000 --handshakes 500
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import ssl
+import sys
+import tempfile
+import time
+from threading import Thread
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+os.environ.setdefault("TLS_WEB_URL", "")
+sys.path.insert(0, os.path.join(ROOT, "server"))
+sys.path.insert(0, ROOT)
+
+from common.cert_engine import generate_private_key, key_to_pem, to_pem  # noqa: E402
+from common.local_ca import LocalCA  # noqa: E402
+from common.revocation import Revocations, RevokedSerialSet, REVOKED_FILE  # noqa: E402
+from tls_server import TLSServer  # noqa: E402
+
+
+def ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def write_pem(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def handshakes(args, cert_dir, ca, server, check):
+    server_key = generate_private_key("ecdsa-p256")
+    client_key = generate_private_key("ecdsa-p256")
+    server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_context.load_cert_chain(write_pem(os.path.join(cert_dir, "server.crt"), to_pem(ca.issue(server_key))),
+                                   write_pem(os.path.join(cert_dir, "server.key"), key_to_pem(server_key)))
+    server_context.verify_mode = ssl.CERT_REQUIRED
+    server_context.load_verify_locations(ca.cert_path)
+    client_context = ssl.create_default_context(cafile=ca.cert_path)
+    client_context.load_cert_chain(write_pem(os.path.join(cert_dir, "client.crt"), to_pem(ca.issue(client_key))),
+                                   write_pem(os.path.join(cert_dir, "client.key"), key_to_pem(client_key)))
+
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    rejected = []
+    check_seconds = []
+
+    def serve():
+        for _ in range(args.handshakes):
+            conn, _ = listener.accept()
+            tls = server_context.wrap_socket(conn, server_side=True)
+            if check:
+                check_start = time.perf_counter()
+                if server.is_revoked(tls):
+                    rejected.append(1)
+                check_seconds.append(time.perf_counter() - check_start)
+            tls.sendall(b"k")
+            tls.close()
+
+    thread = Thread(target=serve)
+    thread.start()
+    start = time.perf_counter()
+    for _ in range(args.handshakes):
+        with client_context.wrap_socket(socket.create_connection(("127.0.0.1", port)),
+                                        server_hostname="localhost") as tls:
+            tls.recv(1)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    listener.close()
+    return {"revocation_check": check, "handshake_ms": round(elapsed / args.handshakes * 1000, 3),
+            "handshakes_per_sec": round(args.handshakes / elapsed, 1), "rejected": len(rejected),
+            "check_us": round(sum(check_seconds) / len(check_seconds) * 1e6, 1) if check_seconds else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--revoked", type=int, default=100000, help="revoked serials in the list")
+    parser.add_argument("--revocations", type=int, default=100, help="revoke() calls averaged for delta_crl_ms")
+    parser.add_argument("--handshakes", type=int, default=500)
+    parser.add_argument("--ca-algorithm", default="ecdsa-p256")
+    args = parser.parse_args()
+
+    cert_dir = tempfile.mkdtemp(prefix="revocation_bench_")
+    ca = LocalCA.create(cert_dir, args.ca_algorithm)
+    revoked_path = os.path.join(cert_dir, REVOKED_FILE)
+    with open(revoked_path, "w") as f:
+        for _ in range(args.revoked):
+            f.write(f"{random.getrandbits(159):x}\t2026-01-01T00:00:00+00:00\t\t\n")
+
+    start = time.perf_counter()
+    store = Revocations(ca, cert_dir)
+    load_ms = ms(start)
+    start = time.perf_counter()
+    store.publish(full=True)
+    base_crl_ms = ms(start)
+    start = time.perf_counter()
+    for _ in range(args.revocations):
+        store.revoke(random.getrandbits(159), "superseded")
+    delta_crl_ms = round(ms(start) / args.revocations, 2)
+
+    start = time.perf_counter()
+    serials = RevokedSerialSet(revoked_path, interval=0)
+    serial_set_load_ms = ms(start)
+    store.revoke(random.getrandbits(159))
+    start = time.perf_counter()
+    serials.refresh()
+    serial_set_tail_ms = ms(start)
+    serials.interval = 1.0  # the servers' default: at most one stat() per second
+    probe = random.getrandbits(159)
+    start = time.perf_counter()
+    for _ in range(100000):
+        serials.is_revoked(probe)
+    lookup_ns = round((time.perf_counter() - start) / 100000 * 1e9)
+
+    server = TLSServer()
+    server.revoked_path = revoked_path
+    runs = [handshakes(args, cert_dir, ca, server, check) for check in (False, True, False, True)]
+    without = min(r["handshake_ms"] for r in runs if not r["revocation_check"])
+    with_check = min(r["handshake_ms"] for r in runs if r["revocation_check"])
+
+    print(json.dumps({
+        "benchmark": "revocation",
+        "revoked": len(store),
+        "load_ms": load_ms,
+        "base_crl_ms": base_crl_ms,
+        "base_crl_bytes": os.path.getsize(store.base_path),
+        "delta_crl_ms": delta_crl_ms,
+        "delta_crl_entries": store.metrics()["in_delta_crl"],
+        "serial_set_load_ms": serial_set_load_ms,
+        "serial_set_tail_ms": serial_set_tail_ms,
+        "lookup_ns": lookup_ns,
+        "handshakes": runs,
+        "check_overhead_ms": round(with_check - without, 3),
+        "check_us": min(r["check_us"] for r in runs if r["revocation_check"]),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Full vs. resumed TLS handshakes per second against tls_server.py.
+
+Starts the server in a subprocess and, for each TLS version, runs
+--connections sequential handshakes without a session (full) and then
+with a cached SSLSession (resumed), the way TLSClient reconnects.
+
+    python bench/tls_resumption.py --connections 500
+"""
+
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT, "server")
+VERSIONS = {"1.2": ssl.TLSVersion.TLSv1_2, "1.3": ssl.TLSVersion.TLSv1_3}
+
+
+def client_context(version):
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.minimum_version = context.maximum_version = VERSIONS[version]
+    return context
+
+
+def first_session(context, host, port):
+    sock = context.wrap_socket(socket.create_connection((host, port)), server_hostname="localhost")
+    if sock.version() == "TLSv1.3":
+        # TLS 1.3 tickets arrive after the handshake; read them before keeping the session
+        sock.settimeout(0.05)
+        try:
+            sock.recv(1)
+        except (socket.timeout, ssl.SSLError):
+            pass
+    session = sock.session
+    sock.close()
+    return session
+
+
+def handshakes(context, host, port, count, session):
+    reused = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        sock = context.wrap_socket(socket.create_connection((host, port)), server_hostname="localhost",
+                                   session=session)
+        reused += sock.session_reused
+        sock.close()
+    return time.perf_counter() - start, reused
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9446)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--versions", nargs="+", choices=sorted(VERSIONS), default=["1.2", "1.3"])
+    args = parser.parse_args()
+
+    env = dict(os.environ, TLS_WEB_URL="")
+    server = subprocess.Popen(
+        [sys.executable, "tls_server.py", args.host, "--port", str(args.port), "--mode", args.mode],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = []
+    try:
+        wait_for_port(args.host, args.port)
+        for version in args.versions:
+            context = client_context(version)
+            full_seconds, _ = handshakes(context, args.host, args.port, args.connections, None)
+            session = first_session(context, args.host, args.port)
+            resumed_seconds, reused = handshakes(context, args.host, args.port, args.connections, session)
+            results.append({
+                "tls_version": version,
+                "connections": args.connections,
+                "full_per_sec": round(args.connections / full_seconds, 1),
+                "resumed_per_sec": round(args.connections / resumed_seconds, 1),
+                "resumed_ratio": round(reused / args.connections, 3),
+                "speedup": round(full_seconds / resumed_seconds, 2),
+            })
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    print(json.dumps({"benchmark": "tls_resumption", "mode": args.mode, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""CNS Digital Certificate Generator, in-process version of cert_generator.sh.
+
+Generates the same certs/server.key, server.csr and server.crt with the
+`cryptography` package instead of three openssl invocations. With --bulk,
+issues one certificate per entry of a JSON list or hostname-per-line file
+on a process pool, as named files or a single zip archive. With --ca, the
+certificate is signed by a local CA (certs/ca.crt, created on first use)
+that clients trust instead of server.crt. --client NAME issues a client
+certificate (CN=NAME) from the same CA for servers run with --client-auth.
+
+    python cert_generator.py [validity_days] [-a ALGORITHM] [--out-dir certs] [--name server] [--ca]
+    python cert_generator.py 365 --client alice    # certs/clients/alice.crt for mutual TLS
+    python cert_generator.py 30 -a ecdsa-p256 --bulk hosts.txt [--workers 8] [--archive certs.zip]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from common.cert_engine import (generate_certificate, load_config, CertificateError, KEY_ALGORITHMS,
+                                DEFAULT_KEY_ALGORITHM)
+from common.local_ca import LocalCA
+from common.bulk_issue import NAME_RE, load_spec_file, parse_specs, issue_many, write_files, write_archive
+
+# Colors for terminal output
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+YELLOW = '\033[0;33m'
+BLUE = '\033[0;34m'
+NC = '\033[0m'  # No Color
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("validity", nargs="?", type=int, default=365, help="validity period in days")
+    parser.add_argument("-a", "--algorithm", choices=KEY_ALGORITHMS,
+                        default=os.environ.get("KEY_ALGORITHM", DEFAULT_KEY_ALGORITHM))
+    parser.add_argument("--out-dir", help="output directory (default: certs, or certs/bulk with --bulk)")
+    parser.add_argument("--name", default="server", help="base name of the .key/.csr/.crt files")
+    parser.add_argument("--ca", action="store_true",
+                        help="sign with the local CA in the output directory (created if missing)")
+    parser.add_argument("--client", metavar="NAME",
+                        help="issue a client certificate for NAME from the local CA into <out-dir>/clients")
+    parser.add_argument("--bulk", metavar="FILE", help="JSON list or hostname-per-line file of certificates to issue")
+    parser.add_argument("--workers", type=int, help="key generation processes for --bulk (default: one per core)")
+    parser.add_argument("--archive", metavar="ZIP", help="with --bulk, write a zip archive instead of files")
+    args = parser.parse_args()
+
+    if args.bulk:
+        return bulk(args)
+    args.out_dir = args.out_dir or "certs"
+    if args.client:
+        return client(args)
+
+    print(f"\n{BLUE}=== CNS Digital Certificate Generator ==={NC}")
+    kind = "CA-signed" if args.ca else "self-signed"
+    print(f"{YELLOW}Generating {args.algorithm} key and {kind} certificate "
+          f"(valid for {args.validity} days)...{NC}")
+    try:
+        ca = LocalCA.load_or_create(args.out_dir, passphrase=os.environ.get("CA_PASSPHRASE")) if args.ca else None
+        info = generate_certificate(days=args.validity, algorithm=args.algorithm,
+                                    out_dir=args.out_dir, name=args.name, ca=ca)
+    except (CertificateError, OSError, TypeError, ValueError) as e:
+        print(f"{RED}Error: {e}{NC}")
+        return 1
+
+    print(f"{BLUE}Certificate Information:{NC}")
+    print(f"  Subject:    {info['subject']}")
+    print(f"  Issuer:     {info['issuer']}")
+    print(f"  Not Before: {info['not_before']}")
+    print(f"  Not After:  {info['not_after']}")
+    print(f"\n{GREEN}=== Certificate Generation Completed Successfully! ==={NC}")
+    print("Files generated:")
+    print(f"  - {BLUE}Private Key:{NC} {info['files']['key']}")
+    print(f"  - {BLUE}CSR:{NC} {info['files']['csr']}")
+    print(f"  - {BLUE}Certificate:{NC} {info['files']['certificate']}")
+    if ca is not None:
+        print(f"  - {BLUE}CA Certificate:{NC} {ca.cert_path} (distribute this to clients once)")
+    return 0
+
+
+def client(args):
+    if not NAME_RE.match(args.client):
+        print(f"{RED}Error: {args.client!r} is not a valid client name{NC}")
+        return 1
+    print(f"{YELLOW}Issuing {args.algorithm} client certificate for {args.client} "
+          f"(valid for {args.validity} days)...{NC}")
+    try:
+        ca = LocalCA.load_or_create(args.out_dir, passphrase=os.environ.get("CA_PASSPHRASE"))
+        subject, _, _ = load_config()
+        info = generate_certificate(days=args.validity, algorithm=args.algorithm,
+                                    out_dir=os.path.join(args.out_dir, "clients"), name=args.client,
+                                    write_csr=False, ca=ca, subject=dict(subject, CN=args.client),
+                                    dns_names=[args.client], ip_addresses=[])
+    except (CertificateError, OSError, TypeError, ValueError) as e:
+        print(f"{RED}Error: {e}{NC}")
+        return 1
+    print(f"{GREEN}✓ {info['files']['certificate']} and {info['files']['key']} (issuer: {ca.cert_path}){NC}")
+    if not server_issued_by(ca, args.out_dir):
+        print(f"{YELLOW}Note: {os.path.join(args.out_dir, 'server.crt')} is not issued by this CA; "
+              f"issue it with: python cert_generator.py {args.validity} --ca{NC}")
+    print(f"Connect with: cd client && python tls_client.py --cert {os.path.abspath(info['files']['certificate'])}")
+    return 0
+
+
+def server_issued_by(ca, out_dir):
+    """Whether out_dir/server.crt exists and was signed by `ca`, as mutual TLS setups expect."""
+    from cryptography import x509
+    try:
+        with open(os.path.join(out_dir, "server.crt"), "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+    except (OSError, ValueError):
+        return False
+    return cert.issuer == ca.certificate.subject
+
+
+def bulk(args):
+    try:
+        if args.validity < 1:
+            raise CertificateError("Validity must be at least one day")
+        specs = parse_specs(load_spec_file(args.bulk))
+    except (CertificateError, OSError, ValueError) as e:
+        print(f"{RED}Error: {e}{NC}")
+        return 1
+
+    print(f"{YELLOW}Issuing {len(specs)} {args.algorithm} certificates (valid for {args.validity} days)...{NC}")
+    start = time.perf_counter()
+    results = issue_many(specs, days=args.validity, algorithm=args.algorithm, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    if args.archive:
+        with open(args.archive, "wb") as f:
+            write_archive(results, f)
+        print(f"{GREEN}✓ Wrote {len(results)} certificates to {args.archive}{NC}")
+    else:
+        out_dir = args.out_dir or os.path.join("certs", "bulk")
+        write_files(results, out_dir)
+        print(f"{GREEN}✓ Wrote {len(results)} keys and certificates to {out_dir}/{NC}")
+    print(f"{BLUE}{len(results) / elapsed:.1f} certificates/s{NC}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
 #!/bin/bash
 
 # CNS Digital Certificate Generator
-# This script generates RSA keys and self-signed certificates for TLS communication
+# This script generates private keys and self-signed certificates for TLS communication
+#
+# Usage: ./cert_generator.sh [validity_days] [-a|--algorithm ALGORITHM]
+#   ALGORITHM: rsa2048 (default), rsa3072, rsa4096, ecdsa-p256, ecdsa-p384, ed25519
+#   The KEY_ALGORITHM environment variable sets the default algorithm.
 
 # Colors for terminal output
 RED='\033[0;31m'
@@ -21,14 +25,65 @@ if ! command -v openssl &> /dev/null; then
     exit 1
 fi
 
-# Default validity period (days)
+# Default validity period (days) and key algorithm
 VALIDITY=365
-
-# Check if user provided a validity period
-if [ $# -eq 1 ] && [[ $1 =~ ^[0-9]+$ ]]; then
-    VALIDITY=$1
-    echo -e "${BLUE}Setting certificate validity to $VALIDITY days${NC}"
-fi
+ALGORITHM=${KEY_ALGORITHM:-rsa2048}
+
+# Parse arguments: an optional validity period and an optional key algorithm
+while [ $# -gt 0 ]; do
+    case $1 in
+        -a|--algorithm)
+            if [ $# -lt 2 ]; then
+                echo -e "${RED}Error: $1 needs an algorithm${NC}"
+                echo "Usage: $0 [validity_days] [-a|--algorithm rsa2048|rsa3072|rsa4096|ecdsa-p256|ecdsa-p384|ed25519]"
+                exit 1
+            fi
+            ALGORITHM=$2
+            shift 2
+            ;;
+        *)
+            if [[ $1 =~ ^[0-9]+$ ]]; then
+                VALIDITY=$1
+                echo -e "${BLUE}Setting certificate validity to $VALIDITY days${NC}"
+            else
+                echo -e "${RED}Error: Unknown argument '$1'${NC}"
+                echo "Usage: $0 [validity_days] [-a|--algorithm rsa2048|rsa3072|rsa4096|ecdsa-p256|ecdsa-p384|ed25519]"
+                exit 1
+            fi
+            shift
+            ;;
+    esac
+done
+
+# Map the algorithm to openssl genpkey options and the matching extension section.
+# RSA keys may be used for key encipherment; ECDSA and Ed25519 keys only sign.
+case $ALGORITHM in
+    rsa2048|rsa3072|rsa4096)
+        KEY_DESC="RSA (${ALGORITHM#rsa} bits)"
+        KEY_OPTS="-algorithm RSA -pkeyopt rsa_keygen_bits:${ALGORITHM#rsa}"
+        EXTENSIONS=v3_req
+        ;;
+    ecdsa-p256)
+        KEY_DESC="ECDSA (P-256)"
+        KEY_OPTS="-algorithm EC -pkeyopt ec_paramgen_curve:P-256 -pkeyopt ec_param_enc:named_curve"
+        EXTENSIONS=v3_req_sig
+        ;;
+    ecdsa-p384)
+        KEY_DESC="ECDSA (P-384)"
+        KEY_OPTS="-algorithm EC -pkeyopt ec_paramgen_curve:P-384 -pkeyopt ec_param_enc:named_curve"
+        EXTENSIONS=v3_req_sig
+        ;;
+    ed25519)
+        KEY_DESC="Ed25519"
+        KEY_OPTS="-algorithm ED25519"
+        EXTENSIONS=v3_req_sig
+        ;;
+    *)
+        echo -e "${RED}Error: Unknown key algorithm '$ALGORITHM'${NC}"
+        echo "Supported: rsa2048, rsa3072, rsa4096, ecdsa-p256, ecdsa-p384, ed25519"
+        exit 1
+        ;;
+esac
 
 # Check if openssl.cnf exists
 if [ ! -f "config/openssl.cnf" ]; then
@@ -59,6 +114,13 @@ keyUsage             = nonRepudiation, digitalSignature, keyEncipherment
 extendedKeyUsage     = serverAuth, clientAuth
 subjectAltName       = @alt_names
 
+[ v3_req_sig ]
+# ECDSA and Ed25519 keys can only sign, so they must not claim keyEncipherment
+basicConstraints     = CA:FALSE
+keyUsage             = digitalSignature
+extendedKeyUsage     = serverAuth, clientAuth
+subjectAltName       = @alt_names
+
 [ alt_names ]
 DNS.1 = localhost
 IP.1 = 127.0.0.1
@@ -69,18 +131,18 @@ fi
 
 echo -e "\n${BLUE}=== CNS Digital Certificate Generator ===${NC}"
 
-# Generate RSA private key (2048 bits)
-echo -e "\n${YELLOW}Step 1: Generating RSA private key (2048 bits)...${NC}"
-openssl genrsa -out certs/server.key 2048
+# Generate the private key
+echo -e "\n${YELLOW}Step 1: Generating $KEY_DESC private key...${NC}"
+openssl genpkey $KEY_OPTS -out certs/server.key
 if [ $? -ne 0 ]; then
-    echo -e "${RED}Error: Failed to generate RSA private key${NC}"
+    echo -e "${RED}Error: Failed to generate $KEY_DESC private key${NC}"
     exit 1
 fi
 echo -e "${GREEN}✓ Private key generated successfully: certs/server.key${NC}"
 
 # Create Certificate Signing Request (CSR) using the config file
 echo -e "\n${YELLOW}Step 2: Creating Certificate Signing Request (CSR)...${NC}"
-openssl req -new -key certs/server.key -out certs/server.csr -config config/openssl.cnf
+openssl req -new -key certs/server.key -out certs/server.csr -config config/openssl.cnf -reqexts $EXTENSIONS
 if [ $? -ne 0 ]; then
     echo -e "${RED}Error: Failed to create Certificate Signing Request${NC}"
     exit 1
@@ -89,7 +151,7 @@ echo -e "${GREEN}✓ CSR created successfully: certs/server.csr${NC}"
 
 # Generate self-signed certificate
 echo -e "\n${YELLOW}Step 3: Generating self-signed certificate (valid for $VALIDITY days)...${NC}"
-openssl x509 -req -days $VALIDITY -in certs/server.csr -signkey certs/server.key -out certs/server.crt -extensions v3_req -extfile config/openssl.cnf
+openssl x509 -req -days $VALIDITY -in certs/server.csr -signkey certs/server.key -out certs/server.crt -extensions $EXTENSIONS -extfile config/openssl.cnf
 if [ $? -ne 0 ]; then
     echo -e "${RED}Error: Failed to generate self-signed certificate${NC}"
     exit 1
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Headless load generator for the TLS chat server.
+
+Opens N TLSClient connections without the curses UI (one receiver thread
+each), then sends chat messages from the connections in turn at a target
+rate. Every message carries a sequence number, so the receivers can tell
+when each broadcast reached them. Prints JSON with:
+
+- handshake latency (TCP connect + TLS handshake per connection)
+- rtt: from sending a message until the first other client received it
+- fanout: from sending a message until every other client received it
+- throughput: messages sent and broadcast frames/bytes received per second
+
+    python load_generator.py localhost --port 8443 --connections 50 --rate 200 --size 64-1024
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import ssl
+import time
+from threading import Thread, Lock, Event
+
+from tls_client import TLSClient
+from common.framing import FrameReader, FrameError, DATA
+
+MARKER = re.compile(rb'#lg:(\d+):')
+DRAIN_TIMEOUT = 5.0  # seconds to wait for outstanding broadcasts after the last send
+SETTLE_TIME = 0.5  # lets the server register the last connections before sending starts
+
+
+def parse_sizes(spec):
+    """'64' -> always 64 bytes, '64-1024' -> uniform in that range, '64,512,4096' -> one of those."""
+    if '-' in spec:
+        low, high = (int(part) for part in spec.split('-', 1))
+        return lambda: random.randint(low, high)
+    choices = [int(part) for part in spec.split(',')]
+    return lambda: random.choice(choices)
+
+
+def percentiles(values, scale=1000.0):
+    """p50/p90/p99/max of a list of seconds, in milliseconds."""
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))] * scale, 3)
+    return {'count': len(values), 'mean': round(sum(values) / len(values) * scale, 3),
+            'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': round(values[-1] * scale, 3)}
+
+
+class LoadGenerator:
+    """Drives many headless TLSClient connections and records latencies."""
+
+    def __init__(self, host='localhost', port=8443, connections=10, rate=10.0, duration=10.0, sizes='64',
+                 poisson=False, context=None, client_cert=None, client_key=None, ca_file=None):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.rate = rate
+        self.duration = duration
+        self.size = parse_sizes(sizes)
+        self.sizes = sizes
+        self.poisson = poisson
+        self.context = context  # e.g. an unverified context for throwaway benchmark certificates
+        self.client_cert = client_cert
+        self.client_key = client_key
+        self.ca_file = ca_file
+        self.clients = []
+        self.handshakes = []
+        self.failed = 0
+        self.messages = {}  # seq -> [sent at, first delivery, last delivery, deliveries]
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.send_lag = []
+        self._lock = Lock()
+        self._receivers = []
+        self.stop_event = Event()
+
+    def connect(self):
+        for _ in range(self.connections):
+            client = TLSClient(self.host, self.port, self.client_cert, self.client_key, self.ca_file)
+            client.reconnect_attempts = 1
+            if self.context is not None:
+                client.context = self.context
+            elif self.clients:
+                client.context = self.clients[0].context  # one context, so sessions can be resumed
+            start = time.perf_counter()
+            if not client.connect_to_server():
+                self.failed += 1
+                continue
+            self.handshakes.append(time.perf_counter() - start)
+            client.secure_socket.settimeout(None)
+            self.clients.append(client)
+            receiver = Thread(target=self.receive, args=(client,), daemon=True)
+            receiver.start()
+            self._receivers.append(receiver)
+
+    def receive(self, client):
+        """Like TLSClient.receive_messages, but timestamps broadcasts instead of drawing them."""
+        reader = FrameReader(client.secure_socket)
+        while not self.stop_event.is_set():
+            try:
+                frame = reader.read_frame()
+            except (OSError, FrameError):
+                break
+            now = time.perf_counter()
+            if frame is None:
+                break
+            frame_type, payload = frame
+            if frame_type != DATA:
+                continue
+            match = MARKER.search(payload)
+            with self._lock:
+                self.frames_received += 1
+                self.bytes_received += len(payload)
+                entry = self.messages.get(int(match.group(1))) if match else None
+                if entry is not None:
+                    if entry[1] is None:
+                        entry[1] = now
+                    entry[2] = now
+                    entry[3] += 1
+
+    def send(self):
+        """Send from each connection in turn, on a fixed (or Poisson) schedule."""
+        start = time.perf_counter()
+        due = start
+        seq = 0
+        while due - start < self.duration:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.send_lag.append(max(0.0, -delay))  # how far behind schedule the generator itself fell
+            client = self.clients[seq % len(self.clients)]
+            prefix = f"#lg:{seq}:"
+            message = prefix + 'x' * max(0, self.size() - len(prefix))
+            with self._lock:
+                self.messages[seq] = [time.perf_counter(), None, None, 0]
+            if not client.send_message(message):
+                with self._lock:
+                    del self.messages[seq]
+            seq += 1
+            due += random.expovariate(self.rate) if self.poisson else 1.0 / self.rate
+        return time.perf_counter() - start
+
+    def wait_for_delivery(self, timeout=DRAIN_TIMEOUT):
+        expected = len(self.clients) - 1
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if all(entry[3] >= expected for entry in self.messages.values()):
+                    return
+            time.sleep(0.05)
+
+    def close(self):
+        self.stop_event.set()
+        for client in self.clients:
+            try:
+                client.secure_socket.shutdown(socket.SHUT_RDWR)  # wakes the blocked receiver
+                client.secure_socket.close()
+            except OSError:
+                pass
+        for receiver in self._receivers:
+            receiver.join(timeout=1.0)
+
+    def run(self):
+        """Connect, send for `duration` seconds, wait for the broadcasts and return the results."""
+        start = time.perf_counter()
+        try:
+            self.connect()
+            connect_time = time.perf_counter() - start
+            if len(self.clients) < 2:
+                return self.results(connect_time, 0.0)
+            time.sleep(SETTLE_TIME)
+            send_time = self.send()
+            self.wait_for_delivery()
+            return self.results(connect_time, time.perf_counter() - start - connect_time - SETTLE_TIME, send_time)
+        finally:
+            self.close()
+
+    def results(self, connect_time, elapsed, send_time=0.0):
+        expected = len(self.clients) - 1
+        with self._lock:
+            messages = list(self.messages.values())
+            frames, received_bytes = self.frames_received, self.bytes_received
+        delivered = [m for m in messages if m[3]]
+        complete = [m for m in messages if m[3] >= expected]
+        return {
+            'host': self.host,
+            'port': self.port,
+            'connections': {'requested': self.connections, 'open': len(self.clients), 'failed': self.failed,
+                            'connect_seconds': round(connect_time, 3)},
+            'handshake_ms': percentiles(self.handshakes),
+            'messages': {'target_rate': self.rate, 'poisson': self.poisson, 'sizes': self.sizes,
+                         'sent': len(messages), 'fully_delivered': len(complete),
+                         'missed_deliveries': sum(expected - m[3] for m in messages if m[3] < expected)},
+            'rtt_ms': percentiles([m[1] - m[0] for m in delivered]),
+            'fanout_ms': percentiles([m[2] - m[0] for m in complete]),
+            'send_lag_ms': percentiles(self.send_lag),
+            'throughput': {
+                'send_seconds': round(send_time, 3),
+                'messages_per_second': round(len(messages) / send_time, 2) if send_time else 0,
+                'frames_received_per_second': round(frames / elapsed, 2) if elapsed else 0,
+                'bytes_received_per_second': round(received_bytes / elapsed, 1) if elapsed else 0,
+            },
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless load generator for the TLS chat server")
+    parser.add_argument("host", nargs="?", default="localhost")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=10.0, help="messages per second, across all connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to send for")
+    parser.add_argument("--size", default="64", help="message bytes: N, MIN-MAX or N,N,...")
+    parser.add_argument("--poisson", action="store_true", help="exponential gaps between messages instead of fixed")
+    parser.add_argument("--insecure", action="store_true", help="do not verify the server certificate")
+    parser.add_argument("--cert", help="client certificate for servers run with --client-auth")
+    parser.add_argument("--key", help="private key for --cert (default: the .crt path with .key)")
+    parser.add_argument("--ca-file", help="trust only this CA or server certificate")
+    args = parser.parse_args()
+
+    context = None
+    if args.insecure:
+        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    key = args.key or (os.path.splitext(args.cert)[0] + ".key" if args.cert else None)
+    if not args.insecure and not TLSClient(client_cert=args.cert, client_key=key,
+                                           ca_file=args.ca_file).check_certificate():
+        raise SystemExit("Certificate not found: run from client/ after generating certificates, or use --insecure")
+    if context is not None and args.cert:
+        context.load_cert_chain(args.cert, key)
+    generator = LoadGenerator(args.host, args.port, args.connections, args.rate, args.duration, args.size,
+                              args.poisson, context, args.cert, key, args.ca_file)
+    print(json.dumps(generator.run(), indent=2))
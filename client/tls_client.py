@@ -6,8 +6,12 @@ import sys
 import os
 import time
 import curses
+import argparse
 from datetime import datetime
-from threading import Thread, Event
+from threading import Thread, Event, Lock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.framing import FrameReader, FrameError, send_frame, DATA
 
 # ANSI color codes
 GREEN = '\033[0;32m'
@@ -17,13 +21,23 @@ RED = '\033[0;31m'
 RESET = '\033[0m'
 
 class TLSClient:
-    def __init__(self, host='localhost', port=8443):
+    def __init__(self, host='localhost', port=8443, client_cert=None, client_key=None, ca_file=None):
         self.host = host
         self.port = port
-        self.cert_path = os.path.join("..", "certs", "server.crt")
+        self.client_cert = client_cert  # our own certificate and key, for servers run with --client-auth
+        self.client_key = client_key
+        # Trust the local CA (rotated CA-issued server certificates need no redistribution) and
+        # pin the server certificate (a self-signed one still works once a CA exists), or only ca_file
+        default_paths = [os.path.join("..", "certs", "ca.crt"), os.path.join("..", "certs", "server.crt")]
+        self.cert_paths = [ca_file] if ca_file else [path for path in default_paths if os.path.exists(path)]
+        self.expected_paths = [ca_file] if ca_file else default_paths
         self.secure_socket = None
+        self.context = None  # Built once so cached sessions stay valid
+        self.session = None  # Last TLS session, offered on reconnect to skip the full handshake
         self.reconnect_attempts = 3
         self.reconnect_delay = 2  # seconds
+        self.reconnected = False  # result of the last reconnect
+        self._reconnect_lock = Lock()  # the receiver and the input loop may both notice a drop
         self.stop_event = Event()
         self.screen = None
         
@@ -50,37 +64,64 @@ class TLSClient:
         
     def check_certificate(self):
         """Check if certificate file exists"""
-        if not os.path.exists(self.cert_path):
+        if not self.cert_paths or not all(os.path.exists(path) for path in self.cert_paths):
             self.log_message(f"Error: Certificate file not found.", 3)
-            self.log_message(f"Expected: {self.cert_path}", 3)
+            self.log_message(f"Expected: {' or '.join(self.expected_paths)}", 3)
             self.log_message("Run cert_generator.sh first to create the certificate.", 3)
             return False
+        for path in (self.client_cert, self.client_key):
+            if path and not os.path.exists(path):
+                self.log_message(f"Error: Client certificate file not found: {path}", 3)
+                self.log_message("Create one with: python cert_generator.py --client NAME", 3)
+                return False
         return True
         
+    def create_ssl_context(self):
+        """Set up the SSL context once; sessions can only be resumed with the context that created them"""
+        if self.context is None:
+            self.context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+            self.context.check_hostname = True
+            for path in self.cert_paths:
+                self.context.load_verify_locations(path)
+            if self.client_cert:
+                self.context.load_cert_chain(self.client_cert, self.client_key)
+        return self.context
+
+    def save_session(self):
+        """Remember the current TLS session for the next connect"""
+        if self.secure_socket is not None:
+            try:
+                session = self.secure_socket.session
+            except (ValueError, OSError):
+                return
+            if session is not None and (session.has_ticket or session.id):
+                self.session = session
+
     def connect_to_server(self):
         """Connect to the TLS server with retry logic"""
+        context = self.create_ssl_context()
         for attempt in range(self.reconnect_attempts):
             try:
                 # Create a TCP/IP socket
                 client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 client_socket.settimeout(10)
                 
-                # Set up SSL context
-                context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-                context.check_hostname = True
-                context.load_verify_locations(self.cert_path)
-                
-                # Wrap the socket with SSL/TLS
-                self.secure_socket = context.wrap_socket(client_socket, server_hostname='localhost')
+                # Wrap the socket with SSL/TLS, offering the cached session if we have one
+                self.secure_socket = context.wrap_socket(client_socket, server_hostname='localhost',
+                                                         session=self.session)
                 
                 # Connect to server
                 self.log_message(f"Connecting to {self.host}:{self.port}... (Attempt {attempt + 1})", 2)
                 self.secure_socket.connect((self.host, self.port))
-                self.log_message("Connected successfully!", 1)
+                if self.secure_socket.session_reused:
+                    self.log_message("Connected successfully! (TLS session resumed)", 1)
+                else:
+                    self.log_message("Connected successfully!", 1)
+                self.save_session()
                 
                 return True
                 
-            except (ssl.SSLError, ConnectionRefusedError, socket.timeout) as e:
+            except (ssl.SSLError, OSError) as e:  # refused, reset, timed out, ...
                 self.log_message(f"Connection attempt {attempt + 1} failed: {str(e)}", 3)
                 if attempt < self.reconnect_attempts - 1:
                     self.log_message(f"Retrying in {self.reconnect_delay} seconds...", 2)
@@ -90,6 +131,21 @@ class TLSClient:
                     
         return False
     
+    def reconnect(self, failed_socket):
+        """Replace a dropped connection, resuming the saved TLS session"""
+        with self._reconnect_lock:
+            if self.secure_socket is not failed_socket:
+                return self.reconnected  # the other thread already handled this drop
+            if self.stop_event.is_set():
+                return False
+            try:
+                failed_socket.close()
+            except OSError:
+                pass
+            self.log_message("Reconnecting...", 2)
+            self.reconnected = self.connect_to_server()
+            return self.reconnected
+
     def log_message(self, message, color_pair=0):
         """Log a message to the UI"""
         if self.screen:
@@ -102,27 +158,35 @@ class TLSClient:
             self.screen.refresh()
     
     def receive_messages(self):
-        """Background thread for receiving messages"""
+        """Background thread for receiving messages; reconnects when the connection drops"""
+        sock = self.secure_socket
+        reader = FrameReader(sock)
         while not self.stop_event.is_set():
             try:
-                data = self.secure_socket.recv(1024)
-                if not data:
+                frame = reader.read_frame()
+                if frame is None:
+                    self.save_session()
                     self.log_message("Server disconnected.", 3)
-                    break
-                if data.decode() == "ping":
-                    continue  # Ignore keepalive messages
-                self.log_message(f"Server: {data.decode()}", 1)
+                else:
+                    frame_type, payload = frame
+                    if frame_type == DATA:  # Ignore keepalive and control frames
+                        self.log_message(f"Server: {str(payload, 'utf-8', 'replace')}", 1)
+                    continue
             except socket.timeout:
                 continue  # Just try again
-            except (ssl.SSLError, socket.error) as e:
-                if not self.stop_event.is_set():
-                    self.log_message(f"Error receiving message: {e}", 3)
+            except (ssl.SSLError, socket.error, FrameError) as e:
+                if self.stop_event.is_set():
                     break
+                self.log_message(f"Error receiving message: {e}", 3)
+            if not self.reconnect(sock):
+                break
+            sock = self.secure_socket
+            reader = FrameReader(sock)
     
     def send_message(self, message):
         """Send a message to the server"""
         try:
-            self.secure_socket.send(message.encode())
+            send_frame(self.secure_socket, DATA, message.encode())
         except (socket.error, ssl.SSLError) as e:
             self.log_message(f"Error sending message: {e}", 3)
             return False
@@ -148,8 +212,11 @@ class TLSClient:
                     if message.lower() == 'exit':
                         break
                         
+                    sock = self.secure_socket
                     if not self.send_message(message):
-                        break
+                        # Retry once on a new connection (the receiver may already be making it)
+                        if not self.reconnect(sock) or not self.send_message(message):
+                            break
                         
                 except curses.error:
                     continue
@@ -179,10 +246,20 @@ class TLSClient:
         finally:
             # Cleanup
             if self.secure_socket:
+                self.save_session()
                 self.secure_socket.close()
             self.cleanup_ui()
             self.log_message("Connection closed", 1)
 
 if __name__ == "__main__":
-    client = TLSClient()
+    parser = argparse.ArgumentParser(description="TLS chat client")
+    parser.add_argument("host", nargs="?", default="localhost")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--cert", help="client certificate for mutual TLS (e.g. ../certs/clients/alice.crt)")
+    parser.add_argument("--key", help="private key for --cert (default: the .crt path with .key)")
+    parser.add_argument("--ca-file", help="trust only this CA or server certificate "
+                                          "(default: ../certs/ca.crt and ../certs/server.crt)")
+    args = parser.parse_args()
+    key = args.key or (os.path.splitext(args.cert)[0] + ".key" if args.cert else None)
+    client = TLSClient(args.host, args.port, client_cert=args.cert, client_key=key, ca_file=args.ca_file)
     client.run()
\ No newline at end of file
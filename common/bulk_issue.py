@@ -0,0 +1,142 @@
+"""Issue many self-signed certificates at once on a process pool.
+
+Each entry of a batch is either a hostname / IP address string or a dict:
+
+    {"name": "web-01", "common_name": "web-01.lab", "dns_names": [...], "ip_addresses": [...]}
+
+Only common_name is required. name (used for the output files) defaults
+to the common name, and without explicit SANs the common name becomes the
+only DNS (or IP) SAN. The rest of the subject comes from openssl.cnf.
+"""
+
+import ipaddress
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from common.cert_engine import (CertificateError, DEFAULT_CONFIG, DEFAULT_KEY_ALGORITHM, _atomic_write,
+                                certificate_info, generate_private_key, key_to_pem, load_config,
+                                self_signed_certificate, to_pem)
+
+NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$')
+MAX_BATCH = 5000
+
+
+def _is_ip(value):
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _string_list(entry, key, i):
+    value = entry.get(key) or []
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise CertificateError(f"Entry {i}: {key} must be a list of strings")
+    return list(value)
+
+
+def parse_specs(entries, config=DEFAULT_CONFIG):
+    """Validate a batch and expand every entry to a full subject and SAN list."""
+    if not isinstance(entries, list) or not entries:
+        raise CertificateError("Expected a non-empty list of certificates")
+    if len(entries) > MAX_BATCH:
+        raise CertificateError(f"At most {MAX_BATCH} certificates per batch")
+    base_subject, _, _ = load_config(config)
+    specs, names = [], set()
+    for i, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'common_name': entry}
+        if not isinstance(entry, dict) or not entry.get('common_name'):
+            raise CertificateError(f"Entry {i}: common_name is required")
+        cn = str(entry['common_name'])
+        name = str(entry.get('name') or cn)
+        if not NAME_RE.match(name):
+            raise CertificateError(f"Entry {i}: {name!r} is not a valid file name")
+        if name in names:
+            raise CertificateError(f"Entry {i}: duplicate name {name!r}")
+        names.add(name)
+        dns_names = _string_list(entry, 'dns_names', i)
+        ip_addresses = _string_list(entry, 'ip_addresses', i)
+        if not dns_names and not ip_addresses:
+            (ip_addresses if _is_ip(cn) else dns_names).append(cn)
+        for ip in ip_addresses:
+            if not _is_ip(ip):
+                raise CertificateError(f"Entry {i}: {ip!r} is not an IP address")
+        specs.append({
+            'name': name,
+            'subject': dict(base_subject, CN=cn),
+            'dns_names': dns_names,
+            'ip_addresses': ip_addresses,
+        })
+    return specs
+
+
+def load_spec_file(path):
+    """Read a batch from a JSON list, or a text file with one hostname per line."""
+    with open(path) as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def issue_one(spec, days, algorithm):
+    """Generate one key and certificate; runs in a pool worker."""
+    key = generate_private_key(algorithm)
+    cert = self_signed_certificate(key, days, spec['subject'], spec['dns_names'], spec['ip_addresses'])
+    info = certificate_info(cert)
+    info.update(name=spec['name'], algorithm=algorithm)
+    return info, key_to_pem(key), to_pem(cert)
+
+
+def _issue_args(args):
+    return issue_one(*args)
+
+
+def issue_many(specs, days=365, algorithm=DEFAULT_KEY_ALGORITHM, workers=None, executor=None):
+    """Issue every spec and return [(info, key_pem, cert_pem)] in input order.
+
+    Key generation is CPU-bound, so the work is spread over a process pool:
+    `executor` if given (reused across batches), otherwise a pool of
+    `workers` processes created for this batch. workers=1 runs inline.
+    """
+    if days < 1:
+        raise CertificateError("Validity must be at least one day")  # before any worker starts
+    jobs = [(spec, days, algorithm) for spec in specs]
+    if executor is None and workers == 1:
+        return [issue_one(*job) for job in jobs]
+    owned = executor is None
+    if owned:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pool_size = getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (pool_size * 4))
+        return list(executor.map(_issue_args, jobs, chunksize=chunksize))
+    finally:
+        if owned:
+            executor.shutdown()
+
+
+def write_files(results, out_dir):
+    """Write <name>.key and <name>.crt for every result; returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for info, key_pem, cert_pem in results:
+        key_path = os.path.join(out_dir, f"{info['name']}.key")
+        cert_path = os.path.join(out_dir, f"{info['name']}.crt")
+        _atomic_write(key_path, key_pem, mode=0o600)
+        _atomic_write(cert_path, cert_pem)
+        manifest.append(dict(info, files={'key': key_path, 'certificate': cert_path}))
+    return manifest
+
+
+def write_archive(results, fileobj):
+    """Write every key and certificate plus a manifest.json into a zip archive."""
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for info, key_pem, cert_pem in results:
+            archive.writestr(f"{info['name']}.key", key_pem)
+            archive.writestr(f"{info['name']}.crt", cert_pem)
+        archive.writestr('manifest.json', json.dumps([info for info, _, _ in results], indent=2))
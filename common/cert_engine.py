@@ -0,0 +1,262 @@
+"""In-process key, CSR and certificate generation (requires `cryptography`).
+
+Produces the same files as cert_generator.sh without spawning openssl:
+the subject and Subject Alternative Names are read from config/openssl.cnf,
+and the extensions match its v3_req (RSA) and v3_req_sig (ECDSA, Ed25519)
+sections.
+
+    from common.cert_engine import generate_certificate
+    info = generate_certificate(days=365, algorithm='ecdsa-p256', out_dir='certs')
+"""
+
+import datetime
+import ipaddress
+import os
+import tempfile
+from threading import Lock
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_CONFIG = os.path.join(ROOT, "config", "openssl.cnf")
+DEFAULT_CERT_DIR = os.path.join(ROOT, "certs")
+
+DEFAULT_KEY_ALGORITHM = 'rsa2048'
+KEY_ALGORITHMS = ('rsa2048', 'rsa3072', 'rsa4096', 'ecdsa-p256', 'ecdsa-p384', 'ed25519')
+# The equivalent `openssl genpkey` options, as used by cert_generator.sh
+OPENSSL_GENPKEY_OPTIONS = {
+    'rsa2048': '-algorithm RSA -pkeyopt rsa_keygen_bits:2048',
+    'rsa3072': '-algorithm RSA -pkeyopt rsa_keygen_bits:3072',
+    'rsa4096': '-algorithm RSA -pkeyopt rsa_keygen_bits:4096',
+    'ecdsa-p256': '-algorithm EC -pkeyopt ec_paramgen_curve:P-256 -pkeyopt ec_param_enc:named_curve',
+    'ecdsa-p384': '-algorithm EC -pkeyopt ec_paramgen_curve:P-384 -pkeyopt ec_param_enc:named_curve',
+    'ed25519': '-algorithm ED25519',
+}
+
+SUBJECT_FIELDS = {
+    'C': NameOID.COUNTRY_NAME,
+    'ST': NameOID.STATE_OR_PROVINCE_NAME,
+    'L': NameOID.LOCALITY_NAME,
+    'O': NameOID.ORGANIZATION_NAME,
+    'OU': NameOID.ORGANIZATIONAL_UNIT_NAME,
+    'CN': NameOID.COMMON_NAME,
+}
+
+_write_lock = Lock()  # keeps a key and its certificate from being replaced by two requests at once
+
+
+class CertificateError(Exception):
+    """Invalid parameters for key or certificate generation."""
+
+
+def load_config(path=DEFAULT_CONFIG):
+    """Read the subject and SANs from an openssl.cnf file.
+
+    Returns (subject, dns_names, ip_addresses) where subject maps the
+    req_distinguished_name keys (C, ST, ...) to their values.
+    """
+    sections = {}
+    current = None
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                current = sections.setdefault(line[1:-1].strip(), {})
+            elif '=' in line and current is not None:
+                key, value = line.split('=', 1)
+                current[key.strip()] = value.strip()
+    subject = {k: v for k, v in sections.get('req_distinguished_name', {}).items() if k in SUBJECT_FIELDS}
+    alt_names = sections.get('alt_names', {})
+    dns_names = [v for k, v in alt_names.items() if k.startswith('DNS.')]
+    ip_addresses = [v for k, v in alt_names.items() if k.startswith('IP.')]
+    return subject, dns_names, ip_addresses
+
+
+def generate_private_key(algorithm=DEFAULT_KEY_ALGORITHM):
+    """Generate a private key for one of KEY_ALGORITHMS."""
+    if algorithm in ('rsa2048', 'rsa3072', 'rsa4096'):
+        return rsa.generate_private_key(public_exponent=65537, key_size=int(algorithm[3:]))
+    if algorithm == 'ecdsa-p256':
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == 'ecdsa-p384':
+        return ec.generate_private_key(ec.SECP384R1())
+    if algorithm == 'ed25519':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise CertificateError(f"Unknown key algorithm {algorithm!r}, expected one of {', '.join(KEY_ALGORITHMS)}")
+
+
+def _signature_hash(key):
+    # Ed25519 signs the message itself; it takes no separate digest
+    return None if isinstance(key, ed25519.Ed25519PrivateKey) else hashes.SHA256()
+
+
+def build_name(subject):
+    return x509.Name([x509.NameAttribute(SUBJECT_FIELDS[k], v) for k, v in subject.items()])
+
+
+def _san(dns_names, ip_addresses):
+    return x509.SubjectAlternativeName(
+        [x509.DNSName(name) for name in dns_names] +
+        [x509.IPAddress(ipaddress.ip_address(ip)) for ip in ip_addresses])
+
+
+def _extensions(key, dns_names, ip_addresses):
+    """The v3_req extensions for RSA keys, v3_req_sig for keys that can only sign."""
+    is_rsa = isinstance(key, rsa.RSAPrivateKey)
+    return [
+        (x509.BasicConstraints(ca=False, path_length=None), False),
+        (x509.KeyUsage(digital_signature=True, content_commitment=is_rsa, key_encipherment=is_rsa,
+                       data_encipherment=False, key_agreement=False, key_cert_sign=False,
+                       crl_sign=False, encipher_only=False, decipher_only=False), False),
+        (x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH, ExtendedKeyUsageOID.CLIENT_AUTH]), False),
+        (_san(dns_names, ip_addresses), False),
+    ]
+
+
+def create_csr(key, subject=None, dns_names=None, ip_addresses=None, config=DEFAULT_CONFIG):
+    """Build a CSR for `key`; missing subject/SAN values come from the config file."""
+    subject, dns_names, ip_addresses = _defaults(subject, dns_names, ip_addresses, config)
+    builder = x509.CertificateSigningRequestBuilder().subject_name(build_name(subject))
+    for extension, critical in _extensions(key, dns_names, ip_addresses):
+        builder = builder.add_extension(extension, critical=critical)
+    return builder.sign(key, _signature_hash(key))
+
+
+def _builder(key, subject_name, issuer_name, days, not_after_limit=None):
+    if days < 1:
+        raise CertificateError("Validity must be at least one day")
+    now = datetime.datetime.now(datetime.timezone.utc)
+    not_after = now + datetime.timedelta(days=days)
+    if not_after_limit is not None:
+        not_after = min(not_after, not_after_limit)  # never outlive the issuer
+    return (x509.CertificateBuilder()
+            .subject_name(subject_name)
+            .issuer_name(issuer_name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(not_after))
+
+
+def self_signed_certificate(key, days=365, subject=None, dns_names=None, ip_addresses=None,
+                            config=DEFAULT_CONFIG):
+    """Issue a self-signed certificate for `key`, valid for `days` days from now."""
+    subject, dns_names, ip_addresses = _defaults(subject, dns_names, ip_addresses, config)
+    name = build_name(subject)
+    builder = _builder(key, name, name, days)
+    for extension, critical in _extensions(key, dns_names, ip_addresses):
+        builder = builder.add_extension(extension, critical=critical)
+    return builder.sign(key, _signature_hash(key))
+
+
+def signed_certificate(key, issuer_key, issuer_cert, days=365, subject=None, dns_names=None, ip_addresses=None,
+                       config=DEFAULT_CONFIG):
+    """Issue a leaf certificate for `key` signed by a CA (issuer_key / issuer_cert)."""
+    subject, dns_names, ip_addresses = _defaults(subject, dns_names, ip_addresses, config)
+    builder = _builder(key, build_name(subject), issuer_cert.subject, days, issuer_cert.not_valid_after_utc)
+    for extension, critical in _extensions(key, dns_names, ip_addresses):
+        builder = builder.add_extension(extension, critical=critical)
+    builder = builder.add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+    builder = builder.add_extension(
+        x509.AuthorityKeyIdentifier.from_issuer_public_key(issuer_key.public_key()), critical=False)
+    return builder.sign(issuer_key, _signature_hash(issuer_key))
+
+
+def ca_certificate(key, days=3650, subject=None, config=DEFAULT_CONFIG):
+    """Self-signed root certificate that may only sign leaf certificates (pathlen 0)."""
+    subject, _, _ = _defaults(subject, [], [], config)
+    name = build_name(subject)
+    public_key = key.public_key()
+    return (_builder(key, name, name, days)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True)
+            .add_extension(x509.KeyUsage(digital_signature=True, content_commitment=False, key_encipherment=False,
+                                         data_encipherment=False, key_agreement=False, key_cert_sign=True,
+                                         crl_sign=True, encipher_only=False, decipher_only=False), critical=True)
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key), critical=False)
+            .sign(key, _signature_hash(key)))
+
+
+def _defaults(subject, dns_names, ip_addresses, config):
+    if subject is None or dns_names is None or ip_addresses is None:
+        cfg_subject, cfg_dns, cfg_ips = load_config(config)
+        subject = cfg_subject if subject is None else subject
+        dns_names = cfg_dns if dns_names is None else dns_names
+        ip_addresses = cfg_ips if ip_addresses is None else ip_addresses
+    return subject, dns_names, ip_addresses
+
+
+def key_to_pem(key):
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption())
+
+
+def to_pem(obj):
+    """PEM encoding of a certificate or CSR."""
+    return obj.public_bytes(serialization.Encoding.PEM)
+
+
+def _atomic_write(path, data, mode=0o644):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def certificate_info(cert):
+    return {
+        'subject': cert.subject.rfc4514_string(),
+        'issuer': cert.issuer.rfc4514_string(),
+        'serial_number': format(cert.serial_number, 'x'),
+        'not_before': cert.not_valid_before_utc.isoformat(),
+        'not_after': cert.not_valid_after_utc.isoformat(),
+        'fingerprint_sha256': cert.fingerprint(hashes.SHA256()).hex(),
+    }
+
+
+def generate_certificate(days=365, algorithm=DEFAULT_KEY_ALGORITHM, out_dir=DEFAULT_CERT_DIR, name='server',
+                         write_csr=True, config=DEFAULT_CONFIG, key=None, ca=None, subject=None,
+                         dns_names=None, ip_addresses=None):
+    """Generate a key, CSR and certificate and write them to out_dir.
+
+    The certificate is self-signed, or signed by `ca` (a LocalCA) if given.
+    Pass `key` (e.g. from a KeyPool) to skip key generation and only sign.
+    The subject and SANs default to the config file's.
+
+    The files are written to temporary names and renamed into place under a
+    lock, so concurrent callers never leave a key next to another caller's
+    certificate. Returns the file paths plus the certificate's details.
+    """
+    subject, dns_names, ip_addresses = _defaults(subject, dns_names, ip_addresses, config)
+    if key is None:
+        key = generate_private_key(algorithm)
+    if ca is None:
+        cert = self_signed_certificate(key, days, subject, dns_names, ip_addresses)
+    else:
+        cert = ca.issue(key, days, subject, dns_names, ip_addresses)
+    csr = create_csr(key, subject, dns_names, ip_addresses) if write_csr else None
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        'key': os.path.join(out_dir, f'{name}.key'),
+        'certificate': os.path.join(out_dir, f'{name}.crt'),
+    }
+    if csr is not None:
+        paths['csr'] = os.path.join(out_dir, f'{name}.csr')
+    with _write_lock:
+        _atomic_write(paths['key'], key_to_pem(key), mode=0o600)
+        if csr is not None:
+            _atomic_write(paths['csr'], to_pem(csr))
+        _atomic_write(paths['certificate'], to_pem(cert))
+    info = certificate_info(cert)
+    info.update(algorithm=algorithm, files=paths)
+    return info
@@ -0,0 +1,244 @@
+"""Persistent SQLite index of the certificates under a directory.
+
+Listing thousands of certificates by parsing every PEM file is slow, so
+each certificate's details are stored once in `<cert_dir>/.cert_index.db`
+together with the file's mtime and size. `refresh()` only stats the files
+and re-parses the ones that are new or changed, and removes rows for files
+that are gone. Queries are paginated SQL over indexed columns, so they do
+not slow down as the directory grows.
+
+    index = CertIndex('certs')
+    index.start()  # refresh in the background every REFRESH_INTERVAL seconds
+    total, rows = index.query(limit=50, expiring_within=30)
+"""
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+from threading import Event, Lock, Thread
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+
+from common.cert_engine import DEFAULT_CERT_DIR, certificate_info
+
+INDEX_FILE = '.cert_index.db'
+REFRESH_INTERVAL = 5  # seconds between background scans for changed files
+CERT_SUFFIXES = ('.crt', '.pem')
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+SORT_COLUMNS = ('path', 'common_name', 'not_before', 'not_after', 'mtime_ns', 'serial_number')
+
+COLUMNS = ('path', 'mtime_ns', 'size', 'subject', 'common_name', 'issuer', 'dns_names', 'ip_addresses',
+           'serial_number', 'fingerprint_sha256', 'not_before', 'not_after', 'is_ca', 'error')
+UPSERT = f'INSERT OR REPLACE INTO certificates ({", ".join(COLUMNS)}) VALUES ({", ".join("?" for _ in COLUMNS)})'
+
+log = logging.getLogger('cert_index')
+
+
+def parse_certificate_file(path):
+    """The indexed fields of the first certificate in a PEM file."""
+    with open(path, 'rb') as f:
+        cert = x509.load_pem_x509_certificate(f.read())
+    info = certificate_info(cert)
+    try:
+        san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+        dns_names = san.get_values_for_type(x509.DNSName)
+        ip_addresses = [str(ip) for ip in san.get_values_for_type(x509.IPAddress)]
+    except x509.ExtensionNotFound:
+        dns_names, ip_addresses = [], []
+    try:
+        is_ca = cert.extensions.get_extension_for_class(x509.BasicConstraints).value.ca
+    except x509.ExtensionNotFound:
+        is_ca = False
+    common_names = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    return {
+        'subject': info['subject'],
+        'common_name': common_names[0].value if common_names else None,
+        'issuer': info['issuer'],
+        'dns_names': json.dumps(dns_names),
+        'ip_addresses': json.dumps(ip_addresses),
+        'serial_number': info['serial_number'],
+        'fingerprint_sha256': info['fingerprint_sha256'],
+        'not_before': info['not_before'],
+        'not_after': info['not_after'],
+        'is_ca': int(is_ca),
+        'error': None,
+    }
+
+
+class CertIndex:
+    """SQLite index of certificate files, updated incrementally from their mtimes."""
+
+    def __init__(self, cert_dir=DEFAULT_CERT_DIR, db_path=None, interval=REFRESH_INTERVAL):
+        self.cert_dir = cert_dir
+        self.db_path = db_path or os.path.join(cert_dir, INDEX_FILE)
+        self.interval = interval
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self.last_refresh = None
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS certificates (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER,
+            size INTEGER,
+            subject TEXT,
+            common_name TEXT,
+            issuer TEXT,
+            dns_names TEXT,
+            ip_addresses TEXT,
+            serial_number TEXT,
+            fingerprint_sha256 TEXT,
+            not_before TEXT,
+            not_after TEXT,
+            is_ca INTEGER,
+            error TEXT
+        )''')
+        for column in ('not_after', 'not_before', 'common_name', 'serial_number', 'mtime_ns'):
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_certificates_{column} ON certificates ({column})')
+        self._conn.commit()
+
+    def _scan(self):
+        """Yield (relative path, stat) for every certificate file under cert_dir."""
+        stack = [self.cert_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(CERT_SUFFIXES) and entry.is_file():
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue  # removed while scanning
+                    yield os.path.relpath(entry.path, self.cert_dir), st
+
+    def refresh(self):
+        """Bring the index up to date; returns counts of added/updated/removed files."""
+        with self._lock:
+            known = {path: (mtime, size) for path, mtime, size in
+                     self._conn.execute('SELECT path, mtime_ns, size FROM certificates')}
+        changed, seen = [], set()
+        for path, st in self._scan():
+            seen.add(path)
+            if known.get(path) != (st.st_mtime_ns, st.st_size):
+                changed.append((path, st))
+        removed = [path for path in known if path not in seen]
+        rows = [self._row(path, st) for path, st in changed]
+        with self._lock:
+            self._conn.executemany(UPSERT, rows)
+            self._conn.executemany('DELETE FROM certificates WHERE path = ?', [(path,) for path in removed])
+            self._conn.commit()
+        self.last_refresh = datetime.datetime.now().isoformat(timespec='seconds')
+        added = sum(1 for path, _ in changed if path not in known)
+        return {'added': added, 'updated': len(changed) - added, 'removed': len(removed), 'total': len(seen)}
+
+    def update(self, paths):
+        """Index the given files right away (e.g. just after writing them)."""
+        rows = []
+        for path in paths:
+            relative = os.path.relpath(path, self.cert_dir)
+            try:
+                rows.append(self._row(relative, os.stat(path)))
+            except OSError:
+                continue
+        with self._lock:
+            self._conn.executemany(UPSERT, rows)
+            self._conn.commit()
+
+    def _row(self, path, st):
+        try:
+            fields = parse_certificate_file(os.path.join(self.cert_dir, path))
+        except (OSError, ValueError) as e:
+            # Remember unreadable files too, so they are not re-parsed on every scan
+            fields = dict.fromkeys(COLUMNS[3:])
+            fields['error'] = str(e)
+        return (path, st.st_mtime_ns, st.st_size) + tuple(fields[c] for c in COLUMNS[3:])
+
+    def query(self, limit=PAGE_SIZE, offset=0, sort='not_after', descending=False, expiring_within=None,
+              expired=None, search=None):
+        """Return (total, rows) for one page of certificates.
+
+        expiring_within=N keeps certificates that are still valid but expire
+        within N days; expired=True/False keeps only expired/unexpired ones;
+        search matches the path, common name or serial number.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+        # Same format as the stored not_after values, so they compare as strings
+        now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        where, params = ['not_after IS NOT NULL'], []  # unreadable files have no not_after
+        if expiring_within is not None:
+            where.append('not_after >= ? AND not_after <= ?')
+            params += [now.isoformat(), (now + datetime.timedelta(days=float(expiring_within))).isoformat()]
+        if expired is not None:
+            where.append('not_after < ?' if expired else 'not_after >= ?')
+            params.append(now.isoformat())
+        if search:
+            where.append('(path LIKE ? OR common_name LIKE ? OR serial_number = ?)')
+            params += [f'%{search}%', f'%{search}%', search.lower()]
+        clause = ' AND '.join(where)
+        order = 'DESC' if descending else 'ASC'
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM certificates WHERE {clause}', params).fetchone()[0]
+            cursor = self._conn.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM certificates WHERE {clause} '
+                f'ORDER BY {sort} {order}, path LIMIT ? OFFSET ?', params + [limit, offset])
+            rows = [self._to_dict(row, now) for row in cursor]
+        return total, rows
+
+    def get(self, path):
+        with self._lock:
+            row = self._conn.execute(f'SELECT {", ".join(COLUMNS)} FROM certificates WHERE path = ?',
+                                     (path,)).fetchone()
+        return self._to_dict(row, datetime.datetime.now(datetime.timezone.utc)) if row else None
+
+    @staticmethod
+    def _to_dict(row, now):
+        entry = dict(zip(COLUMNS, row))
+        for key in ('dns_names', 'ip_addresses'):
+            entry[key] = json.loads(entry[key]) if entry[key] else []
+        entry['is_ca'] = bool(entry['is_ca'])
+        if entry['not_after']:
+            remaining = datetime.datetime.fromisoformat(entry['not_after']) - now
+            entry['days_remaining'] = remaining.days
+        return entry
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="cert-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                log.warning("Certificate index refresh failed: %s", e)
+            if self.interval <= 0 or self._stop.wait(self.interval):
+                return
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,157 @@
+"""Length-prefixed wire protocol shared by the TLS server and client.
+
+Every frame is a 5-byte header followed by the payload:
+
+    +--------+-----------------+-------------------+
+    | type 1B| length 4B (BE)  | payload (length)  |
+    +--------+-----------------+-------------------+
+
+DATA payloads are UTF-8 chat text, PING frames are keepalives with an empty
+payload, and CONTROL frames carry small JSON documents.
+"""
+
+import asyncio
+import struct
+
+DATA = 1
+PING = 2
+CONTROL = 3
+FRAME_TYPES = (DATA, PING, CONTROL)
+
+HEADER = struct.Struct('!BI')
+HEADER_SIZE = HEADER.size
+MAX_FRAME_SIZE = 64 * 1024 * 1024  # refuse anything larger than 64 MiB
+READ_BUFFER_SIZE = 256 * 1024
+SMALL_FRAME = 16 * 1024  # below this, header and payload go out in one send
+
+
+class FrameError(Exception):
+    """The peer sent something that is not a valid frame."""
+
+
+def encode_frame(frame_type, payload=b''):
+    """Return header + payload as one bytes object (encode once, send to many)."""
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+
+def send_frame(sock, frame_type, payload=b''):
+    """Send one frame; large payloads are sent without copying them into the header."""
+    if len(payload) <= SMALL_FRAME:
+        sock.sendall(encode_frame(frame_type, payload))
+    else:
+        sock.sendall(HEADER.pack(frame_type, len(payload)))
+        sock.sendall(payload)
+
+
+def _check_header(frame_type, length, max_frame):
+    if frame_type not in FRAME_TYPES:
+        raise FrameError(f"unknown frame type {frame_type}")
+    if length > max_frame:
+        raise FrameError(f"frame of {length} bytes exceeds limit of {max_frame}")
+
+
+class FrameReader:
+    """Reads frames from a blocking socket with `recv_into` and one reusable buffer.
+
+    Frames that fit in the buffer are returned as a memoryview into it, which
+    stays valid only until the next `read_frame` call. Larger frames are read
+    straight into a bytearray of exactly their size, so multi-MB payloads are
+    copied once and never decoded chunk by chunk.
+
+    A socket timeout can interrupt `read_frame` at any point; calling it
+    again resumes the partially read frame.
+    """
+
+    def __init__(self, sock, buffer_size=READ_BUFFER_SIZE, max_frame=MAX_FRAME_SIZE):
+        self.sock = sock
+        self.max_frame = max_frame
+        self.buf = bytearray(buffer_size)
+        self.view = memoryview(self.buf)
+        self.start = 0
+        self.end = 0
+        self._large = None  # [frame_type, payload view, bytes read] while reading a large frame
+        self.bytes_read = 0
+
+    def _fill(self):
+        if self.end == len(self.buf):
+            # Move the unread tail to the front to make room
+            pending = self.end - self.start
+            self.buf[:pending] = self.view[self.start:self.end]
+            self.start, self.end = 0, pending
+        n = self.sock.recv_into(self.view[self.end:])
+        if n == 0:
+            return False
+        self.end += n
+        self.bytes_read += n
+        return True
+
+    def read_frame(self):
+        """Return (frame_type, payload) or None if the peer closed between frames."""
+        if self._large is not None:
+            return self._finish_large()
+
+        while self.end - self.start < HEADER_SIZE:
+            if not self._fill():
+                if self.end == self.start:
+                    return None
+                raise FrameError("connection closed inside a frame header")
+
+        frame_type, length = HEADER.unpack_from(self.buf, self.start)
+        _check_header(frame_type, length, self.max_frame)
+        total = HEADER_SIZE + length
+
+        if total > len(self.buf):
+            payload = memoryview(bytearray(length))
+            have = self.end - self.start - HEADER_SIZE
+            payload[:have] = self.view[self.start + HEADER_SIZE:self.end]
+            self.start = self.end = 0
+            self._large = [frame_type, payload, have]
+            return self._finish_large()
+
+        if self.start + total > len(self.buf):
+            pending = self.end - self.start
+            self.buf[:pending] = self.view[self.start:self.end]
+            self.start, self.end = 0, pending
+        while self.end - self.start < total:
+            if not self._fill():
+                raise FrameError("connection closed inside a frame")
+        payload = self.view[self.start + HEADER_SIZE:self.start + total]
+        self.start += total
+        if self.start == self.end:
+            self.start = self.end = 0
+        return frame_type, payload
+
+    def _finish_large(self):
+        frame_type, payload, pos = self._large
+        length = len(payload)
+        while pos < length:
+            n = self.sock.recv_into(payload[pos:])
+            if n == 0:
+                self._large = None
+                raise FrameError("connection closed inside a frame")
+            pos += n
+            self.bytes_read += n
+            self._large[2] = pos
+        self._large = None
+        return frame_type, payload
+
+
+async def read_frame_async(reader, max_frame=MAX_FRAME_SIZE, idle_timeout=None):
+    """Read one frame from an asyncio StreamReader; returns None on a clean EOF.
+
+    idle_timeout only applies while waiting for the next header, so a timeout
+    (asyncio.TimeoutError) never leaves a frame half consumed.
+    """
+    try:
+        header = await asyncio.wait_for(reader.readexactly(HEADER_SIZE), idle_timeout)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise FrameError("connection closed inside a frame header")
+    frame_type, length = HEADER.unpack(header)
+    _check_header(frame_type, length, max_frame)
+    try:
+        payload = await reader.readexactly(length) if length else b''
+    except asyncio.IncompleteReadError:
+        raise FrameError("connection closed inside a frame")
+    return frame_type, payload
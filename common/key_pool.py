@@ -0,0 +1,191 @@
+"""Pool of pre-generated private keys so issuance only has to sign.
+
+Refill threads keep up to `size` ready keys per algorithm (key generation
+in `cryptography` releases the GIL, so request threads keep running).
+`get()` pops a key, which is never handed out twice; if the pool is empty
+the key is generated inline and counted as a miss.
+
+Keys normally live only in memory. With `persist_dir` and a passphrase,
+unused keys are saved on `stop()` as encrypted PKCS#8 files (0600 in a
+0700 directory) and loaded back, and deleted, on the next `start()`.
+Without a passphrase nothing is written to disk.
+"""
+
+import os
+import time
+from collections import deque
+from threading import Thread, Condition
+
+from cryptography.hazmat.primitives import serialization
+
+from common.cert_engine import DEFAULT_KEY_ALGORITHM, KEY_ALGORITHMS, generate_private_key
+
+POOL_SIZE = 8  # ready keys per algorithm
+
+
+class KeyPool:
+    """Bounded per-algorithm pool of ready private keys with background refill."""
+
+    def __init__(self, algorithms=(DEFAULT_KEY_ALGORITHM,), size=POOL_SIZE, workers=1,
+                 persist_dir=None, passphrase=None):
+        for algorithm in algorithms:
+            if algorithm not in KEY_ALGORITHMS:
+                raise ValueError(f"Unknown key algorithm {algorithm!r}")
+        self.size = size
+        self.workers = workers
+        self.persist_dir = persist_dir if passphrase else None
+        self.passphrase = passphrase.encode() if isinstance(passphrase, str) else passphrase
+        self._keys = {algorithm: deque() for algorithm in algorithms}
+        self._taken_at = {algorithm: deque() for algorithm in algorithms}  # pops not yet replaced
+        self._generating = {algorithm: 0 for algorithm in algorithms}
+        self._cond = Condition()
+        self._threads = []
+        self._running = False
+        self.stats = {algorithm: {
+            'hits': 0,
+            'misses': 0,
+            'generated': 0,
+            'keygen_seconds': 0.0,
+            'refill_lag_total': 0.0,
+            'refill_lag_max': 0.0,
+            'refills': 0,
+        } for algorithm in algorithms}
+        self.unpooled = 0
+
+    @property
+    def enabled(self):
+        return self.size > 0 and bool(self._keys)
+
+    def start(self):
+        if not self.enabled or self._running:
+            return
+        self._running = True
+        self._load()
+        for i in range(self.workers):
+            thread = Thread(target=self._run, name=f"key-pool-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        self._save()
+
+    def get(self, algorithm=DEFAULT_KEY_ALGORITHM):
+        """Return a private key that has never been handed out before."""
+        if algorithm not in self._keys or not self.enabled:
+            self.unpooled += 1
+            return generate_private_key(algorithm)
+        with self._cond:
+            keys = self._keys[algorithm]
+            taken = self._taken_at[algorithm]
+            taken.append(time.monotonic())
+            if len(taken) > self.size:
+                taken.popleft()  # more misses than the pool holds; only the last `size` can be refilled
+            self._cond.notify()
+            if keys:
+                self.stats[algorithm]['hits'] += 1
+                return keys.popleft()
+            self.stats[algorithm]['misses'] += 1
+        return generate_private_key(algorithm)
+
+    def _next_deficit(self):
+        """The algorithm furthest below its target size (caller holds the lock)."""
+        best, best_deficit = None, 0
+        for algorithm, keys in self._keys.items():
+            deficit = self.size - len(keys) - self._generating[algorithm]
+            if deficit > best_deficit:
+                best, best_deficit = algorithm, deficit
+        return best
+
+    def _run(self):
+        while True:
+            with self._cond:
+                algorithm = self._next_deficit()
+                while self._running and algorithm is None:
+                    self._cond.wait()
+                    algorithm = self._next_deficit()
+                if not self._running:
+                    return
+                self._generating[algorithm] += 1
+            start = time.monotonic()
+            try:
+                key = generate_private_key(algorithm)
+            finally:
+                with self._cond:
+                    self._generating[algorithm] -= 1
+            now = time.monotonic()
+            with self._cond:
+                self._keys[algorithm].append(key)
+                stats = self.stats[algorithm]
+                stats['generated'] += 1
+                stats['keygen_seconds'] += now - start
+                taken = self._taken_at[algorithm]
+                if taken:
+                    # Refill lag: how long the pool was one key short
+                    lag = now - taken.popleft()
+                    stats['refills'] += 1
+                    stats['refill_lag_total'] += lag
+                    stats['refill_lag_max'] = max(stats['refill_lag_max'], lag)
+
+    def metrics(self):
+        with self._cond:
+            per_algorithm = {}
+            for algorithm, stats in self.stats.items():
+                requests = stats['hits'] + stats['misses']
+                per_algorithm[algorithm] = {
+                    'ready': len(self._keys[algorithm]),
+                    'target': self.size,
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'hit_rate': round(stats['hits'] / requests, 4) if requests else None,
+                    'generated': stats['generated'],
+                    'avg_keygen_ms': round(stats['keygen_seconds'] / stats['generated'] * 1000, 2)
+                    if stats['generated'] else None,
+                    'avg_refill_lag_ms': round(stats['refill_lag_total'] / stats['refills'] * 1000, 2)
+                    if stats['refills'] else None,
+                    'max_refill_lag_ms': round(stats['refill_lag_max'] * 1000, 2),
+                }
+        return {'running': self._running, 'persistent': self.persist_dir is not None,
+                'unpooled': self.unpooled, 'algorithms': per_algorithm}
+
+    def _save(self):
+        if self.persist_dir is None:
+            return
+        os.makedirs(self.persist_dir, mode=0o700, exist_ok=True)
+        encryption = serialization.BestAvailableEncryption(self.passphrase)
+        with self._cond:
+            pending = {algorithm: list(keys) for algorithm, keys in self._keys.items()}
+            for keys in self._keys.values():
+                keys.clear()
+        for algorithm, keys in pending.items():
+            for i, key in enumerate(keys):
+                pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, encryption)
+                path = os.path.join(self.persist_dir, f"{algorithm}-{time.time_ns()}-{i}.pem")
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(pem)
+
+    def _load(self):
+        if self.persist_dir is None or not os.path.isdir(self.persist_dir):
+            return
+        for filename in sorted(os.listdir(self.persist_dir)):
+            algorithm = filename.rsplit('-', 2)[0]
+            path = os.path.join(self.persist_dir, filename)
+            try:
+                with open(path, 'rb') as f:
+                    pem = f.read()
+            finally:
+                # Delete before use so a key can never be issued twice
+                os.unlink(path)
+            if algorithm not in self._keys or len(self._keys[algorithm]) >= self.size:
+                continue
+            try:
+                key = serialization.load_pem_private_key(pem, password=self.passphrase)
+            except (ValueError, TypeError):
+                continue  # wrong passphrase or damaged file
+            self._keys[algorithm].append(key)
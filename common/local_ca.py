@@ -0,0 +1,86 @@
+"""Local certificate authority for issuing leaf certificates.
+
+The root is created once (certs/ca.crt and certs/ca.key). After that its
+key stays loaded in the LocalCA object, so issuing a leaf costs one
+signature. Clients trust ca.crt instead of pinning server.crt, so
+rotating the server certificate never touches them.
+"""
+
+import os
+from threading import Lock
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.x509 import load_pem_x509_certificate
+
+from common.cert_engine import (DEFAULT_CERT_DIR, DEFAULT_CONFIG, _atomic_write, ca_certificate,
+                                generate_private_key, key_to_pem, load_config, signed_certificate, to_pem)
+
+CA_ALGORITHM = 'ecdsa-p256'
+CA_DAYS = 3650
+CA_COMMON_NAME = 'CNS Educational Project Local CA'
+
+
+def ca_paths(cert_dir=DEFAULT_CERT_DIR):
+    return os.path.join(cert_dir, 'ca.crt'), os.path.join(cert_dir, 'ca.key')
+
+
+class LocalCA:
+    """A root CA whose key is kept in memory for issuing leaf certificates."""
+
+    def __init__(self, key, certificate, cert_path=None):
+        self.key = key
+        self.certificate = certificate
+        self.cert_path = cert_path
+        self.issued = 0
+        self._lock = Lock()
+
+    @classmethod
+    def create(cls, cert_dir=DEFAULT_CERT_DIR, algorithm=CA_ALGORITHM, days=CA_DAYS, passphrase=None,
+               config=DEFAULT_CONFIG):
+        """Create a new root and write ca.crt and ca.key (0600, encrypted if a passphrase is given)."""
+        subject, _, _ = load_config(config)
+        subject = dict(subject, CN=CA_COMMON_NAME)
+        key = generate_private_key(algorithm)
+        certificate = ca_certificate(key, days, subject)
+        cert_path, key_path = ca_paths(cert_dir)
+        os.makedirs(cert_dir, exist_ok=True)
+        if passphrase:
+            key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                        serialization.BestAvailableEncryption(_bytes(passphrase)))
+        else:
+            key_pem = key_to_pem(key)
+        _atomic_write(key_path, key_pem, mode=0o600)
+        _atomic_write(cert_path, to_pem(certificate))
+        return cls(key, certificate, cert_path)
+
+    @classmethod
+    def load(cls, cert_dir=DEFAULT_CERT_DIR, passphrase=None):
+        cert_path, key_path = ca_paths(cert_dir)
+        with open(cert_path, 'rb') as f:
+            certificate = load_pem_x509_certificate(f.read())
+        with open(key_path, 'rb') as f:
+            key = serialization.load_pem_private_key(f.read(), password=_bytes(passphrase) if passphrase else None)
+        return cls(key, certificate, cert_path)
+
+    @classmethod
+    def load_or_create(cls, cert_dir=DEFAULT_CERT_DIR, algorithm=CA_ALGORITHM, passphrase=None):
+        cert_path, key_path = ca_paths(cert_dir)
+        if os.path.exists(cert_path) and os.path.exists(key_path):
+            return cls.load(cert_dir, passphrase)
+        return cls.create(cert_dir, algorithm, passphrase=passphrase)
+
+    def issue(self, key, days=365, subject=None, dns_names=None, ip_addresses=None):
+        """Sign a leaf certificate for `key`; it never outlives the CA."""
+        certificate = signed_certificate(key, self.key, self.certificate, days, subject, dns_names, ip_addresses)
+        with self._lock:
+            self.issued += 1
+        return certificate
+
+    @property
+    def bundle_pem(self):
+        """The CA certificate clients should trust."""
+        return to_pem(self.certificate)
+
+
+def _bytes(passphrase):
+    return passphrase.encode() if isinstance(passphrase, str) else passphrase
@@ -0,0 +1,266 @@
+"""Certificate revocation: a revoked-serial list, CRLs and a fast lookup set.
+
+Revoked serials are appended to certs/revoked.txt, one per line:
+
+    <serial hex>\t<revoked at, ISO 8601 UTC>\t<reason>\t<file>
+
+Revocations publishes them as CRLs signed by the local CA. A full (base)
+CRL is only re-signed once the revocations since the last base exceed
+DELTA_LIMIT. Until then each revocation re-signs just a small delta CRL
+(certs/ca-delta.crl, RFC 5280 section 5.2.4) that lists what the base
+does not. The revoked-certificate entries are built once and reused by
+every base rebuild. Either CRL is re-signed when it is read after half of
+its validity has passed, so a published CRL never reaches its nextUpdate.
+
+RevokedSerialSet is the reader side used by the TLS servers: an in-memory
+set of serial numbers that picks up appended lines by reading only the
+new part of the file, so a lookup is one hash probe.
+"""
+
+import datetime
+import os
+import time
+from threading import Lock
+
+from cryptography import x509
+
+from common.cert_engine import DEFAULT_CERT_DIR, _atomic_write, _signature_hash, to_pem
+
+REVOKED_FILE = 'revoked.txt'
+BASE_CRL_FILE = 'ca.crl'
+DELTA_CRL_FILE = 'ca-delta.crl'
+DELTA_LIMIT = 1000  # revocations carried in the delta CRL before the base CRL is re-signed
+BASE_CRL_DAYS = 7
+DELTA_CRL_DAYS = 1
+CHECK_INTERVAL = 1.0  # seconds between checks of revoked.txt for new lines
+
+REASONS = {flag.value: flag for flag in x509.ReasonFlags}
+
+
+def parse_line(line):
+    """(serial, revoked_at, reason, path) from one line of revoked.txt, or None."""
+    fields = line.rstrip('\n').split('\t')
+    try:
+        serial = int(fields[0], 16)
+    except ValueError:
+        return None
+    revoked_at = fields[1] if len(fields) > 1 else None
+    reason = fields[2] if len(fields) > 2 and fields[2] else None
+    path = fields[3] if len(fields) > 3 and fields[3] else None
+    return serial, revoked_at, reason, path
+
+
+def _der_header(der, pos):
+    tag, length = der[pos], der[pos + 1]
+    pos += 2
+    if length & 0x80:
+        size = length & 0x7f
+        length = int.from_bytes(der[pos:pos + size], 'big')
+        pos += size
+    return tag, length, pos
+
+
+def serial_from_der(der):
+    """Serial number of a DER certificate, read without decoding the rest of it.
+
+    Much cheaper per handshake than SSLSocket.getpeercert(), which decodes
+    the whole certificate into a dict.
+    """
+    _, _, pos = _der_header(der, 0)  # Certificate
+    _, _, pos = _der_header(der, pos)  # TBSCertificate
+    tag, length, pos = _der_header(der, pos)
+    if tag == 0xa0:  # [0] version, absent in v1 certificates
+        tag, length, pos = _der_header(der, pos + length)
+    if tag != 0x02:
+        raise ValueError("Not an X.509 certificate")
+    return int.from_bytes(der[pos:pos + length], 'big')
+
+
+class Revocations:
+    """Records revocations and keeps the CA's base and delta CRLs up to date."""
+
+    def __init__(self, ca, cert_dir=DEFAULT_CERT_DIR, delta_limit=DELTA_LIMIT):
+        self.ca = ca
+        self.cert_dir = cert_dir
+        self.delta_limit = delta_limit
+        self.path = os.path.join(cert_dir, REVOKED_FILE)
+        self.base_path = os.path.join(cert_dir, BASE_CRL_FILE)
+        self.delta_path = os.path.join(cert_dir, DELTA_CRL_FILE)
+        self._lock = Lock()
+        self._entries = {}  # serial -> x509.RevokedCertificate, in revocation order
+        self._in_base = set()
+        self._pending = []  # entries revoked since the base CRL, i.e. the delta CRL
+        self.base_number = None
+        self.crl_number = 0
+        self.last_build = None
+        self._base_refresh_at = None  # halfway to each CRL's nextUpdate
+        self._delta_refresh_at = None
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    parsed = parse_line(line)
+                    if parsed and parsed[0] not in self._entries:
+                        self._entries[parsed[0]] = self._revoked_entry(*parsed[:3])
+        for crl_path in (self.base_path, self.delta_path):
+            if os.path.exists(crl_path):
+                with open(crl_path, 'rb') as f:
+                    crl = x509.load_pem_x509_crl(f.read())
+                number = crl.extensions.get_extension_for_class(x509.CRLNumber).value.crl_number
+                self.crl_number = max(self.crl_number, number)
+                refresh_at = crl.last_update_utc + (crl.next_update_utc - crl.last_update_utc) / 2
+                if crl_path == self.base_path:
+                    self.base_number = number
+                    self._in_base = {entry.serial_number for entry in crl}
+                    self._base_refresh_at = refresh_at
+                else:
+                    self._delta_refresh_at = refresh_at
+        self._pending = [entry for serial, entry in self._entries.items() if serial not in self._in_base]
+
+    @staticmethod
+    def _revoked_entry(serial, revoked_at, reason):
+        when = (datetime.datetime.fromisoformat(revoked_at) if revoked_at
+                else datetime.datetime.now(datetime.timezone.utc))
+        builder = x509.RevokedCertificateBuilder().serial_number(serial).revocation_date(when)
+        if reason in REASONS and reason != 'unspecified':
+            builder = builder.add_extension(x509.CRLReason(REASONS[reason]), critical=False)
+        return builder.build()
+
+    def __contains__(self, serial):
+        return serial in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def revoke(self, serial, reason=None, path=None):
+        """Record a revocation and publish the updated CRL. Returns False if already revoked."""
+        if reason is not None and reason not in REASONS:
+            raise ValueError(f"Unknown revocation reason {reason!r}, expected one of {', '.join(REASONS)}")
+        with self._lock:
+            if serial in self._entries:
+                return False
+            revoked_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat()
+            with open(self.path, 'a') as f:
+                f.write(f"{serial:x}\t{revoked_at}\t{reason or ''}\t{path or ''}\n")
+            entry = self._entries[serial] = self._revoked_entry(serial, revoked_at, reason)
+            self._pending.append(entry)
+            self._publish()
+        return True
+
+    def publish(self, full=False):
+        """Write the CRLs now; full=True always re-signs the base CRL."""
+        with self._lock:
+            self._publish(full)
+
+    def refresh(self):
+        """Re-sign the CRLs that are past half of their validity. Returns True if any were."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            if self.base_number is None:
+                return False  # nothing revoked yet, so nothing published
+            if self._base_refresh_at is None or now >= self._base_refresh_at:
+                self._publish(full=True)
+            elif self._delta_refresh_at is None or now >= self._delta_refresh_at:
+                self._publish()
+            else:
+                return False
+        return True
+
+    def _publish(self, full=False):
+        start = time.perf_counter()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.crl_number += 1
+        if full or self.base_number is None or len(self._pending) > self.delta_limit:
+            kind, signed = 'base', len(self._entries)
+            _atomic_write(self.base_path, to_pem(self._sign(list(self._entries.values()), BASE_CRL_DAYS)))
+            self.base_number = self.crl_number
+            self._base_refresh_at = now + datetime.timedelta(days=BASE_CRL_DAYS) / 2
+            self._in_base = set(self._entries)
+            self._pending = []
+        else:
+            kind, signed = 'delta', len(self._pending)
+        # A base and delta issued together share one CRL number (RFC 5280 5.2.4);
+        # after a base rebuild the delta is empty
+        delta = self._sign(self._pending, DELTA_CRL_DAYS, delta_of=self.base_number)
+        _atomic_write(self.delta_path, to_pem(delta))
+        self._delta_refresh_at = now + datetime.timedelta(days=DELTA_CRL_DAYS) / 2
+        self.last_build = {'kind': kind, 'entries': signed, 'crl_number': self.crl_number,
+                           'ms': round((time.perf_counter() - start) * 1000, 2)}
+
+    def _sign(self, entries, days, delta_of=None):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        extensions = [
+            x509.Extension(x509.CRLNumber.oid, False, x509.CRLNumber(self.crl_number)),
+            x509.Extension(x509.AuthorityKeyIdentifier.oid, False,
+                           x509.AuthorityKeyIdentifier.from_issuer_public_key(self.ca.key.public_key())),
+        ]
+        if delta_of is not None:
+            extensions.append(x509.Extension(x509.DeltaCRLIndicator.oid, True, x509.DeltaCRLIndicator(delta_of)))
+        # Pass the entries in one list: add_revoked_certificate() copies the list on
+        # every call, which is quadratic for a large CRL
+        builder = x509.CertificateRevocationListBuilder(
+            issuer_name=self.ca.certificate.subject, last_update=now,
+            next_update=now + datetime.timedelta(days=days), extensions=extensions,
+            revoked_certificates=entries)
+        return builder.sign(self.ca.key, _signature_hash(self.ca.key))
+
+    def crl_pem(self, delta=False):
+        self.refresh()
+        with open(self.delta_path if delta else self.base_path, 'rb') as f:
+            return f.read()
+
+    def metrics(self):
+        return {'revoked': len(self._entries), 'in_delta_crl': len(self._pending), 'base_crl_number': self.base_number,
+                'crl_number': self.crl_number, 'delta_limit': self.delta_limit, 'last_build': self.last_build}
+
+
+class RevokedSerialSet:
+    """In-memory set of revoked serial numbers that follows revoked.txt as it grows."""
+
+    def __init__(self, path=os.path.join(DEFAULT_CERT_DIR, REVOKED_FILE), interval=CHECK_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.serials = set()
+        self._inode = None
+        self._offset = 0
+        self._checked = 0.0
+        self._lock = Lock()
+        self.reloads = 0
+        self.refresh()
+
+    def refresh(self):
+        """Read lines appended since the last call; start over if the file was replaced."""
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self.serials, self._inode, self._offset = set(), None, 0
+                return
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self.serials, self._inode, self._offset = set(), st.st_ino, 0
+                self.reloads += 1
+            if st.st_size == self._offset:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+            end = data.rfind(b'\n') + 1  # a partly written last line is read next time
+            serials = set()
+            for line in data[:end].decode('utf-8', 'replace').splitlines():
+                parsed = parse_line(line)
+                if parsed:
+                    serials.add(parsed[0])
+            self.serials |= serials
+            self._offset += end
+
+    def is_revoked(self, serial):
+        """O(1) membership test; re-checks the file at most every `interval` seconds."""
+        if time.monotonic() - self._checked >= self.interval:
+            self.refresh()
+        return serial in self.serials
+
+    def __len__(self):
+        return len(self.serials)
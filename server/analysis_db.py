@@ -1,58 +1,109 @@
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import defaultdict
 import time
 import threading
+import atexit
 from contextlib import contextmanager
+from metrics import REGISTRY
 
 DB_PATH = 'analysis_data.db'
 MAX_RETRIES = 3
 RETRY_DELAY = 0.1  # seconds
 
+# Write-behind: rows are buffered and committed together every
+# WRITE_BATCH_SIZE rows or FLUSH_INTERVAL_MS milliseconds, whichever first.
+# batch_size=1 or flush_interval_ms=0 commits every row immediately.
+WRITE_BATCH_SIZE = 100
+FLUSH_INTERVAL_MS = 200
+
+# Connection tuning. synchronous=NORMAL is safe with WAL: a crash can lose
+# the last commits but never corrupts the database.
+PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,  # negative means KiB, so 16 MB
+    'mmap_size': 64 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Rollup buckets are ISO timestamp prefixes: '2026-01-31T14:05', '2026-01-31T14', '2026-01-31'
+ROLLUP_PREFIX = {'minute': 16, 'hour': 13, 'day': 10}
+MINUTE_ROLLUP_RETENTION_DAYS = 7  # older minute buckets are compacted away; hour/day are kept
+
+READ_CHUNK_SIZE = 5000  # rows fetched per query by the streaming loaders
+
+INSERT_MESSAGE = 'INSERT INTO messages (client_address, message, timestamp) VALUES (?, ?, ?)'
+INSERT_CONNECTION = 'INSERT INTO connections (client_address, event, timestamp) VALUES (?, ?, ?)'
+
+INSERT_SECONDS = REGISTRY.histogram('analysis_db_insert_seconds', 'Time to insert one batch of rows and update the rollups')
+COMMIT_SECONDS = REGISTRY.histogram('analysis_db_commit_seconds', 'Time to commit one batch of rows')
+ROWS_WRITTEN = REGISTRY.counter('analysis_db_rows_written_total', 'Messages and connection events committed')
+
+
 class AnalysisDB:
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=DB_PATH, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval_ms=FLUSH_INTERVAL_MS, pragmas=None):
         self.db_path = db_path
-        self._lock = threading.Lock()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.pragmas = dict(PRAGMAS, **(pragmas or {}))
+        self._lock = threading.Lock()  # guards the writer connection and pending rows
+        self._local = threading.local()  # per-thread reader connections
+        self._writer = None
+        self._pending_messages = []
+        self._pending_connections = []
+        self._closed = threading.Event()
+        self._flusher = None
         self._init_db()
+        if self.flush_interval > 0 and self.batch_size > 1:
+            self._flusher = threading.Thread(target=self._flush_loop, name="analysis-db-flush", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
 
     def _init_db(self):
         """Initialize the database with proper settings."""
         try:
-            with self._get_connection() as conn:
-                conn.execute('PRAGMA journal_mode=WAL')  # Use Write-Ahead Logging
-                conn.execute('PRAGMA busy_timeout=5000')  # 5 second timeout
-                self.create_tables(conn)
+            self._writer = self._connect()
+            self._writer.execute('PRAGMA journal_mode=WAL')  # Use Write-Ahead Logging
+            self.create_tables(self._writer)
+            c = self._writer.cursor()
+            if (c.execute('SELECT 1 FROM message_rollups LIMIT 1').fetchone() is None
+                    and c.execute('SELECT 1 FROM messages LIMIT 1').fetchone() is not None):
+                self.rebuild_rollups()
         except Exception as e:
             print(f"Error initializing database: {e}")
             raise
 
+    def _connect(self):
+        """Open a tuned database connection with retry logic."""
+        for attempt in range(MAX_RETRIES):
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+                conn.execute('PRAGMA busy_timeout=5000')  # 5 second timeout
+                for name, value in self.pragmas.items():
+                    conn.execute(f'PRAGMA {name}={value}')
+                return conn
+            except sqlite3.OperationalError:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(RETRY_DELAY)
+            except Exception as e:
+                print(f"Unexpected error during database connection: {e}")
+                raise
+
     @contextmanager
     def _get_connection(self):
-        """Get a database connection with retry logic."""
-        conn = None
-        try:
-            for attempt in range(MAX_RETRIES):
-                try:
-                    conn = sqlite3.connect(self.db_path, timeout=5.0)
-                    yield conn
-                    return
-                except sqlite3.OperationalError as e:
-                    if attempt == MAX_RETRIES - 1:
-                        raise
-                    time.sleep(RETRY_DELAY)
-                except Exception as e:
-                    print(f"Unexpected error during database connection: {e}")
-                    raise
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except Exception as e:
-                    print(f"Error closing database connection: {e}")
+        """Get this thread's long-lived reader connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        yield conn
 
     def create_tables(self, conn=None):
         """Create the necessary tables if they don't exist."""
         try:
-            with self._get_connection() as conn:
+            conn = conn or self._writer
+            with self._lock:
                 c = conn.cursor()
                 c.execute('''CREATE TABLE IF NOT EXISTS messages (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -66,59 +117,359 @@ class AnalysisDB:
                     event TEXT,
                     timestamp TEXT
                 )''')
+                for table in ('messages', 'connections'):
+                    c.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)')
+                    c.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_client_address ON {table} (client_address)')
+                c.execute('''CREATE TABLE IF NOT EXISTS message_rollups (
+                    granularity TEXT,
+                    bucket TEXT,
+                    client_address TEXT,
+                    messages INTEGER,
+                    bytes INTEGER,
+                    PRIMARY KEY (granularity, bucket, client_address)
+                ) WITHOUT ROWID''')
+                c.execute('''CREATE TABLE IF NOT EXISTS connection_rollups (
+                    granularity TEXT,
+                    bucket TEXT,
+                    event TEXT,
+                    count INTEGER,
+                    PRIMARY KEY (granularity, bucket, event)
+                ) WITHOUT ROWID''')
+                c.execute('''CREATE TABLE IF NOT EXISTS analyzer_snapshot (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    message_id INTEGER,
+                    connection_id INTEGER,
+                    state TEXT,
+                    created_at TEXT
+                )''')
                 conn.commit()
         except Exception as e:
             print(f"Error creating tables: {e}")
             raise
 
-    def save_message(self, client_address, message, timestamp):
-        """Save a message to the database with retry logic."""
+    def _write(self, messages, connection_events):
+        """Insert rows in one transaction. Caller must hold self._lock."""
+        conn = self._writer
+        try:
+            start = time.perf_counter()
+            if messages:
+                conn.executemany(INSERT_MESSAGE, messages)
+            if connection_events:
+                conn.executemany(INSERT_CONNECTION, connection_events)
+            self._update_rollups(conn, messages, connection_events)
+            inserted = time.perf_counter()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        INSERT_SECONDS.observe(inserted - start)
+        COMMIT_SECONDS.observe(time.perf_counter() - inserted)
+        ROWS_WRITTEN.inc(len(messages) + len(connection_events))
+
+    @staticmethod
+    def _update_rollups(conn, messages, connection_events):
+        """Add a batch of rows to the minute/hour/day rollups."""
+        message_totals = defaultdict(lambda: [0, 0])
+        for addr, msg, ts in messages:
+            size = len(msg.encode())
+            for granularity, prefix in ROLLUP_PREFIX.items():
+                totals = message_totals[(granularity, ts[:prefix], addr)]
+                totals[0] += 1
+                totals[1] += size
+        connection_totals = defaultdict(int)
+        for _, event, ts in connection_events:
+            for granularity, prefix in ROLLUP_PREFIX.items():
+                connection_totals[(granularity, ts[:prefix], event)] += 1
+        if message_totals:
+            conn.executemany(
+                'INSERT INTO message_rollups (granularity, bucket, client_address, messages, bytes) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (granularity, bucket, client_address) DO UPDATE SET '
+                'messages = messages + excluded.messages, bytes = bytes + excluded.bytes',
+                [key + tuple(totals) for key, totals in message_totals.items()])
+        if connection_totals:
+            conn.executemany(
+                'INSERT INTO connection_rollups (granularity, bucket, event, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (granularity, bucket, event) DO UPDATE SET count = count + excluded.count',
+                [key + (count,) for key, count in connection_totals.items()])
+
+    def _flush_locked(self):
+        if not self._pending_messages and not self._pending_connections:
+            return
+        messages, self._pending_messages = self._pending_messages, []
+        connection_events, self._pending_connections = self._pending_connections, []
+        try:
+            self._write(messages, connection_events)
+        except Exception:
+            # Keep the rows so the next flush retries them
+            self._pending_messages[:0] = messages
+            self._pending_connections[:0] = connection_events
+            raise
+
+    def flush(self):
+        """Commit all buffered rows now."""
+        try:
+            with self._lock:
+                self._flush_locked()
+        except Exception as e:
+            print(f"Error flushing buffered rows: {e}")
+            raise
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass  # already reported; rows stay buffered for the next attempt
+
+    def _buffer(self, message=None, connection_event=None):
+        with self._lock:
+            # Look the lists up under the lock: a flush swaps them out
+            if message is not None:
+                self._pending_messages.append(message)
+            if connection_event is not None:
+                self._pending_connections.append(connection_event)
+            if (self._flusher is None
+                    or len(self._pending_messages) + len(self._pending_connections) >= self.batch_size):
+                self._flush_locked()
+
+    def close(self):
+        """Flush buffered rows and close the writer connection."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=1)
         try:
             with self._lock:
-                with self._get_connection() as conn:
-                    c = conn.cursor()
-                    c.execute('INSERT INTO messages (client_address, message, timestamp) VALUES (?, ?, ?)',
-                             (client_address, message, timestamp.isoformat()))
-                    conn.commit()
+                self._flush_locked()
+                self._writer.close()
+        except Exception as e:
+            print(f"Error closing database connection: {e}")
+
+    def save_message(self, client_address, message, timestamp):
+        """Buffer a message; it is committed with the next group commit."""
+        try:
+            self._buffer(message=(client_address, message, timestamp.isoformat()))
         except Exception as e:
             print(f"Error saving message: {e}")
             raise
 
     def save_connection_event(self, client_address, event, timestamp):
-        """Save a connection event to the database with retry logic."""
+        """Buffer a connection event; it is committed with the next group commit."""
         try:
-            with self._lock:
-                with self._get_connection() as conn:
-                    c = conn.cursor()
-                    c.execute('INSERT INTO connections (client_address, event, timestamp) VALUES (?, ?, ?)',
-                             (client_address, event, timestamp.isoformat()))
-                    conn.commit()
+            self._buffer(connection_event=(client_address, event, timestamp.isoformat()))
         except Exception as e:
             print(f"Error saving connection event: {e}")
             raise
 
-    def load_messages(self):
-        """Load messages from the database with retry logic."""
+    def save_messages(self, rows):
+        """Insert many (client_address, message, timestamp) rows in one transaction."""
+        self.save_batch(rows, [])
+
+    def save_connection_events(self, rows):
+        """Insert many (client_address, event, timestamp) rows in one transaction."""
+        self.save_batch([], rows)
+
+    def save_batch(self, messages, connection_events):
+        """Save messages and connection events in a single transaction.
+
+        Both arguments are lists of (client_address, text, timestamp) tuples.
+        Any buffered rows are committed in the same transaction.
+        """
         try:
             with self._lock:
-                with self._get_connection() as conn:
-                    c = conn.cursor()
-                    c.execute('SELECT client_address, message, timestamp FROM messages ORDER BY id ASC')
-                    rows = c.fetchall()
-                    return [(addr, msg, datetime.fromisoformat(ts)) for addr, msg, ts in rows]
+                self._pending_messages.extend((addr, msg, ts.isoformat()) for addr, msg, ts in messages)
+                self._pending_connections.extend((addr, event, ts.isoformat()) for addr, event, ts in connection_events)
+                self._flush_locked()
+        except Exception as e:
+            print(f"Error saving batch: {e}")
+            raise
+
+    @staticmethod
+    def _filters(after_id=None, start=None, end=None, client_address=None):
+        """Build a WHERE clause for the optional id, time-range and client filters."""
+        clauses, params = [], []
+        if after_id is not None:
+            clauses.append('id > ?')
+            params.append(after_id)
+        if start is not None:
+            clauses.append('timestamp >= ?')
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append('timestamp < ?')
+            params.append(end.isoformat())
+        if client_address is not None:
+            clauses.append('client_address = ?')
+            params.append(client_address)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _iter_rows(self, table, column, after_id=0, start=None, end=None, client_address=None,
+                   chunk_size=READ_CHUNK_SIZE, with_id=False):
+        """Stream rows in id order, one keyset-paginated chunk per query.
+
+        Each chunk is a short read on this thread's reader connection, so
+        no read transaction or lock is held between chunks.
+        """
+        self.flush()
+        last_id = after_id
+        while True:
+            where, params = self._filters(last_id, start, end, client_address)
+            with self._get_connection() as conn:
+                c = conn.execute(f'SELECT id, client_address, {column}, timestamp FROM {table}{where} '
+                                 f'ORDER BY id ASC LIMIT ?', params + [chunk_size])
+                rows = c.fetchall()
+            for row_id, addr, value, ts in rows:
+                if with_id:
+                    yield row_id, addr, value, datetime.fromisoformat(ts)
+                else:
+                    yield addr, value, datetime.fromisoformat(ts)
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
+
+    def iter_messages(self, after_id=0, start=None, end=None, client_address=None,
+                      chunk_size=READ_CHUNK_SIZE, with_id=False):
+        """Yield (client_address, message, timestamp) rows, optionally filtered by time range and client."""
+        return self._iter_rows('messages', 'message', after_id, start, end, client_address, chunk_size, with_id)
+
+    def iter_connections(self, after_id=0, start=None, end=None, client_address=None,
+                         chunk_size=READ_CHUNK_SIZE, with_id=False):
+        """Yield (client_address, event, timestamp) rows, optionally filtered by time range and client."""
+        return self._iter_rows('connections', 'event', after_id, start, end, client_address, chunk_size, with_id)
+
+    def load_messages(self, after_id=0):
+        """Stream messages (optionally only those with id > after_id) from the database."""
+        return self.iter_messages(after_id=after_id)
+
+    def load_connections(self, after_id=0):
+        """Stream connection events (optionally only those with id > after_id) from the database."""
+        return self.iter_connections(after_id=after_id)
+
+    def load_message_page(self, limit, offset=0, start=None, end=None, client_address=None):
+        """Load one page of messages, newest first, optionally filtered by time range and client."""
+        try:
+            self.flush()
+            where, params = self._filters(None, start, end, client_address)
+            with self._get_connection() as conn:
+                c = conn.cursor()
+                c.execute(f'SELECT client_address, message, timestamp FROM messages{where} '
+                          f'ORDER BY id DESC LIMIT ? OFFSET ?', params + [limit, offset])
+                return [(addr, msg, datetime.fromisoformat(ts)) for addr, msg, ts in c.fetchall()]
         except Exception as e:
             print(f"Error loading messages: {e}")
             raise
 
-    def load_connections(self):
-        """Load connection events from the database with retry logic."""
+    def high_water_marks(self):
+        """Commit buffered rows and return the last (message id, connection id)."""
+        try:
+            with self._lock:
+                self._flush_locked()
+                c = self._writer.cursor()
+                message_id = c.execute('SELECT COALESCE(MAX(id), 0) FROM messages').fetchone()[0]
+                connection_id = c.execute('SELECT COALESCE(MAX(id), 0) FROM connections').fetchone()[0]
+                return message_id, connection_id
+        except Exception as e:
+            print(f"Error reading high-water marks: {e}")
+            raise
+
+    def save_snapshot(self, state, message_id, connection_id):
+        """Replace the analyzer snapshot covering rows up to the given ids."""
         try:
             with self._lock:
-                with self._get_connection() as conn:
-                    c = conn.cursor()
-                    c.execute('SELECT client_address, event, timestamp FROM connections ORDER BY id ASC')
-                    rows = c.fetchall()
-                    return [(addr, event, datetime.fromisoformat(ts)) for addr, event, ts in rows]
+                self._writer.execute(
+                    'INSERT OR REPLACE INTO analyzer_snapshot (id, message_id, connection_id, state, created_at) '
+                    'VALUES (1, ?, ?, ?, ?)',
+                    (message_id, connection_id, state, datetime.now().isoformat()))
+                self._writer.commit()
         except Exception as e:
-            print(f"Error loading connections: {e}")
+            print(f"Error saving snapshot: {e}")
             raise
+
+    def load_snapshot(self):
+        """Return (message_id, connection_id, state) of the last snapshot, or None."""
+        try:
+            with self._get_connection() as conn:
+                c = conn.cursor()
+                c.execute('SELECT message_id, connection_id, state FROM analyzer_snapshot WHERE id = 1')
+                return c.fetchone()
+        except Exception as e:
+            print(f"Error loading snapshot: {e}")
+            raise
+
+    def rebuild_rollups(self):
+        """Recompute all rollups from the raw tables (backfill for existing databases)."""
+        try:
+            with self._lock:
+                self._flush_locked()
+                conn = self._writer
+                conn.execute('DELETE FROM message_rollups')
+                conn.execute('DELETE FROM connection_rollups')
+                for granularity, prefix in ROLLUP_PREFIX.items():
+                    conn.execute(
+                        'INSERT INTO message_rollups (granularity, bucket, client_address, messages, bytes) '
+                        'SELECT ?, substr(timestamp, 1, ?), client_address, COUNT(*), '
+                        'SUM(length(CAST(message AS BLOB))) FROM messages GROUP BY 2, 3',
+                        (granularity, prefix))
+                    conn.execute(
+                        'INSERT INTO connection_rollups (granularity, bucket, event, count) '
+                        'SELECT ?, substr(timestamp, 1, ?), event, COUNT(*) FROM connections GROUP BY 2, 3',
+                        (granularity, prefix))
+                conn.commit()
+        except Exception as e:
+            print(f"Error rebuilding rollups: {e}")
+            raise
+
+    def compact_rollups(self, retention_days=MINUTE_ROLLUP_RETENTION_DAYS):
+        """Drop minute buckets older than retention_days; hour and day buckets are kept."""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()[:ROLLUP_PREFIX['minute']]
+        try:
+            with self._lock:
+                self._writer.execute("DELETE FROM message_rollups WHERE granularity = 'minute' AND bucket < ?",
+                                     (cutoff,))
+                self._writer.execute("DELETE FROM connection_rollups WHERE granularity = 'minute' AND bucket < ?",
+                                     (cutoff,))
+                self._writer.commit()
+        except Exception as e:
+            print(f"Error compacting rollups: {e}")
+            raise
+
+    @staticmethod
+    def _bucket_range(granularity, start, end):
+        if granularity not in ROLLUP_PREFIX:
+            raise ValueError(f"granularity must be one of {', '.join(ROLLUP_PREFIX)}")
+        prefix = ROLLUP_PREFIX[granularity]
+        return start.isoformat()[:prefix], end.isoformat()[:prefix]
+
+    def message_rollups(self, granularity, start, end, client_address=None):
+        """Return [(bucket, messages, bytes)] for buckets in [start, end], summed over clients unless one is given."""
+        first, last = self._bucket_range(granularity, start, end)
+        query = ('SELECT bucket, SUM(messages), SUM(bytes) FROM message_rollups '
+                 'WHERE granularity = ? AND bucket BETWEEN ? AND ?')
+        params = [granularity, first, last]
+        if client_address is not None:
+            query += ' AND client_address = ?'
+            params.append(client_address)
+        self.flush()
+        with self._get_connection() as conn:
+            return conn.execute(query + ' GROUP BY bucket ORDER BY bucket', params).fetchall()
+
+    def connection_rollups(self, granularity, start, end):
+        """Return [(bucket, event, count)] for buckets in [start, end]."""
+        first, last = self._bucket_range(granularity, start, end)
+        self.flush()
+        with self._get_connection() as conn:
+            return conn.execute(
+                'SELECT bucket, event, count FROM connection_rollups '
+                'WHERE granularity = ? AND bucket BETWEEN ? AND ? ORDER BY bucket, event',
+                (granularity, first, last)).fetchall()
+
+    def client_rollups(self, start, end):
+        """Return [(client_address, messages, bytes)] over the days in [start, end], busiest first."""
+        first, last = self._bucket_range('day', start, end)
+        self.flush()
+        with self._get_connection() as conn:
+            return conn.execute(
+                "SELECT client_address, SUM(messages), SUM(bytes) FROM message_rollups "
+                "WHERE granularity = 'day' AND bucket BETWEEN ? AND ? "
+                "GROUP BY client_address ORDER BY 2 DESC",
+                (first, last)).fetchall()
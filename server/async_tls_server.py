@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+import asyncio
+import ssl
+import socket
+import time
+from datetime import datetime
+from tls_server import (TLSServer, BLUE, RESET, SESSION_TICKETS, log, CONNECTED, DISCONNECTED, ACTIVE_CONNECTIONS,
+                        BYTES_RECEIVED, MESSAGES_RECEIVED, RECV_SECONDS, BROADCAST_SECONDS)
+from cert_reloader import RELOAD_INTERVAL
+from broadcaster import AsyncBroadcaster, SEND_QUEUE_SIZE
+from common.framing import FrameError, encode_frame, read_frame_async, DATA, PING, HEADER_SIZE
+
+IDLE_TIMEOUT = 300  # seconds before a silent client gets a ping
+HANDSHAKE_TIMEOUT = 30  # seconds
+
+
+class AsyncTLSServer(TLSServer):
+    """TLS server running every client on a single asyncio event loop.
+
+    Handshakes are performed by the event loop instead of the accept loop,
+    so a slow client no longer stalls new connections, and idle clients
+    cost a socket and a coroutine instead of a thread.
+    """
+
+    def __init__(self, host='0.0.0.0', port=8443, backlog=4096, slow_consumer='drop',
+                 send_queue_size=SEND_QUEUE_SIZE, reuse_port=False, session_tickets=SESSION_TICKETS,
+                 cert_reload_interval=RELOAD_INTERVAL, client_auth='none', metrics_port=0):
+        super().__init__(host=host, port=port, slow_consumer=slow_consumer, send_queue_size=send_queue_size,
+                         reuse_port=reuse_port, session_tickets=session_tickets,
+                         cert_reload_interval=cert_reload_interval, client_auth=client_auth,
+                         metrics_port=metrics_port)
+        self.backlog = backlog
+        self.clients = {}  # writer -> "ip:port"
+        self.loop = None
+        self.server = None
+
+    def create_broadcaster(self, policy, max_queue):
+        return AsyncBroadcaster(policy=policy, max_queue=max_queue)
+
+    async def handle_client(self, reader, writer):
+        address = writer.get_extra_info('peername')
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        tls = writer.get_extra_info('ssl_object')
+        if self.is_revoked(tls):
+            log.warning("Rejected revoked certificate from %s:%s", address[0], address[1])
+            writer.close()
+            return
+        client_address = self.client_name(tls, address)
+        self.handshake_done(tls)
+
+        self.clients[writer] = client_address
+        self.broadcaster.register(writer, client_address)
+        log.info("[+] New client connected: %s", client_address, extra=CONNECTED)
+        self.events.emit('connect', client_address)
+
+        try:
+            while self.running:
+                try:
+                    frame = await read_frame_async(reader, idle_timeout=IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    if writer.is_closing():
+                        log.warning("[-] Client %s timed out", client_address)
+                        break
+                    self.broadcaster.send(writer, encode_frame(PING))
+                    continue
+                except (ssl.SSLError, ConnectionError, OSError, FrameError) as e:
+                    log.error("[-] Error with client %s: %s", client_address, e)
+                    break
+
+                if frame is None:
+                    break
+                received = time.perf_counter()
+                frame_type, payload = frame
+                BYTES_RECEIVED.inc(HEADER_SIZE + len(payload))
+                if frame_type != DATA:
+                    continue
+                decoded_message = payload.decode(errors='replace').strip()
+                if decoded_message:
+                    MESSAGES_RECEIVED.inc()
+                    timestamp = datetime.now().strftime("%H:%M:%S")
+                    message = f"\n[{timestamp}] {BLUE}Client {client_address}:{RESET} {decoded_message}"
+                    log.info("Client %s: %s", client_address, decoded_message)
+                    await self.broadcast(message, sender=writer)
+                    self.events.emit('message', client_address, message=decoded_message)
+                    RECV_SECONDS.observe(time.perf_counter() - received)
+        finally:
+            ACTIVE_CONNECTIONS.dec()
+            self.broadcaster.unregister(writer)
+            self.clients.pop(writer, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+            self.events.emit('disconnect', client_address)
+            log.info("[-] Client disconnected: %s", client_address, extra=DISCONNECTED)
+
+    async def broadcast(self, message, sender=None):
+        """Encode the message once and queue it for every client except the sender.
+
+        Only waits when the slow-consumer policy is 'backpressure'.
+        """
+        start = time.perf_counter()
+        frame = encode_frame(DATA, message.encode())
+        await self.broadcaster.publish(frame, exclude=sender)
+        if self.bus is not None:
+            self.bus.publish(frame)
+        BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    def deliver_remote(self, frame):
+        """Called on the bus thread with a frame broadcast by another worker."""
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.broadcaster.publish(frame), self.loop)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        context = self.get_ssl_context()
+        self.cert_reloader.start()
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port,
+            ssl=context, backlog=self.backlog, reuse_address=True, reuse_port=self.reuse_port or None,
+            ssl_handshake_timeout=HANDSHAKE_TIMEOUT,
+        )
+        log.info("TLS Server (asyncio) running on %s:%s", self.host, self.port, extra=CONNECTED)
+        log.info("Press Ctrl+C to stop the server")
+        async with self.server:
+            await self.server.serve_forever()
+
+    def run(self):
+        if not self.check_certificates():
+            return
+
+        self.events.start()
+        self.start_metrics_server()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            log.info("Server shutting down...", extra=DISCONNECTED)
+        except Exception as e:
+            log.error("Server error: %s", e)
+        finally:
+            self.running = False
+            self.stop_metrics_server()
+            if self.cert_reloader is not None:
+                self.cert_reloader.stop()
+            self.broadcaster.close()
+            self.events.stop()
+            log.info("Server shut down", extra=CONNECTED)
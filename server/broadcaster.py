@@ -0,0 +1,316 @@
+import asyncio
+import queue
+import socket
+import time
+from threading import Thread, Lock
+
+SLOW_CONSUMER_POLICIES = ('drop', 'disconnect', 'backpressure')
+SEND_QUEUE_SIZE = 256  # frames queued per client before the slow-consumer policy applies
+BACKPRESSURE_TIMEOUT = 5  # seconds a sender waits for room before the reader is disconnected
+_CLOSE = None  # sentinel that stops a writer
+
+
+class _BroadcastStats:
+    """Counters shared by the threaded and asyncio broadcasters."""
+
+    def __init__(self, policy, max_queue, backpressure_timeout):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy {policy!r}, expected one of {SLOW_CONSUMER_POLICIES}")
+        self.policy = policy
+        self.max_queue = max_queue
+        self.backpressure_timeout = backpressure_timeout
+        self.outboxes = {}  # connection -> outbox
+        self.stats = {
+            'broadcasts': 0,
+            'enqueued': 0,
+            'sent': 0,
+            'bytes_sent': 0,
+            'dropped': 0,
+            'disconnected': 0,
+            'backpressure_waits': 0,
+            'send_errors': 0,
+            'max_depth': 0,
+        }
+
+    def metrics(self):
+        """Counters plus the current per-client queue depths."""
+        outboxes = list(self.outboxes.values())
+        depths = [outbox.depth() for outbox in outboxes]
+        metrics = dict(self.stats)
+        metrics.update({
+            'policy': self.policy,
+            'clients': len(outboxes),
+            'queue_capacity': self.max_queue,
+            'queue_depth_total': sum(depths),
+            'queue_depth_max': max(depths, default=0),
+            'slowest_clients': sorted(
+                ({'client': o.address, 'depth': d, 'dropped': o.dropped} for o, d in zip(outboxes, depths) if d),
+                key=lambda c: c['depth'], reverse=True)[:5],
+        })
+        return metrics
+
+
+class ClientOutbox:
+    """Bounded send queue for one client, drained by its own writer thread."""
+
+    def __init__(self, sock, address, max_queue, stats):
+        self.sock = sock
+        self.address = address
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        self._stats = stats
+        self._thread = Thread(target=self._run, name=f"writer-{address}", daemon=True)
+        self._thread.start()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def send(self, data):
+        """Queue a frame without blocking; returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            return False
+        self._stats.note_depth(self.queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            if data is _CLOSE:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self._stats.count('send_errors')
+                self.shutdown()
+                return
+            self._stats.count_sent(len(data))
+
+    def shutdown(self):
+        """Cut the connection so the client's reader thread sees it and cleans up."""
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.closed = True
+        try:
+            self.queue.put_nowait(_CLOSE)
+        except queue.Full:
+            # Writer is stuck behind a full queue; make room for the sentinel
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait(_CLOSE)
+
+
+class Broadcaster(_BroadcastStats):
+    """Fans frames out to per-client send queues for the threaded server.
+
+    A frame is encoded once and the same bytes object is queued for every
+    recipient; each client's writer thread does the blocking sends, so a
+    stalled reader only fills its own queue. What happens when that queue
+    is full depends on the policy:
+
+      drop          - discard the frame for that client only
+      disconnect    - close the slow client
+      backpressure  - block the sender for up to `backpressure_timeout`
+                      seconds, then disconnect the slow client; one
+                      publish waits that long in total, however many
+                      clients are slow
+    """
+
+    def __init__(self, policy='drop', max_queue=SEND_QUEUE_SIZE, backpressure_timeout=BACKPRESSURE_TIMEOUT):
+        super().__init__(policy, max_queue, backpressure_timeout)
+        self._lock = Lock()
+        self._stats_lock = Lock()
+
+    def count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def count_sent(self, nbytes):
+        with self._stats_lock:
+            self.stats['sent'] += 1
+            self.stats['bytes_sent'] += nbytes
+
+    def note_depth(self, depth):
+        if depth > self.stats['max_depth']:
+            with self._stats_lock:
+                self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+
+    def register(self, sock, address):
+        outbox = ClientOutbox(sock, address, self.max_queue, self)
+        with self._lock:
+            self.outboxes[sock] = outbox
+        return outbox
+
+    def unregister(self, sock):
+        with self._lock:
+            outbox = self.outboxes.pop(sock, None)
+        if outbox is not None:
+            outbox.close()
+
+    def send(self, sock, data):
+        """Queue a frame for a single client (e.g. a keepalive)."""
+        outbox = self.outboxes.get(sock)
+        return outbox is not None and self._deliver(outbox, data)
+
+    def publish(self, data, exclude=None):
+        """Queue one encoded frame for every client except `exclude`."""
+        with self._lock:
+            outboxes = [o for s, o in self.outboxes.items() if s is not exclude]
+        self.count('broadcasts')
+        deadline = time.monotonic() + self.backpressure_timeout
+        for outbox in outboxes:
+            self._deliver(outbox, data, deadline)
+
+    def _deliver(self, outbox, data, deadline=None):
+        if outbox.closed:
+            return False
+        if outbox.send(data):
+            self.count('enqueued')
+            return True
+        if self.policy == 'backpressure':
+            self.count('backpressure_waits')
+            timeout = self.backpressure_timeout if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                outbox.queue.put(data, timeout=timeout)
+                self.count('enqueued')
+                return True
+            except queue.Full:
+                pass
+        outbox.dropped += 1
+        self.count('dropped')
+        if self.policy != 'drop':
+            self.count('disconnected')
+            outbox.shutdown()
+        return False
+
+    def metrics(self):
+        with self._lock, self._stats_lock:
+            return super().metrics()
+
+    def close(self):
+        with self._lock:
+            outboxes = list(self.outboxes.values())
+            self.outboxes.clear()
+        for outbox in outboxes:
+            outbox.close()
+
+
+class AsyncClientOutbox:
+    """Bounded send queue for one client, drained by a writer task."""
+
+    def __init__(self, writer, address, max_queue, stats):
+        self.writer = writer
+        self.address = address
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        self._stats = stats
+        self._task = asyncio.ensure_future(self._run())
+
+    def depth(self):
+        return self.queue.qsize()
+
+    async def _run(self):
+        try:
+            while True:
+                data = await self.queue.get()
+                if data is _CLOSE:
+                    return
+                self.writer.write(data)
+                # drain() waits while the transport buffer is above its
+                # high-water mark, so the queue is what absorbs a slow reader.
+                await self.writer.drain()
+                self._stats.stats['sent'] += 1
+                self._stats.stats['bytes_sent'] += len(data)
+        except (ConnectionError, OSError):
+            self._stats.stats['send_errors'] += 1
+            self.shutdown()
+
+    def shutdown(self):
+        self.closed = True
+        self.writer.close()
+
+    def close(self):
+        self.closed = True
+        if not self._task.done():
+            self._task.cancel()
+
+
+class AsyncBroadcaster(_BroadcastStats):
+    """Per-client send queues and writer tasks for the asyncio server.
+
+    Same policies as Broadcaster. Everything runs on the event loop, so no
+    locks are needed; with 'backpressure' the sending client's coroutine
+    awaits room in the slow queues and stops reading meanwhile.
+    """
+
+    def __init__(self, policy='drop', max_queue=SEND_QUEUE_SIZE, backpressure_timeout=BACKPRESSURE_TIMEOUT):
+        super().__init__(policy, max_queue, backpressure_timeout)
+
+    def register(self, writer, address):
+        outbox = AsyncClientOutbox(writer, address, self.max_queue, self)
+        self.outboxes[writer] = outbox
+        return outbox
+
+    def unregister(self, writer):
+        outbox = self.outboxes.pop(writer, None)
+        if outbox is not None:
+            outbox.close()
+
+    def _put(self, outbox, data):
+        if outbox.closed:
+            return True
+        try:
+            outbox.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            return False
+        self.stats['enqueued'] += 1
+        depth = outbox.queue.qsize()
+        if depth > self.stats['max_depth']:
+            self.stats['max_depth'] = depth
+        return True
+
+    def _overflow(self, outbox):
+        outbox.dropped += 1
+        self.stats['dropped'] += 1
+        if self.policy != 'drop':
+            self.stats['disconnected'] += 1
+            outbox.shutdown()
+
+    def send(self, writer, data):
+        """Queue a frame for a single client without waiting."""
+        outbox = self.outboxes.get(writer)
+        if outbox is not None and not self._put(outbox, data):
+            self._overflow(outbox)
+
+    async def publish(self, data, exclude=None):
+        """Queue one encoded frame for every client except `exclude`."""
+        self.stats['broadcasts'] += 1
+        full = [o for w, o in list(self.outboxes.items()) if w is not exclude and not self._put(o, data)]
+        if not full:
+            return
+        if self.policy != 'backpressure':
+            for outbox in full:
+                self._overflow(outbox)
+            return
+        self.stats['backpressure_waits'] += len(full)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(o.queue.put(data), self.backpressure_timeout) for o in full),
+            return_exceptions=True)
+        for outbox, result in zip(full, results):
+            if isinstance(result, BaseException):
+                self._overflow(outbox)
+            else:
+                self.stats['enqueued'] += 1
+
+    def close(self):
+        for outbox in list(self.outboxes.values()):
+            outbox.close()
+        self.outboxes.clear()
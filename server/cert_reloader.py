@@ -0,0 +1,120 @@
+import logging
+import os
+import ssl
+import time
+from datetime import datetime
+from threading import Thread, Event
+
+# ANSI color codes
+GREEN = '\033[0;32m'
+
+RELOAD_INTERVAL = 2  # seconds between checks of the certificate and key files
+
+log = logging.getLogger('cert_reloader')
+
+
+class CertReloader:
+    """Swaps in a new SSLContext when the certificate or key file changes.
+
+    The listening socket keeps the context returned by load(). Its SNI
+    callback, which OpenSSL runs for every ClientHello (with or without a
+    server name), moves each new handshake onto the most recently loaded
+    context. Connections that are already established keep the context they
+    were made with, and session tickets stay with the listening context, so
+    clients can still resume sessions after a reload.
+
+    The files are polled with stat(): both cert_generator.sh and the web
+    generator replace them, which changes the inode and mtime. A pair caught
+    halfway through being replaced fails to load, keeps the old context and
+    is retried once the second file changes.
+    """
+
+    def __init__(self, paths, create_context, interval=RELOAD_INTERVAL):
+        self.paths = paths
+        self.create_context = create_context
+        self.interval = interval
+        self.listener = None
+        self.current = None
+        self._signature = None
+        self._stop = Event()
+        self._thread = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload = None
+        self.last_reload_ms = None
+        self.last_error = None
+
+    def load(self):
+        """Build the context to listen with."""
+        self._signature = self._stat()
+        self.listener = self.current = self.create_context()
+        self.listener.sni_callback = self._select_context
+        return self.listener
+
+    def _select_context(self, ssl_object, server_name, listener):
+        current = self.current
+        if current is not listener:
+            ssl_object.context = current
+
+    def _stat(self):
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def check(self):
+        """Reload if the files changed since the last attempt. Returns True if a new context is in use."""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return self.reload()
+
+    def reload(self):
+        start = time.perf_counter()
+        try:
+            context = self.create_context()
+        except (ssl.SSLError, OSError) as e:
+            self.failures += 1
+            self.last_error = str(e)
+            log.error("Certificate reload failed, keeping the current certificate: %s", e)
+            return False
+        # A single reference swap: each handshake sees either the old or the new context
+        self.current = context
+        self.reloads += 1
+        self.last_reload = datetime.now().isoformat(timespec='seconds')
+        self.last_reload_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.last_error = None
+        log.info("Certificate reloaded from %s (%s ms)", self.paths[0], self.last_reload_ms, extra={'color': GREEN})
+        return True
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="cert-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def metrics(self):
+        return {
+            'interval': self.interval,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_reload': self.last_reload,
+            'last_reload_ms': self.last_reload_ms,
+            'last_error': self.last_error,
+        }
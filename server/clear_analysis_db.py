@@ -7,6 +7,9 @@ def clear_db():
     c = conn.cursor()
     c.execute('DELETE FROM messages')
     c.execute('DELETE FROM connections')
+    c.execute('DROP TABLE IF EXISTS analyzer_snapshot')
+    c.execute('DROP TABLE IF EXISTS message_rollups')
+    c.execute('DROP TABLE IF EXISTS connection_rollups')
     conn.commit()
     conn.close()
     print("All analysis data has been deleted.")
@@ -0,0 +1,74 @@
+import hashlib
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+IDENTITY_CACHE_SIZE = 4096  # verified client certificates remembered by fingerprint
+CLIENT_AUTH_MODES = ('none', 'optional', 'required')
+
+ClientIdentity = namedtuple('ClientIdentity', 'name subject serial_number fingerprint not_after dns_names')
+
+
+def identity_from_der(der, fingerprint):
+    """Decode the parts of a client certificate the server keys clients by."""
+    # Imported on first use, so the server runs without cryptography unless clients present certificates
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    cert = x509.load_der_x509_certificate(der)
+    common_names = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    try:
+        san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+        dns_names = tuple(san.get_values_for_type(x509.DNSName))
+    except x509.ExtensionNotFound:
+        dns_names = ()
+    subject = cert.subject.rfc4514_string()
+    return ClientIdentity(
+        name=common_names[0].value if common_names else subject,
+        subject=subject,
+        serial_number=cert.serial_number,
+        fingerprint=fingerprint,
+        not_after=cert.not_valid_after_utc.isoformat(),
+        dns_names=dns_names,
+    )
+
+
+class IdentityCache:
+    """LRU map from certificate fingerprint to the decoded ClientIdentity.
+
+    The handshake has already verified the certificate; this only saves
+    decoding it again every time the same client connects. A hit costs a
+    SHA-256 of the DER bytes and a dict lookup.
+    """
+
+    def __init__(self, maxsize=IDENTITY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, der):
+        fingerprint = hashlib.sha256(der).hexdigest()
+        with self._lock:
+            identity = self._entries.get(fingerprint)
+            if identity is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return identity
+            self.misses += 1
+        identity = identity_from_der(der, fingerprint)
+        with self._lock:
+            self._entries[fingerprint] = identity
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return identity
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,59 @@
+import json
+import queue
+from threading import Lock
+
+RESYNC = "event: resync\ndata: {}\n\n"
+KEEPALIVE = ": keepalive\n\n"
+
+
+class DashboardEvents:
+    """Fans analyzer changes out to Server-Sent Events subscribers.
+
+    Each event is serialized once and put on every subscriber's bounded
+    queue. A subscriber that falls behind has its queue cleared and gets a
+    single 'resync' event, telling the page to reload the full snapshot.
+    """
+
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = Lock()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event_type, data):
+        if not self._subscribers:
+            return
+        payload = f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(RESYNC)
+
+    def stream(self, q, keepalive=15):
+        """Yield SSE payloads for one subscriber until the client goes away."""
+        try:
+            while True:
+                try:
+                    yield q.get(timeout=keepalive)
+                except queue.Empty:
+                    yield KEEPALIVE
+        finally:
+            self.unsubscribe(q)
@@ -0,0 +1,151 @@
+import os
+import queue
+import time
+import logging
+from datetime import datetime
+from threading import Thread, Lock, Event
+import requests
+from requests.adapters import HTTPAdapter
+
+WEB_URL = os.environ.get("TLS_WEB_URL", "http://localhost:5000")  # empty disables updates
+BATCH_PATH = "/api/events/batch"
+
+log = logging.getLogger('event_shipper')
+
+
+class EventShipper:
+    """Ships server events to the web interface in batches from a background thread.
+
+    `emit()` never blocks: events go into a bounded queue and are dropped
+    (and counted) when it is full. The shipper thread sends whatever has
+    accumulated once `batch_size` events are queued or `flush_interval`
+    seconds have passed, over a single keep-alive HTTP session.
+    """
+
+    def __init__(self, base_url=WEB_URL, max_queue=10000, batch_size=200,
+                 flush_interval=0.5, timeout=2):
+        self.base_url = base_url
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'sent': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_depth': 0,
+        }
+        self._stats_lock = Lock()
+        self._metrics_sources = {}  # name -> callable returning a dict
+        self._stop = Event()
+        self._thread = None
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+    @property
+    def enabled(self):
+        return bool(self.base_url)
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, name="event-shipper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Flush what is queued and stop the shipper thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self.session.close()
+
+    def emit(self, event_type, client_address, **fields):
+        """Queue an event ('message', 'connect' or 'disconnect') for the web interface."""
+        if not self.enabled:
+            return False
+        event = {
+            'type': event_type,
+            'client_address': client_address,
+            'timestamp': datetime.now().isoformat(),
+        }
+        event.update(fields)
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats['dropped'] += 1
+            return False
+        depth = self.queue.qsize()
+        with self._stats_lock:
+            self.stats['enqueued'] += 1
+            if depth > self.stats['max_depth']:
+                self.stats['max_depth'] = depth
+        return True
+
+    def metrics(self):
+        """Current queue depth and delivery counters."""
+        with self._stats_lock:
+            metrics = dict(self.stats)
+        metrics['queue_depth'] = self.queue.qsize()
+        metrics['queue_capacity'] = self.max_queue
+        return metrics
+
+    def add_metrics(self, name, source):
+        """Report `source()` under `name` with every batch (e.g. broadcast queue depths)."""
+        self._metrics_sources[name] = source
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._ship(batch)
+        # Final flush on shutdown
+        batch = self._drain()
+        while batch:
+            self._ship(batch)
+            batch = self._drain()
+
+    def _ship(self, batch):
+        # With --workers N every worker ships its own metrics; the pid tells them apart
+        payload = {'events': batch, 'pid': os.getpid(), 'shipper': self.metrics()}
+        for name, source in self._metrics_sources.items():
+            payload[name] = source()
+        try:
+            resp = self.session.post(f"{self.base_url}{BATCH_PATH}", json=payload, timeout=self.timeout)
+            resp.raise_for_status()
+        except Exception as e:
+            with self._stats_lock:
+                self.stats['failed'] += len(batch)
+            log.warning("Could not update web interface (%d events lost): %s", len(batch), e)
+            return
+        with self._stats_lock:
+            self.stats['sent'] += len(batch)
+            self.stats['batches'] += 1
@@ -0,0 +1,88 @@
+"""Leveled, rate-limited console logging for the servers.
+
+Records keep the servers' ANSI colors: warnings are yellow, errors red,
+and a call can pick its own color with extra={'color': GREEN}. Each
+message format may be logged LOG_BURST times per LOG_INTERVAL seconds; the
+rest are dropped and counted, and the next record let through says how
+many were skipped. Under load this keeps a chatty line (one per chat
+message) from turning console writes into the bottleneck. Caller and
+process details are not collected, which makes a record several times
+cheaper to create.
+
+    setup_logging('warning')  # only problems, e.g. for load tests
+"""
+
+import logging
+import sys
+import time
+from threading import Lock
+
+from metrics import REGISTRY
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+LOG_BURST = 20  # records per call site per interval
+LOG_INTERVAL = 1.0  # seconds
+
+# ANSI color codes
+YELLOW = '\033[0;33m'
+RED = '\033[0;31m'
+RESET = '\033[0m'
+
+LEVEL_COLORS = {logging.WARNING: YELLOW, logging.ERROR: RED, logging.CRITICAL: RED}
+SUPPRESSED = REGISTRY.counter('log_messages_suppressed_total', 'Log records dropped by the rate limit')
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `burst` records per `interval` seconds for each message format."""
+
+    def __init__(self, burst=LOG_BURST, interval=LOG_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # (logger, format) -> [window start, records let through, records dropped]
+        self._lock = Lock()
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                dropped = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+        SUPPRESSED.inc()
+        return False
+
+
+class ColorFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" ({suppressed} similar messages suppressed)"
+        color = getattr(record, 'color', None) or LEVEL_COLORS.get(record.levelno)
+        return f"{color}{text}{RESET}" if color else text
+
+
+def setup_logging(level='info', burst=LOG_BURST, interval=LOG_INTERVAL, stream=None):
+    """Send log records to stdout (or `stream`) with colors and the rate limit."""
+    # Skip the stack walk for the caller's file and line, and the thread/process lookups
+    logging._srcfile = None
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(ColorFormatter('%(asctime)s %(message)s', datefmt='%H:%M:%S'))
+    if burst:
+        handler.addFilter(RateLimitFilter(burst, interval))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return handler
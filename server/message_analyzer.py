@@ -1,21 +1,118 @@
-from datetime import datetime
-from collections import defaultdict
+from datetime import datetime, timedelta
+from collections import defaultdict, deque
+from itertools import islice
+import atexit
+import json
+import logging
 import re
+import threading
+import time
 from typing import Dict, List, Any
 import ipaddress
-from collections import Counter
 from analysis_db import AnalysisDB
+from metrics import REGISTRY
+
+WORD_RE = re.compile(r'\b\w+\b')
+HISTORY_SIZE = 1000  # messages kept in memory; older ones are read from the database
+RETENTION_SECONDS = None  # optionally also expire in-memory messages by age
+CHECKPOINT_INTERVAL = 60  # seconds between snapshots of the aggregated state
+SNAPSHOT_VERSION = 1
+WORD_CAPACITY = 2000  # distinct words counted at once (up to twice this between prunes)
+MESSAGE_TEXT_CAPACITY = 200  # distinct message texts counted at once, for the most frequent message
+
+INGEST_SECONDS = REGISTRY.histogram('analyzer_ingest_seconds', 'Time to apply and persist one batch of server events')
+EVENTS_INGESTED = REGISTRY.counter('analyzer_events_total', 'Server events applied by the analyzer')
+
+log = logging.getLogger('message_analyzer')
+
+
+class MessageRecord:
+    """Compact in-memory message; address details come from the analyzer's cache."""
+    __slots__ = ('client', 'message', 'timestamp')
+
+    def __init__(self, client: str, message: str, timestamp: datetime):
+        self.client = client
+        self.message = message
+        self.timestamp = timestamp
+
+
+class TopK:
+    """Top-k tracking for counters that only ever increase.
+
+    `counts` holds the items' counts; `top` holds the k largest. Because
+    counts never decrease, an item outside `top` can only enter by passing
+    the smallest count inside it, so each `add` is O(1) unless that happens.
+
+    With a `capacity`, `counts` is a Space-Saving sketch: once it holds
+    twice that many items, all but the `capacity` largest are dropped and
+    `floor` becomes the largest count dropped. An item that comes back
+    starts from `floor`, so counts may be overestimated by up to `floor`,
+    but no item seen more than `floor` times is ever missing.
+    """
+
+    def __init__(self, k: int, capacity: int = None):
+        self.k = k
+        self.capacity = capacity
+        self.counts = {}
+        self.floor = 0
+        self.top = {}
+        self._floor = 0  # lower bound of the smallest count in top
+
+    def add(self, item, n: int = 1):
+        count = self.counts.get(item, self.floor) + n
+        self.counts[item] = count
+        if self.capacity and len(self.counts) > 2 * self.capacity:
+            self._prune()
+        if item in self.top or len(self.top) < self.k:
+            self.top[item] = count
+        elif count > self._floor:
+            floor_item = min(self.top, key=self.top.get)
+            self._floor = self.top[floor_item]
+            if count > self._floor:
+                del self.top[floor_item]
+                self.top[item] = count
+                self._floor = min(self.top.values())
+
+    def most_common(self, n: int = None):
+        return sorted(self.top.items(), key=lambda x: x[1], reverse=True)[:n]
+
+    def _prune(self):
+        """Keep the `capacity` largest counts (which include `top`) and raise `floor`."""
+        ranked = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1])
+        # In place: the analyzer's message_stats refers to this dict
+        self.counts.clear()
+        self.counts.update(ranked[:self.capacity])
+
+    def restore(self, counts: Dict, top: Dict, floor: int = 0):
+        self.counts.clear()
+        self.counts.update(counts)
+        self.floor = floor
+        self.top = dict(top)
+        self._floor = min(self.top.values()) if self.top else 0
+        if self.capacity and len(self.counts) > 2 * self.capacity:
+            self._prune()  # snapshots from before the cap
+
 
 class MessageAnalyzer:
-    def __init__(self):
+    def __init__(self, history_size=HISTORY_SIZE, retention_seconds=RETENTION_SECONDS,
+                 checkpoint_interval=CHECKPOINT_INTERVAL):
         self.db = AnalysisDB()
-        self.messages = []
+        self._lock = threading.RLock()  # keeps state and persisted rows in step for checkpoints
+        self._checkpoint_lock = threading.Lock()  # snapshots are written one at a time, in order
+        self.checkpoint_interval = checkpoint_interval
+        self._next_checkpoint = time.monotonic() + checkpoint_interval
+        self.version = 0  # bumped on every state change
+        self._listeners = []  # callables(event_type, data) notified of changes
+        # Ring buffer of the most recent messages; history_size=None keeps everything
+        self.messages = deque(maxlen=history_size)
+        self.retention = timedelta(seconds=retention_seconds) if retention_seconds else None
         self.message_stats = {
             'total_messages': 0,
             'messages_per_client': defaultdict(int),
             'messages_per_hour': defaultdict(int),
             'average_message_length': 0,
-            'word_frequency': defaultdict(int),
+            'word_frequency': None,  # set below to self.top_words.counts
             'client_ips': set(),
             'connection_attempts': defaultdict(int),
             'disconnection_events': defaultdict(int),
@@ -30,30 +127,168 @@ class MessageAnalyzer:
             'connection_count': 0
         })
         self.connection_events_per_hour = defaultdict(int)
+
+        # Running aggregates so reads never rescan the message history
+        self.top_words = TopK(10, WORD_CAPACITY)
+        self.message_stats['word_frequency'] = self.top_words.counts
+        self.message_texts = TopK(1, MESSAGE_TEXT_CAPACITY)
+        self.totals = {
+            'length': 0,
+            'bytes': 0,
+            'max_bytes': 0,
+            'private': 0,
+            'public': 0,
+            'connections': 0,
+            'errors': 0,
+        }
+        self._address_cache = {}  # client_address -> (ip, port, is_private)
+        self._closed = False
         self.load_from_db()
+        atexit.register(self.close)
 
     def load_from_db(self):
+        """Restore the last snapshot, then replay only rows written after it."""
+        message_id, connection_id = self._restore_snapshot()
+        replayed = 0
         # Load messages
-        for client_address, message, timestamp in self.db.load_messages():
+        for client_address, message, timestamp in self.db.load_messages(after_id=message_id):
             self._add_message_internal(client_address, message, timestamp, save_to_db=False)
+            replayed += 1
         # Load connections
-        for client_address, event, timestamp in self.db.load_connections():
+        for client_address, event, timestamp in self.db.load_connections(after_id=connection_id):
             if event == 'connect':
                 self.record_connection(timestamp)
             elif event == 'disconnect':
-                self.mark_disconnected(client_address, timestamp)
+                self.mark_disconnected(client_address, timestamp, save_to_db=False)
+            replayed += 1
+        if replayed:
+            self.checkpoint()
+
+    def _snapshot_state(self) -> Dict[str, Any]:
+        """Copy the aggregated state, so it can be serialized without holding the lock."""
+        stats = self.message_stats
+        return {
+            'version': SNAPSHOT_VERSION,
+            'total_messages': stats['total_messages'],
+            'messages_per_client': dict(stats['messages_per_client']),
+            'messages_per_hour': dict(stats['messages_per_hour']),
+            'average_message_length': stats['average_message_length'],
+            'client_ips': list(stats['client_ips']),
+            'word_frequency': dict(self.top_words.counts),
+            'word_floor': self.top_words.floor,
+            'top_words': dict(self.top_words.top),
+            'message_texts': dict(self.message_texts.counts),
+            'message_text_floor': self.message_texts.floor,
+            'top_message_texts': dict(self.message_texts.top),
+            'client_details': {
+                client: dict(info,
+                             first_seen=info['first_seen'].isoformat() if info['first_seen'] else None,
+                             last_seen=info['last_seen'].isoformat() if info['last_seen'] else None)
+                for client, info in self.client_details.items()
+            },
+            'connection_events_per_hour': dict(self.connection_events_per_hour),
+            'totals': dict(self.totals),
+            'recent': [(rec.client, rec.message, rec.timestamp.isoformat()) for rec in self.messages],
+        }
+
+    def _restore_snapshot(self):
+        """Load aggregated state from the last snapshot; returns the ids it covers."""
+        try:
+            snapshot = self.db.load_snapshot()
+            if snapshot is None:
+                return 0, 0
+            message_id, connection_id, state = snapshot
+            state = json.loads(state)
+            if state.get('version') != SNAPSHOT_VERSION:
+                return 0, 0
+        except Exception as e:
+            log.warning("Ignoring unreadable analyzer snapshot: %s", e)
+            return 0, 0
+
+        stats = self.message_stats
+        stats['total_messages'] = state['total_messages']
+        stats['messages_per_client'].update(state['messages_per_client'])
+        # JSON object keys are strings; hours are ints everywhere else
+        stats['messages_per_hour'].update({int(h): n for h, n in state['messages_per_hour'].items()})
+        stats['average_message_length'] = state['average_message_length']
+        stats['client_ips'].update(state['client_ips'])
+        self.top_words.restore(state['word_frequency'], state['top_words'], state.get('word_floor', 0))
+        self.message_texts.restore(state['message_texts'], state['top_message_texts'],
+                                   state.get('message_text_floor', 0))
+        for client, info in state['client_details'].items():
+            info['first_seen'] = datetime.fromisoformat(info['first_seen']) if info['first_seen'] else None
+            info['last_seen'] = datetime.fromisoformat(info['last_seen']) if info['last_seen'] else None
+            self.client_details[client].update(info)
+        self.connection_events_per_hour.update({int(h): n for h, n in state['connection_events_per_hour'].items()})
+        self.totals.update(state['totals'])
+        for client, message, timestamp in state['recent']:
+            self.messages.append(MessageRecord(client, message, datetime.fromisoformat(timestamp)))
+        return message_id, connection_id
+
+    def checkpoint(self):
+        """Snapshot the aggregated state together with the last persisted row ids.
+
+        Only copying the state holds the analyzer lock; encoding and writing
+        it do not block ingest.
+        """
+        with self._checkpoint_lock:
+            try:
+                with self._lock:
+                    self._next_checkpoint = time.monotonic() + self.checkpoint_interval
+                    message_id, connection_id = self.db.high_water_marks()
+                    state = self._snapshot_state()
+                self.db.save_snapshot(json.dumps(state), message_id, connection_id)
+                self.db.compact_rollups()
+            except Exception as e:
+                log.error("Error checkpointing analyzer state: %s", e)
+
+    def close(self):
+        """Write a final snapshot and close the database."""
+        if self._closed:
+            return
+        self._closed = True
+        self.checkpoint()
+        self.db.close()
+
+    def add_listener(self, listener):
+        """Call listener(event_type, data) after each change ('message', 'connection', 'disconnect')."""
+        self._listeners.append(listener)
+
+    def _changed(self, event_type: str, make_data):
+        self.version += 1
+        if self._listeners:
+            data = make_data()
+            data['version'] = self.version
+            for listener in self._listeners:
+                try:
+                    listener(event_type, data)
+                except Exception as e:
+                    log.error("Error notifying analyzer listener: %s", e)
+
+    def _maybe_checkpoint(self):
+        if time.monotonic() >= self._next_checkpoint:
+            self.checkpoint()
+
+    def _parse_address(self, client_address: str):
+        """Split "ip:port" into (ip, port, is_private), cached per address."""
+        parsed = self._address_cache.get(client_address)
+        if parsed is None:
+            try:
+                ip, port = client_address.split(':')
+                ip_obj = ipaddress.ip_address(ip)
+                is_private = ip_obj.is_private
+            except:
+                ip = client_address
+                port = 'unknown'
+                is_private = False
+            parsed = self._address_cache[client_address] = (ip, port, is_private)
+        return parsed
 
     def _add_message_internal(self, client_address: str, message: str, timestamp: datetime, save_to_db=True):
         """Add a new message to the analyzer."""
-        # Parse client address
-        try:
-            ip, port = client_address.split(':')
-            ip_obj = ipaddress.ip_address(ip)
-            is_private = ip_obj.is_private
-        except:
-            ip = client_address
-            port = 'unknown'
-            is_private = False
+        ip, port, is_private = self._parse_address(client_address)
+        length = len(message)
+        size = len(message.encode())
 
         # Update client details
         client_info = self.client_details[client_address]
@@ -61,74 +296,74 @@ class MessageAnalyzer:
             client_info['first_seen'] = timestamp
         client_info['last_seen'] = timestamp
         client_info['total_messages'] += 1
-        client_info['total_bytes'] += len(message.encode())
+        client_info['total_bytes'] += size
         client_info['connection_count'] += 1
 
         # Add message to history
-        self.messages.append({
-            'client': client_address,
-            'ip': ip,
-            'port': port,
-            'is_private': is_private,
-            'message': message,
-            'timestamp': timestamp,
-            'length': len(message)
-        })
-        
+        self.messages.append(MessageRecord(client_address, message, timestamp))
+        if self.retention is not None:
+            self._expire_messages(timestamp)
+
         # Update statistics
         self.message_stats['total_messages'] += 1
         self.message_stats['messages_per_client'][client_address] += 1
         self.message_stats['messages_per_hour'][timestamp.hour] += 1
         self.message_stats['client_ips'].add(ip)
-        
-        # Update word frequency
-        words = re.findall(r'\b\w+\b', message.lower())
-        for word in words:
-            self.message_stats['word_frequency'][word] += 1
-        
-        # Update average message length
-        total_length = sum(msg['length'] for msg in self.messages)
-        self.message_stats['average_message_length'] = total_length / len(self.messages)
+
+        totals = self.totals
+        totals['length'] += length
+        totals['bytes'] += size
+        if size > totals['max_bytes']:
+            totals['max_bytes'] = size
+        totals['private' if is_private else 'public'] += 1
+        totals['connections'] += 1
+        self.message_stats['average_message_length'] = totals['length'] / self.message_stats['total_messages']
+
+        # Update word and message frequency
+        for word in WORD_RE.findall(message.lower()):
+            self.top_words.add(word)
+        self.message_texts.add(message)
 
         if save_to_db:
             self.db.save_message(client_address, message, timestamp)
+        self._changed('message', lambda: {
+            'message': dict(self._message_dict(client_address, message, timestamp),
+                            timestamp=timestamp.strftime('%Y-%m-%d %H:%M:%S')),
+            'total_messages': self.message_stats['total_messages'],
+            # Enough for the dashboard to update its counters and client row without a full reload
+            'unique_clients': len(self.message_stats['client_ips']),
+            'average_message_size': round(totals['bytes'] / self.message_stats['total_messages'], 2),
+            'max_message_size': totals['max_bytes'],
+            'client_stats': {
+                'first_seen': client_info['first_seen'].strftime('%Y-%m-%d %H:%M:%S'),
+                'last_seen': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'total_messages': client_info['total_messages'],
+                'total_bytes': client_info['total_bytes'],
+            },
+        })
 
     def add_message(self, client_address: str, message: str, timestamp: datetime):
-        self._add_message_internal(client_address, message, timestamp, save_to_db=True)
+        with self._lock:
+            self._add_message_internal(client_address, message, timestamp, save_to_db=True)
+        self._maybe_checkpoint()
 
     def get_analysis(self) -> Dict[str, Any]:
         """Get the current analysis results."""
-        # Calculate message sizes
-        if self.messages:
-            sizes = [len(msg['message'].encode()) for msg in self.messages]
-            avg_size = sum(sizes) / len(sizes)
-            max_size = max(sizes)
-        else:
-            avg_size = 0
-            max_size = 0
-        # Find most frequent message
-        if self.messages:
-            msg_texts = [msg['message'] for msg in self.messages]
-            most_common = Counter(msg_texts).most_common(1)
-            frequent_message = most_common[0][0] if most_common else ''
-        else:
-            frequent_message = ''
+        totals = self.totals
+        total_messages = self.message_stats['total_messages']
+        most_common = self.message_texts.most_common(1)
         return {
-            'total_messages': self.message_stats['total_messages'],
+            'total_messages': total_messages,
             'messages_per_client': dict(self.message_stats['messages_per_client']),
             'messages_per_hour': dict(self.message_stats['messages_per_hour']),
             'average_message_length': round(self.message_stats['average_message_length'], 2),
-            'top_words': dict(sorted(
-                self.message_stats['word_frequency'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]),  # Top 10 most frequent words
+            'top_words': dict(self.top_words.most_common(10)),  # Top 10 most frequent words
             'unique_clients': len(self.message_stats['client_ips']),
-            'private_ips': sum(1 for msg in self.messages if msg.get('is_private', False)),
-            'public_ips': sum(1 for msg in self.messages if not msg.get('is_private', False)),
-            'frequent_message': frequent_message,
-            'average_message_size': round(avg_size, 2),
-            'max_message_size': max_size
+            'private_ips': totals['private'],
+            'public_ips': totals['public'],
+            'frequent_message': most_common[0][0] if most_common else '',
+            'average_message_size': round(totals['bytes'] / total_messages, 2) if total_messages else 0,
+            'max_message_size': totals['max_bytes']
         }
 
     def get_client_statistics(self) -> Dict[str, Any]:
@@ -163,35 +398,122 @@ class MessageAnalyzer:
 
     def get_security_statistics(self) -> Dict[str, Any]:
         """Get security-related statistics."""
+        totals = self.totals
         return {
-            'total_connections': sum(info['connection_count'] for info in self.client_details.values()),
-            'total_errors': sum(info['error_count'] for info in self.client_details.values()),
-            'private_ip_connections': sum(1 for msg in self.messages if msg.get('is_private', False)),
-            'public_ip_connections': sum(1 for msg in self.messages if not msg.get('is_private', False)),
+            'total_connections': totals['connections'],
+            'total_errors': totals['errors'],
+            'private_ip_connections': totals['private'],
+            'public_ip_connections': totals['public'],
             'error_rate': round(
-                sum(info['error_count'] for info in self.client_details.values()) /
-                sum(info['connection_count'] for info in self.client_details.values()) * 100
-                if sum(info['connection_count'] for info in self.client_details.values()) > 0 else 0,
+                totals['errors'] / totals['connections'] * 100 if totals['connections'] > 0 else 0,
                 2
             )
         }
 
+    def _expire_messages(self, now: datetime):
+        cutoff = now - self.retention
+        while self.messages and self.messages[0].timestamp < cutoff:
+            self.messages.popleft()
+
+    def _message_dict(self, client_address: str, message: str, timestamp: datetime) -> Dict[str, Any]:
+        ip, port, is_private = self._parse_address(client_address)
+        return {
+            'client': client_address,
+            'ip': ip,
+            'port': port,
+            'is_private': is_private,
+            'message': message,
+            'timestamp': timestamp,
+            'length': len(message)
+        }
+
     def get_recent_messages(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get the most recent messages."""
-        return self.messages[-limit:]
+        if self.retention is not None:
+            self._expire_messages(datetime.now())
+        recent = list(islice(reversed(self.messages), limit))
+        recent.reverse()
+        return [self._message_dict(rec.client, rec.message, rec.timestamp) for rec in recent]
+
+    def get_message_history(self, limit: int = 100, offset: int = 0, start: datetime = None,
+                            end: datetime = None, client_address: str = None) -> List[Dict[str, Any]]:
+        """Get older messages from the database, newest first."""
+        return [self._message_dict(addr, msg, ts)
+                for addr, msg, ts in self.db.load_message_page(limit, offset, start, end, client_address)]
 
-    def mark_disconnected(self, client_address: str, timestamp=None):
+    def mark_disconnected(self, client_address: str, timestamp=None, save_to_db=True):
         """Mark a client as disconnected by updating last_seen to now."""
-        if client_address in self.client_details:
+        with self._lock:
+            if client_address not in self.client_details:
+                return False
             if timestamp is None:
                 timestamp = datetime.now()
             self.client_details[client_address]['last_seen'] = timestamp
-            self.db.save_connection_event(client_address, 'disconnect', timestamp)
+            if save_to_db:
+                self.db.save_connection_event(client_address, 'disconnect', timestamp)
+            self._changed('disconnect', lambda: {'client': client_address})
+        if save_to_db:
+            self._maybe_checkpoint()
+        return True
+
+    def ingest_events(self, events: List[Dict[str, Any]]) -> int:
+        """Apply a batch of server events and persist them in one transaction.
+
+        Each event is a dict with 'type' ('message', 'connect' or 'disconnect'),
+        'client_address', an ISO 'timestamp' and, for messages, 'message'.
+        Malformed events are skipped. Returns the number of events applied.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            applied = self._ingest_events_locked(events)
+        INGEST_SECONDS.observe(time.perf_counter() - start)
+        EVENTS_INGESTED.inc(applied)
+        self._maybe_checkpoint()
+        return applied
+
+    def _ingest_events_locked(self, events: List[Dict[str, Any]]) -> int:
+        messages = []
+        connection_events = []
+        for event in events:
+            # Check each event before it touches any state, so a bad one cannot stop the batch halfway
+            if not isinstance(event, dict):
+                continue
+            client_address = event.get('client_address')
+            if client_address is not None and not isinstance(client_address, str):
+                continue
+            event_type = event.get('type')
+            try:
+                timestamp = datetime.fromisoformat(event['timestamp'])
+            except (KeyError, TypeError, ValueError):
+                timestamp = datetime.now()
+            message = event.get('message')
+            if event_type == 'message' and client_address and message and isinstance(message, str):
+                self._add_message_internal(client_address, message, timestamp, save_to_db=False)
+                messages.append((client_address, message, timestamp))
+            elif event_type == 'connect':
+                self.record_connection(timestamp)
+                if client_address:
+                    connection_events.append((client_address, 'connect', timestamp))
+            elif event_type == 'disconnect' and client_address:
+                if self.mark_disconnected(client_address, timestamp, save_to_db=False):
+                    connection_events.append((client_address, 'disconnect', timestamp))
+        if messages or connection_events:
+            self.db.save_batch(messages, connection_events)
+        return len(messages) + len(connection_events)
 
-    def record_connection(self, timestamp: datetime):
-        self.connection_events_per_hour[timestamp.hour] += 1
-        # Save to DB (client_address is not tracked here, so skip or pass as needed)
-        # This method is called from web_interface, which can pass client_address if needed
+    def record_connection(self, timestamp: datetime, client_address: str = None):
+        """Count a connection; it is persisted only when the client address is known."""
+        with self._lock:
+            self.connection_events_per_hour[timestamp.hour] += 1
+            if client_address:
+                self.db.save_connection_event(client_address, 'connect', timestamp)
+            self._changed('connection', lambda: {
+                'client': client_address,
+                'hour': timestamp.hour,
+                'count': self.connection_events_per_hour[timestamp.hour],
+            })
+        if client_address:
+            self._maybe_checkpoint()
 
     def get_connection_stats_per_hour(self):
         hourly = [0] * 24
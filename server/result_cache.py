@@ -0,0 +1,44 @@
+from collections import defaultdict
+from threading import Lock
+
+
+class ResultCache:
+    """Serialized API results keyed by the analyzer version they were built from.
+
+    Only the newest entry per name is kept: once the analyzer changes, the
+    version moves on and older entries can never be requested again.
+    Concurrent misses may compute the same result twice, which is harmless.
+    """
+
+    def __init__(self, serialize):
+        self.serialize = serialize  # value -> str
+        self._entries = {}  # name -> (key, bytes)
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._lock = Lock()
+
+    def get(self, name, key, compute):
+        """Return the cached bytes for (name, key), computing them on a miss."""
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            with self._lock:
+                self._hits[name] += 1
+            return entry[1]
+        body = self.serialize(compute()).encode()
+        self._entries[name] = (key, body)
+        with self._lock:
+            self._misses[name] += 1
+        return body
+
+    def stats(self):
+        with self._lock:
+            names = sorted(set(self._hits) | set(self._misses))
+            per_name = {name: {'hits': self._hits[name], 'misses': self._misses[name]} for name in names}
+        hits = sum(s['hits'] for s in per_name.values())
+        misses = sum(s['misses'] for s in per_name.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0,
+            'entries': per_name,
+        }
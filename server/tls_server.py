@@ -4,10 +4,20 @@ import ssl
 import socket
 import sys
 import os
+import time
+import logging
 from threading import Thread, Lock
 from datetime import datetime
-import requests
-from web_interface import add_message
+import argparse
+from event_shipper import EventShipper
+from broadcaster import Broadcaster, SLOW_CONSUMER_POLICIES, SEND_QUEUE_SIZE
+from cert_reloader import CertReloader, RELOAD_INTERVAL
+from client_identity import IdentityCache, CLIENT_AUTH_MODES
+from log_config import setup_logging, LOG_LEVELS
+from metrics import REGISTRY, MetricsServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.framing import FrameReader, FrameError, encode_frame, DATA, PING, HEADER_SIZE
 
 # ANSI color codes
 GREEN = '\033[0;32m'
@@ -16,63 +26,205 @@ BLUE = '\033[0;34m'
 RED = '\033[0;31m'
 RESET = '\033[0m'
 
+SESSION_TICKETS = 2  # TLS 1.3 tickets issued per handshake; 0 disables resumption
+
+log = logging.getLogger('tls_server')
+CONNECTED = {'color': GREEN}
+DISCONNECTED = {'color': YELLOW}
+
+HANDSHAKE_SECONDS = REGISTRY.histogram('tls_handshake_seconds', 'Time from the ClientHello to an established connection')
+HANDSHAKE_FAILURES = REGISTRY.counter('tls_handshake_failures_total', 'Failed handshakes seen by the accept loop (thread mode)')
+CONNECTIONS = REGISTRY.counter('tls_connections_total', 'Clients that completed the handshake and were accepted')
+ACTIVE_CONNECTIONS = REGISTRY.gauge('tls_active_connections', 'Clients currently connected')
+BYTES_RECEIVED = REGISTRY.counter('tls_bytes_received_total', 'Frame bytes read from clients')
+MESSAGES_RECEIVED = REGISTRY.counter('tls_messages_received_total', 'Chat messages received from clients')
+RECV_SECONDS = REGISTRY.histogram('tls_message_seconds', 'Time from reading a chat message to queueing its broadcast and event')
+BROADCAST_SECONDS = REGISTRY.histogram('tls_broadcast_seconds', 'Time to queue one broadcast for every recipient')
+
 class TLSServer:
-    def __init__(self, host='0.0.0.0', port=8443):
+    def __init__(self, host='0.0.0.0', port=8443, slow_consumer='drop', send_queue_size=SEND_QUEUE_SIZE,
+                 reuse_port=False, session_tickets=SESSION_TICKETS, cert_reload_interval=RELOAD_INTERVAL,
+                 client_auth='none', metrics_port=0):
         self.host = host
         self.port = port
+        self.metrics_port = metrics_port  # serve /metrics on this port; 0 disables it
+        self.metrics_server = None
+        self.worker_id = 0
         self.cert_path = os.path.join("..", "certs", "server.crt")
         self.key_path = os.path.join("..", "certs", "server.key")
+        self.revoked_path = os.path.join("..", "certs", "revoked.txt")
+        self.client_ca_path = os.path.join("..", "certs", "ca.crt")  # CA that client certificates must chain to
+        self.client_auth = client_auth  # 'none', 'optional' or 'required'
+        self.identities = IdentityCache()
+        self.revoked_serials = None  # loaded on first use, then follows the file
+        self.rejected_revoked = 0
         self.clients = []
         self.clients_lock = Lock()
         self.running = True
+        self.session_tickets = session_tickets
+        self.ssl_context = None  # set before forking workers so they share one session ticket key
+        self.cert_reload_interval = cert_reload_interval  # 0 disables reloading
+        self.cert_reloader = None
+        self.reuse_port = reuse_port  # several worker processes share the port
+        self.bus = None  # BusClient to the other workers, set by run_workers
+        self.events = EventShipper()
+        self.broadcaster = self.create_broadcaster(slow_consumer, send_queue_size)
+        self.events.add_metrics('broadcast', self.broadcaster.metrics)
+        self.events.add_metrics('revocation', self.revocation_metrics)
+        self.events.add_metrics('client_identities', self.identities.metrics)
+        REGISTRY.counter('tls_bytes_sent_total', 'Frame bytes written to clients',
+                         function=lambda: self.broadcaster.stats['bytes_sent'])
+        if REGISTRY.enabled:
+            self.events.add_metrics('server_metrics', REGISTRY.snapshot)
+
+    def create_broadcaster(self, policy, max_queue):
+        return Broadcaster(policy=policy, max_queue=max_queue)
 
     def check_certificates(self):
         if not os.path.exists(self.cert_path) or not os.path.exists(self.key_path):
-            print(f"{RED}Error: Certificate or key file not found.{RESET}")
-            print(f"Expected: {self.cert_path} and {self.key_path}")
-            print("Run cert_generator.sh first to create the certificates.")
+            log.error("Error: Certificate or key file not found.")
+            log.info("Expected: %s and %s", self.cert_path, self.key_path)
+            log.info("Run cert_generator.sh first to create the certificates.")
+            return False
+        if self.client_auth != 'none' and not os.path.exists(self.client_ca_path):
+            log.error("Error: Client CA certificate not found: %s", self.client_ca_path)
+            log.info("Create the local CA with: python cert_generator.py --ca")
             return False
         return True
 
-    def handle_client(self, client_socket, address):
+    def create_ssl_context(self):
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certfile=self.cert_path, keyfile=self.key_path)
+        if self.client_auth == 'none':
+            context.verify_mode = ssl.CERT_NONE  # anonymous clients
+        else:
+            # optional: clients without a certificate stay anonymous; one that is presented must verify
+            context.verify_mode = ssl.CERT_REQUIRED if self.client_auth == 'required' else ssl.CERT_OPTIONAL
+            context.load_verify_locations(cafile=self.client_ca_path)
+        # Resumption: TLS 1.3 uses stateless tickets, TLS 1.2 tickets or the
+        # OpenSSL session-ID cache (20480 entries, 300 s; not tunable from Python)
+        if self.session_tickets:
+            context.num_tickets = self.session_tickets
+        else:
+            context.num_tickets = 0
+            context.options |= ssl.OP_NO_TICKET
+        return context
+
+    def get_ssl_context(self):
+        """The listening context; new handshakes switch to the latest certificate (see CertReloader)."""
+        if self.ssl_context is None:
+            paths = [self.cert_path, self.key_path]
+            if self.client_auth != 'none':
+                paths.append(self.client_ca_path)
+            self.cert_reloader = CertReloader(paths, self.create_ssl_context, self.cert_reload_interval)
+            self.ssl_context = self.cert_reloader.load()
+            self.ssl_context.sni_callback = self._timed_hello(self.ssl_context.sni_callback)
+            self.events.add_metrics('tls_sessions', self.ssl_context.session_stats)
+            self.events.add_metrics('cert_reload', self.cert_reloader.metrics)
+            # Load the revoked serials up front (and before forking workers), not in the first handshake
+            if self.client_auth != 'none':
+                self.load_revoked_serials()
+        return self.ssl_context
+
+    def load_revoked_serials(self):
+        # Imported here: common.revocation needs cryptography, which only client auth requires
+        from common.revocation import RevokedSerialSet
+        self.revoked_serials = RevokedSerialSet(self.revoked_path)
+
+    @staticmethod
+    def _timed_hello(select_context):
+        """Wrap the SNI callback to note when each ClientHello arrived, for tls_handshake_seconds."""
+        def on_client_hello(ssl_object, server_name, listener):
+            ssl_object.hello_at = time.perf_counter()
+            return select_context(ssl_object, server_name, listener)
+        return on_client_hello
+
+    def handshake_done(self, tls):
+        hello_at = getattr(tls, 'hello_at', None)
+        if hello_at is not None:
+            HANDSHAKE_SECONDS.observe(time.perf_counter() - hello_at)
+        CONNECTIONS.inc()
+        ACTIVE_CONNECTIONS.inc()
+
+    def start_metrics_server(self):
+        if not self.metrics_port or not REGISTRY.enabled:
+            return
+        port = self.metrics_port + self.worker_id  # one port per worker process
+        self.metrics_server = MetricsServer(REGISTRY, self.host, port)
+        try:
+            self.metrics_server.start()
+        except OSError as e:
+            self.metrics_server = None
+            log.warning("Could not serve metrics on port %d: %s", port, e)
+            return
+        log.info("Metrics at http://%s:%d/metrics", self.host, port)
+
+    def stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+
+    def is_revoked(self, tls):
+        """True if the peer presented a certificate whose serial number has been revoked."""
+        der = tls.getpeercert(binary_form=True)
+        if not der:
+            return False  # no client certificate
+        from common.revocation import serial_from_der
+        if self.revoked_serials is None:
+            self.load_revoked_serials()
+        if self.revoked_serials.is_revoked(serial_from_der(der)):
+            self.rejected_revoked += 1
+            return True
+        return False
+
+    def client_name(self, tls, address):
+        """Key for a client in logs and analytics: its certificate's identity if it has one, else ip:port."""
+        der = tls.getpeercert(binary_form=True) if self.client_auth != 'none' else None
+        if der:
+            return self.identities.lookup(der).name
+        return f"{address[0]}:{address[1]}"
+
+    def revocation_metrics(self):
+        return {'revoked_serials': len(self.revoked_serials) if self.revoked_serials is not None else None,
+                'rejected': self.rejected_revoked}
+
+    def handle_client(self, client_socket, address, client_name=None):
+        client_name = client_name or f"{address[0]}:{address[1]}"
         try:
-            print(f"\n{GREEN}[+] New client connected: {address[0]}:{address[1]}{RESET}")
+            log.info("[+] New client connected: %s", client_name, extra=CONNECTED)
             client_socket.settimeout(300)
 
+            reader = FrameReader(client_socket)
             while self.running:
                 try:
-                    data = client_socket.recv(1024)
-                    if not data:
+                    frame = reader.read_frame()
+                    if frame is None:
                         break
-                    decoded_message = data.decode().strip()
+                    received = time.perf_counter()
+                    frame_type, payload = frame
+                    BYTES_RECEIVED.inc(HEADER_SIZE + len(payload))
+                    if frame_type != DATA:
+                        continue  # keepalives and control frames carry no chat text
+                    decoded_message = str(payload, 'utf-8', 'replace').strip()
                     if decoded_message:
+                        MESSAGES_RECEIVED.inc()
                         timestamp = datetime.now().strftime("%H:%M:%S")
-                        message = f"\n[{timestamp}] {BLUE}Client {address[0]}:{address[1]}:{RESET} {decoded_message}"
-                        print(message)
+                        message = f"\n[{timestamp}] {BLUE}Client {client_name}:{RESET} {decoded_message}"
+                        log.info("Client %s: %s", client_name, decoded_message)
                         self.broadcast(message, sender_socket=client_socket)
-                        
-                        # Send message to web interface via HTTP POST
-                        client_address = f"{address[0]}:{address[1]}"
-                        try:
-                            requests.post(
-                                "http://localhost:5000/api/add-message",
-                                json={"client_address": client_address, "message": decoded_message},
-                                timeout=1
-                            )
-                        except Exception as e:
-                            print(f"{YELLOW}Could not update web interface: {e}{RESET}")
-                        
+                        self.events.emit('message', client_name, message=decoded_message)
+                        RECV_SECONDS.observe(time.perf_counter() - received)
+
                 except socket.timeout:
-                    try:
-                        client_socket.send(b"ping")
+                    if self.broadcaster.send(client_socket, encode_frame(PING)):
                         continue
-                    except:
-                        print(f"{YELLOW}[-] Client {address[0]}:{address[1]} timed out{RESET}")
-                        break
-                except (ssl.SSLError, socket.error) as e:
-                    print(f"{RED}[-] Error with client {address}: {e}{RESET}")
+                    log.warning("[-] Client %s timed out", client_name)
+                    break
+                except (ssl.SSLError, socket.error, FrameError) as e:
+                    log.error("[-] Error with client %s: %s", client_name, e)
                     break
         finally:
+            ACTIVE_CONNECTIONS.dec()
+            self.broadcaster.unregister(client_socket)
             with self.clients_lock:
                 if client_socket in self.clients:
                     self.clients.remove(client_socket)
@@ -80,91 +232,157 @@ class TLSServer:
                 client_socket.close()
             except:
                 pass
-            # Notify web interface about disconnection
-            client_address = f"{address[0]}:{address[1]}"
-            try:
-                requests.post(
-                    "http://localhost:5000/api/disconnect-client",
-                    json={"client_address": client_address},
-                    timeout=1
-                )
-            except Exception as e:
-                print(f"{YELLOW}Could not notify web interface of disconnect: {e}{RESET}")
-            print(f"{YELLOW}[-] Client disconnected: {address[0]}:{address[1]}{RESET}")
+            self.events.emit('disconnect', client_name)
+            log.info("[-] Client disconnected: %s", client_name, extra=DISCONNECTED)
 
     def broadcast(self, message, sender_socket=None):
-        with self.clients_lock:
-            for client in self.clients:
-                if client != sender_socket:
-                    try:
-                        client.send(message.encode())
-                    except:
-                        continue
+        """Encode the message once and queue it for every other client."""
+        start = time.perf_counter()
+        frame = encode_frame(DATA, message.encode())
+        self.broadcaster.publish(frame, exclude=sender_socket)
+        if self.bus is not None:
+            self.bus.publish(frame)
+        BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    def deliver_remote(self, frame):
+        """Queue a frame broadcast by another worker process for our clients."""
+        self.broadcaster.publish(frame)
 
     def run(self):
         if not self.check_certificates():
             return
 
+        self.events.start()
+        self.start_metrics_server()
         try:
-            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-            context.load_cert_chain(certfile=self.cert_path, keyfile=self.key_path)
-            context.verify_mode = ssl.CERT_NONE  # Disable client certificate verification for simplicity
+            context = self.get_ssl_context()
+            self.cert_reloader.start()
 
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
                 server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if self.reuse_port:
+                    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
                 server_socket.settimeout(60)
                 server_socket.bind((self.host, self.port))
                 server_socket.listen(5)
 
-                print(f"{GREEN}TLS Server running on {self.host}:{self.port}{RESET}")
-                print("Press Ctrl+C to stop the server")
+                log.info("TLS Server running on %s:%s", self.host, self.port, extra=CONNECTED)
+                log.info("Press Ctrl+C to stop the server")
 
                 while self.running:
-                    print("Waiting for a secure connection...")
+                    log.debug("Waiting for a secure connection...")
                     try:
                         client_sock, client_addr = server_socket.accept()
+                    except (socket.timeout, socket.error) as e:
+                        log.error("Connection error: %s", e)
+                        continue
+                    try:
                         secure_client = context.wrap_socket(client_sock, server_side=True)
+                    except (ssl.SSLError, socket.timeout, socket.error) as e:
+                        HANDSHAKE_FAILURES.inc()
+                        client_sock.close()
+                        log.warning("Handshake with %s:%s failed: %s", client_addr[0], client_addr[1], e)
+                        continue
+                    try:
+                        if self.is_revoked(secure_client):
+                            log.warning("Rejected revoked certificate from %s:%s", client_addr[0], client_addr[1])
+                            secure_client.close()
+                            continue
+                        client_name = self.client_name(secure_client, client_addr)
+                        self.handshake_done(secure_client)
 
                         with self.clients_lock:
                             self.clients.append(secure_client)
+                        self.broadcaster.register(secure_client, client_name)
 
-                        print(f"{GREEN}Secure connection established with {client_addr[0]}:{client_addr[1]}{RESET}")
-                        # Notify web interface about new connection
-                        try:
-                            resp = requests.post(
-                                "http://localhost:5000/api/add-connection",
-                                json={"timestamp": datetime.now().isoformat(), "client_address": f"{client_addr[0]}:{client_addr[1]}"},
-                                timeout=1
-                            )
-                            print(f"DEBUG: POST /api/add-connection status: {resp.status_code}, response: {resp.text}")
-                        except Exception as e:
-                            print(f"{YELLOW}Could not update connection stats: {e}{RESET}")
-                        client_thread = Thread(target=self.handle_client, args=(secure_client, client_addr))
+                        log.debug("Secure connection established with %s", client_name)
+                        self.events.emit('connect', client_name)
+                        client_thread = Thread(target=self.handle_client, args=(secure_client, client_addr, client_name))
                         client_thread.daemon = True
                         client_thread.start()
                     except (ssl.SSLError, socket.timeout, socket.error) as e:
-                        print(f"{RED}Connection error: {e}{RESET}")
+                        log.error("Connection error: %s", e)
                         continue
 
         except KeyboardInterrupt:
-            print(f"\n{YELLOW}Server shutting down...{RESET}")
+            log.info("Server shutting down...", extra=DISCONNECTED)
         except Exception as e:
-            print(f"{RED}Server error: {e}{RESET}")
+            log.error("Server error: %s", e)
         finally:
             self.running = False
+            self.stop_metrics_server()
+            if self.cert_reloader is not None:
+                self.cert_reloader.stop()
+            self.broadcaster.close()
             with self.clients_lock:
                 for client in self.clients:
                     try:
                         client.close()
                     except:
                         pass
-            print(f"{GREEN}Server shut down{RESET}")
+            self.events.stop()
+            log.info("Server shut down", extra=CONNECTED)
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        ip = sys.argv[1]
-    else:
+    parser = argparse.ArgumentParser(description="TLS chat server")
+    parser.add_argument("ip", nargs="?", help="IP to bind the server on")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread",
+                        help="thread: one thread per client, async: single asyncio event loop")
+    parser.add_argument("--slow-consumer", choices=SLOW_CONSUMER_POLICIES, default="drop",
+                        help="what to do when a client's send queue is full")
+    parser.add_argument("--send-queue", type=int, default=SEND_QUEUE_SIZE,
+                        help="frames queued per client before the slow-consumer policy applies")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes sharing the port with SO_REUSEPORT")
+    parser.add_argument("--cert", help="certificate file (default: ../certs/server.crt)")
+    parser.add_argument("--key", help="private key file (default: ../certs/server.key)")
+    parser.add_argument("--session-tickets", type=int, default=SESSION_TICKETS,
+                        help="TLS 1.3 session tickets sent per handshake (0 disables session resumption)")
+    parser.add_argument("--client-auth", choices=CLIENT_AUTH_MODES, default="none",
+                        help="mutual TLS: require (or accept) client certificates signed by --client-ca")
+    parser.add_argument("--client-ca", help="CA for client certificates (default: ../certs/ca.crt)")
+    parser.add_argument("--revoked", help="revoked serial list (default: ../certs/revoked.txt)")
+    parser.add_argument("--cert-reload", type=float, default=RELOAD_INTERVAL, metavar="SECONDS",
+                        help="how often to check the certificate and key for changes (0 disables reloading)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve Prometheus metrics at http://IP:PORT/metrics (worker N uses PORT+N)")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="info",
+                        help="info logs every connection and (rate-limited) message; warning only problems")
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    ip = args.ip
+    if not ip:
         ip = input("Enter IP to bind server on (e.g., 0.0.0.0 or 172.17.8.200): ").strip()
 
-    server = TLSServer(host=ip)
-    server.run()
\ No newline at end of file
+    if args.mode == "async":
+        from async_tls_server import AsyncTLSServer as server_class
+    else:
+        server_class = TLSServer
+
+    def make_server(reuse_port=False):
+        server = server_class(host=ip, port=args.port, slow_consumer=args.slow_consumer,
+                              send_queue_size=args.send_queue, reuse_port=reuse_port,
+                              session_tickets=args.session_tickets, cert_reload_interval=args.cert_reload,
+                              client_auth=args.client_auth, metrics_port=args.metrics_port)
+        if args.cert:
+            server.cert_path = args.cert
+        if args.key:
+            server.key_path = args.key
+        if args.revoked:
+            server.revoked_path = args.revoked
+        if args.client_ca:
+            server.client_ca_path = args.client_ca
+        return server
+
+    if args.workers > 1:
+        from workers import run_workers
+        server = make_server(reuse_port=True)
+        if server.check_certificates():
+            # Each worker gets a forked copy; creating the context first means
+            # a ticket issued by one worker can be resumed on any other.
+            server.get_ssl_context()
+            run_workers(args.workers, lambda: server)
+    else:
+        make_server().run()
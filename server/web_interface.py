@@ -1,16 +1,38 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response
 from message_analyzer import MessageAnalyzer
-from datetime import datetime
+from dashboard_events import DashboardEvents
+from result_cache import ResultCache
+from log_config import setup_logging
+from metrics import REGISTRY, CONTENT_TYPE
+from datetime import datetime, timedelta
 import json
+import logging
 import os
+import time
 import requests
 
-# ANSI color codes
-YELLOW = '\033[0;33m'
-RESET = '\033[0m'
+log = logging.getLogger('web_interface')
 
 app = Flask(__name__)
 analyzer = MessageAnalyzer()
+# Last metrics reported by each TLS server process (one per worker), keyed by pid:
+# the event shipper's queue under 'event_shipper', then broadcast queues, TLS sessions, ...
+server_metrics = {}
+SERVER_METRICS_TTL = 300  # seconds; workers that stopped reporting are dropped
+dashboard_events = DashboardEvents()
+analyzer.add_listener(dashboard_events.publish)
+
+# Client statistics depend on the current time (active clients, time connected),
+# so the dashboard ETag also rolls over every ETAG_TIME_BUCKET seconds.
+ETAG_TIME_BUCKET = 60
+result_cache = ResultCache(app.json.dumps)
+
+def _cached_json(name, compute, time_dependent=False):
+    """Serve compute() as JSON, reusing the serialized bytes until the analyzer changes."""
+    key = analyzer.version
+    if time_dependent:
+        key = (key, int(time.time() // ETAG_TIME_BUCKET))
+    return Response(result_cache.get(name, key, compute), mimetype='application/json')
 
 @app.route('/')
 def index():
@@ -18,24 +40,103 @@ def index():
 
 @app.route('/api/analysis')
 def get_analysis():
-    return jsonify(analyzer.get_analysis())
+    return _cached_json('analysis', analyzer.get_analysis)
 
-@app.route('/api/recent-messages')
-def get_recent_messages():
+def _recent_messages():
     messages = analyzer.get_recent_messages()
     # Convert datetime objects to strings for JSON serialization
     for msg in messages:
         if isinstance(msg['timestamp'], datetime):
             msg['timestamp'] = msg['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+    return messages
+
+@app.route('/api/recent-messages')
+def get_recent_messages():
+    return _cached_json('recent_messages', _recent_messages)
+
+@app.route('/api/dashboard')
+def get_dashboard():
+    """Everything the dashboard shows in one response; 304 when nothing changed."""
+    etag = f'{analyzer.version}-{int(time.time() // ETAG_TIME_BUCKET)}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    response = _cached_json('dashboard', lambda: {
+        'version': analyzer.version,
+        'analysis': analyzer.get_analysis(),
+        'client_stats': analyzer.get_client_statistics(),
+        'security_stats': analyzer.get_security_statistics(),
+        'connection_stats': analyzer.get_connection_stats_per_hour(),
+        'recent_messages': _recent_messages(),
+    }, time_dependent=True)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/stream')
+def stream_dashboard():
+    """Server-Sent Events: pushes 'message', 'connection' and 'disconnect' deltas."""
+    q = dashboard_events.subscribe()
+    return Response(dashboard_events.stream(q), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/messages')
+def get_message_history():
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    try:
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else None
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else None
+    except ValueError:
+        return jsonify({'status': 'error', 'reason': 'start/end must be ISO timestamps'}), 400
+    messages = analyzer.get_message_history(limit, offset, start, end, request.args.get('client'))
+    for msg in messages:
+        msg['timestamp'] = msg['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
     return jsonify(messages)
 
+def _parse_range(default_hours=24):
+    """Read ISO start/end query parameters; defaults to the last default_hours hours."""
+    end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.now()
+    start = (datetime.fromisoformat(request.args['start']) if 'start' in request.args
+             else end - timedelta(hours=default_hours))
+    return start, end
+
+@app.route('/api/rollups/messages')
+def get_message_rollups():
+    try:
+        start, end = _parse_range()
+        rows = analyzer.db.message_rollups(request.args.get('granularity', 'hour'), start, end,
+                                           request.args.get('client'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'reason': str(e)}), 400
+    return jsonify([{'bucket': bucket, 'messages': count, 'bytes': size} for bucket, count, size in rows])
+
+@app.route('/api/rollups/connections')
+def get_connection_rollups():
+    try:
+        start, end = _parse_range()
+        rows = analyzer.db.connection_rollups(request.args.get('granularity', 'hour'), start, end)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'reason': str(e)}), 400
+    return jsonify([{'bucket': bucket, 'event': event, 'count': count} for bucket, event, count in rows])
+
+@app.route('/api/rollups/clients')
+def get_client_rollups():
+    try:
+        start, end = _parse_range(default_hours=24 * 30)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'reason': str(e)}), 400
+    rows = analyzer.db.client_rollups(start, end)
+    return jsonify([{'client_address': client, 'messages': count, 'bytes': size} for client, count, size in rows])
+
 @app.route('/api/client-stats')
 def get_client_stats():
-    return jsonify(analyzer.get_client_statistics())
+    return _cached_json('client_stats', analyzer.get_client_statistics, time_dependent=True)
 
 @app.route('/api/security-stats')
 def get_security_stats():
-    return jsonify(analyzer.get_security_statistics())
+    return _cached_json('security_stats', analyzer.get_security_statistics)
 
 @app.route('/api/add-message', methods=['POST'])
 def api_add_message():
@@ -61,23 +162,63 @@ def api_add_connection():
     data = request.json
     timestamp = data.get('timestamp')
     client_address = data.get('client_address')
-    print(f"DEBUG: Received connection event at {timestamp} from {client_address}")
+    log.debug("Received connection event at %s from %s", timestamp, client_address)
     if timestamp:
-        analyzer.record_connection(datetime.fromisoformat(timestamp))
-        if client_address:
-            analyzer.db.save_connection_event(client_address, 'connect', datetime.fromisoformat(timestamp))
+        analyzer.record_connection(datetime.fromisoformat(timestamp), client_address)
         return jsonify({'status': 'ok'})
     return jsonify({'status': 'error', 'reason': 'Missing timestamp'}), 400
 
+@app.route('/api/events/batch', methods=['POST'])
+def api_events_batch():
+    data = request.get_json(silent=True)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list):
+        return jsonify({'status': 'error', 'reason': 'Missing events'}), 400
+    received_at = datetime.now().isoformat()
+    worker = server_metrics.setdefault(str(data.get('pid', 0)), {})
+    worker['last_seen'] = time.time()
+    for name, value in data.items():
+        if name != 'events' and isinstance(value, dict):
+            worker['event_shipper' if name == 'shipper' else name] = dict(value, received_at=received_at)
+    applied = analyzer.ingest_events(events)
+    return jsonify({'status': 'ok', 'received': len(events), 'applied': applied})
+
+def _server_metrics():
+    """The metrics of every TLS server process that reported within SERVER_METRICS_TTL, by pid."""
+    cutoff = time.time() - SERVER_METRICS_TTL
+    for pid in [pid for pid, worker in server_metrics.items() if worker['last_seen'] < cutoff]:
+        server_metrics.pop(pid, None)
+    return {pid: {name: value for name, value in worker.items() if name != 'last_seen'}
+            for pid, worker in list(server_metrics.items())}
+
+@app.route('/api/events/metrics')
+def get_event_metrics():
+    return jsonify({pid: worker.get('event_shipper', {}) for pid, worker in _server_metrics().items()})
+
+@app.route('/api/metrics')
+def get_metrics():
+    return jsonify({
+        'analyzer_version': analyzer.version,
+        'result_cache': result_cache.stats(),
+        'sse_subscribers': dashboard_events.subscriber_count,
+        'servers': _server_metrics(),
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Analyzer and database metrics of this process in the Prometheus text format."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/api/connection-stats')
 def get_connection_stats():
-    return jsonify(analyzer.get_connection_stats_per_hour())
+    return _cached_json('connection_stats', analyzer.get_connection_stats_per_hour)
 
 def add_message(client_address: str, message: str):
     """Add a message to the analyzer."""
     analyzer.add_message(client_address, message, datetime.now())
 
 if __name__ == '__main__':
+    setup_logging(os.environ.get('TLS_LOG_LEVEL', 'info'))
     # Ensure the templates directory exists
     os.makedirs('templates', exist_ok=True)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -88,6 +229,6 @@ try:
         json={"timestamp": datetime.now().isoformat()},
         timeout=1
     )
-    print(f"DEBUG: POST /api/add-connection status: {resp.status_code}, response: {resp.text}")
+    log.debug("POST /api/add-connection status: %s, response: %s", resp.status_code, resp.text)
 except Exception as e:
-    print(f"{YELLOW}Could not update connection stats: {e}{RESET}") 
\ No newline at end of file
+    log.warning("Could not update connection stats: %s", e)
\ No newline at end of file
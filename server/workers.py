@@ -0,0 +1,235 @@
+import logging
+import os
+import queue
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from threading import Thread, Lock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.framing import FrameReader, FrameError, encode_frame, DATA, HEADER_SIZE, MAX_FRAME_SIZE
+
+# ANSI color codes
+GREEN = '\033[0;32m'
+
+# A bus frame wraps one complete chat frame
+BUS_MAX_FRAME = MAX_FRAME_SIZE + HEADER_SIZE
+BUS_QUEUE_SIZE = 1024  # frames queued per bus connection before new ones are dropped
+_CLOSE = None  # sentinel that stops a writer
+
+log = logging.getLogger('workers')
+
+
+class BusWriter:
+    """Sends queued frames to one bus socket from its own thread.
+
+    A peer that reads slowly (a worker blocked delivering to its own slow
+    clients) only fills its own queue; `put` never blocks, it drops the
+    frame and returns False once the queue is full.
+    """
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.queue = queue.Queue(maxsize=BUS_QUEUE_SIZE)
+        self.dropped = 0
+        Thread(target=self._run, name=name, daemon=True).start()
+
+    def put(self, data):
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            if data is _CLOSE:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                return
+
+    def close(self):
+        try:
+            self.queue.put_nowait(_CLOSE)
+        except queue.Full:
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait(_CLOSE)
+
+
+class BroadcastBus:
+    """Relays broadcast frames between worker processes over a Unix socket.
+
+    Runs in the parent process. Every worker keeps one connection open; a
+    frame received from one worker is queued unchanged for all the others,
+    which then queue it for their own clients. Each worker has its own
+    BusWriter, so one that is slow to read does not hold up the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(64)
+        self.workers = {}  # socket -> BusWriter
+        self._lock = Lock()
+        self.relayed = 0
+
+    def start(self):
+        Thread(target=self._accept_loop, name="broadcast-bus", daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.workers[sock] = BusWriter(sock, "bus-writer")
+            Thread(target=self._relay, args=(sock,), daemon=True).start()
+
+    def _relay(self, sock):
+        reader = FrameReader(sock, max_frame=BUS_MAX_FRAME)
+        try:
+            while True:
+                frame = reader.read_frame()
+                if frame is None:
+                    break
+                data = encode_frame(frame[0], bytes(frame[1]))
+                with self._lock:
+                    targets = [writer for s, writer in self.workers.items() if s is not sock]
+                for writer in targets:
+                    if not writer.put(data):
+                        log.warning("A worker is not keeping up with the broadcast bus; dropping a broadcast for it")
+                self.relayed += 1
+        except (OSError, FrameError) as e:
+            log.error("Broadcast bus error: %s", e)
+        finally:
+            with self._lock:
+                writer = self.workers.pop(sock, None)
+            if writer is not None:
+                writer.close()
+            sock.close()
+
+    def close(self):
+        self.listener.close()
+        with self._lock:
+            workers = list(self.workers)
+        for sock in workers:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+class BusClient:
+    """A worker's connection to the BroadcastBus.
+
+    `publish` queues an encoded chat frame for the other workers without
+    blocking (it is called from the asyncio server's event loop too); frames
+    from them are handed to `deliver` on a background thread.
+    """
+
+    def __init__(self, path, deliver):
+        self.path = path
+        self.deliver = deliver
+        self.sock = None
+        self.writer = None
+
+    def connect(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+                break
+            except OSError:
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        self.sock = sock
+        self.writer = BusWriter(sock, "bus-client-writer")
+        Thread(target=self._run, name="bus-client", daemon=True).start()
+
+    def publish(self, frame):
+        if not self.writer.put(encode_frame(DATA, frame)):
+            log.warning("Could not forward broadcast to other workers: bus queue full")
+
+    def _run(self):
+        reader = FrameReader(self.sock, max_frame=BUS_MAX_FRAME)
+        try:
+            while True:
+                frame = reader.read_frame()
+                if frame is None:
+                    return
+                self.deliver(bytes(frame[1]))
+        except (OSError, FrameError):
+            return
+
+
+def _run_worker(index, make_server, bus_path):
+    # SIGTERM from the parent shuts the worker down like Ctrl+C does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    server = make_server()
+    server.worker_id = index
+    server.bus = BusClient(bus_path, server.deliver_remote)
+    server.bus.connect()
+    server.run()
+
+
+def run_workers(count, make_server):
+    """Fork `count` worker processes sharing the listening port via SO_REUSEPORT.
+
+    `make_server` is called in each worker and must return a server created
+    with reuse_port=True. The parent only runs the broadcast bus and waits
+    for the workers to exit.
+    """
+    bus_dir = tempfile.mkdtemp(prefix="tls-bus-")
+    bus = BroadcastBus(os.path.join(bus_dir, "bus.sock"))
+    children = []
+    try:
+        for index in range(count):
+            pid = os.fork()
+            if pid == 0:
+                bus.listener.close()
+                code = 0
+                try:
+                    _run_worker(index, make_server, bus.path)
+                except BaseException as e:
+                    log.error("Worker %d failed: %s", index, e)
+                    code = 1
+                finally:
+                    os._exit(code)
+            children.append(pid)
+
+        bus.start()
+        log.info("Started %d worker processes: %s", count, ', '.join(map(str, children)), extra={'color': GREEN})
+
+        def stop_workers(signum, frame):
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+        signal.signal(signal.SIGTERM, stop_workers)
+        remaining = set(children)
+        while remaining:
+            try:
+                pid, _ = os.wait()
+                remaining.discard(pid)
+            except KeyboardInterrupt:
+                continue  # the workers got the same SIGINT and are shutting down
+            except ChildProcessError:
+                break
+    finally:
+        bus.close()
+        shutil.rmtree(bus_dir, ignore_errors=True)
@@ -1,49 +1,264 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import atexit
+import io
+import multiprocessing
 import os
-import ssl
-import subprocess
+import sys
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.cert_engine import generate_certificate as issue_certificate, CertificateError, KEY_ALGORITHMS, DEFAULT_KEY_ALGORITHM, certificate_info
+from common.bulk_issue import parse_specs, issue_many, write_files, write_archive, NAME_RE
+from common.cert_index import CertIndex, REFRESH_INTERVAL
+from common.key_pool import KeyPool, POOL_SIZE
+from common.local_ca import LocalCA, ca_paths
+from common.revocation import Revocations, RevokedSerialSet, REVOKED_FILE, REASONS
+
 app = Flask(__name__)
 
+CERT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'certs')
+BULK_DIR = os.path.join(CERT_DIR, 'bulk')
+
+bulk_pool = None  # Process pool for bulk issuance, started on first use and reused
+
+# Ready keys for /generate, refilled in the background. KEY_POOL_SIZE=0 disables
+# the pool; KEY_POOL_DIR plus KEY_POOL_PASSPHRASE keep unused keys (encrypted)
+# across restarts.
+key_pool = KeyPool(
+    algorithms=[a for a in os.environ.get('KEY_POOL_ALGORITHMS', 'rsa2048,ecdsa-p256').split(',') if a],
+    size=int(os.environ.get('KEY_POOL_SIZE', POOL_SIZE)),
+    persist_dir=os.environ.get('KEY_POOL_DIR'),
+    passphrase=os.environ.get('KEY_POOL_PASSPHRASE'),
+)
+key_pool.start()
+atexit.register(key_pool.stop)
+
+# Inventory of every certificate under certs/ (SQLite, in certs/.cert_index.db).
+# Listings are served from the index; a background scan picks up files that
+# were changed outside the web app every CERT_INDEX_INTERVAL seconds.
+cert_index = CertIndex(CERT_DIR, interval=float(os.environ.get('CERT_INDEX_INTERVAL', REFRESH_INTERVAL)))
+cert_index.start()
+atexit.register(cert_index.close)
+
+local_ca = None  # Loaded (or created) on first use, then its key stays in memory
+revocations = None  # Revoked serials and the CRLs signed by the local CA, loaded on first use
+revoked_serials = RevokedSerialSet(os.path.join(CERT_DIR, REVOKED_FILE))  # for marking the listing
+
+def get_local_ca(create=True):
+    """The local CA; with create=False, None if certs/ca.crt and ca.key do not exist."""
+    global local_ca
+    if local_ca is None:
+        if not create and not all(os.path.exists(path) for path in ca_paths(CERT_DIR)):
+            return None
+        local_ca = LocalCA.load_or_create(CERT_DIR, passphrase=os.environ.get('CA_PASSPHRASE'))
+    return local_ca
+
+def get_revocations():
+    """The revocation store, or None while there is no local CA (revoking never creates one)."""
+    global revocations
+    if revocations is None:
+        ca = get_local_ca(create=False)
+        if ca is None:
+            return None
+        revocations = Revocations(ca, CERT_DIR)
+    return revocations
+
+def get_bulk_pool():
+    global bulk_pool
+    if bulk_pool is None:
+        # Forking this process would copy the key pool, index and Flask threads' locks into
+        # the workers; a fork server that has only imported the issuing code starts them clean
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['common.bulk_issue'])
+        else:
+            context = multiprocessing.get_context('spawn')
+        bulk_pool = ProcessPoolExecutor(mp_context=context)
+    return bulk_pool
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/generate/<int:days>')
 def generate_certificate(days):
+    algorithm = request.args.get('algorithm', DEFAULT_KEY_ALGORITHM)
+    issuer = request.args.get('issuer', os.environ.get('CERT_ISSUER', 'self'))
+    if algorithm not in KEY_ALGORITHMS:
+        return jsonify({'error': f'Unknown key algorithm: {algorithm}',
+                        'supported': sorted(KEY_ALGORITHMS)}), 400
+    if issuer not in ('self', 'ca'):
+        return jsonify({'error': "issuer must be 'self' or 'ca'"}), 400
+    try:
+        ca = get_local_ca() if issuer == 'ca' else None
+        info = issue_certificate(days=days, algorithm=algorithm, out_dir=CERT_DIR, key=key_pool.get(algorithm), ca=ca)
+        cert_index.update([info['files']['certificate']])
+        return jsonify({'message': 'Certificate generated successfully', 'algorithm': algorithm,
+                        'issuer': info['issuer'], 'not_after': info['not_after'],
+                        'serial_number': info['serial_number']})
+    except (CertificateError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def certificate_entry(row):
+    """Index row in the shape the certificate list in index.html expects."""
+    info = dict(row, validity={'not_before': row['not_before'], 'not_after': row['not_after']},
+                revoked=revoked_serials.is_revoked(int(row['serial_number'], 16)))
+    return {'filename': info.pop('path'), 'info': info}
+
+@app.route('/api/certificates')
+def list_certificates():
+    """One page of the certificate inventory.
+
+    Query: limit, offset, sort (not_after, not_before, path, ...), order (asc | desc),
+    expiring_within (days), expired (true | false), q (path, CN or serial)
+    """
+    args = request.args
+    expired = args.get('expired')
+    try:
+        total, rows = cert_index.query(
+            limit=args.get('limit', 50), offset=args.get('offset', 0), sort=args.get('sort', 'not_after'),
+            descending=args.get('order', 'asc') == 'desc',
+            expiring_within=args.get('expiring_within', type=float),
+            expired=None if expired is None else expired.lower() in ('1', 'true', 'yes'),
+            search=args.get('q'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'total': total, 'offset': int(args.get('offset', 0)), 'last_refresh': cert_index.last_refresh,
+                    'certificates': [certificate_entry(row) for row in rows]})
+
+@app.route('/api/certificates/generate', methods=['POST'])
+def api_generate_certificate():
+    """Body: {"validity_days": 365, "algorithm": "rsa2048", "name": "server", "issuer": "self" | "ca"}"""
+    data = request.get_json(silent=True) or {}
+    algorithm = data.get('algorithm', DEFAULT_KEY_ALGORITHM)
+    name = data.get('name', 'server')
+    issuer = data.get('issuer', os.environ.get('CERT_ISSUER', 'self'))
+    if algorithm not in KEY_ALGORITHMS:
+        return jsonify({'error': f'Unknown key algorithm: {algorithm}',
+                        'supported': sorted(KEY_ALGORITHMS)}), 400
+    if not isinstance(name, str) or not NAME_RE.match(name) or name == 'ca':
+        return jsonify({'error': f'Invalid certificate name: {name!r}'}), 400
+    if issuer not in ('self', 'ca'):
+        return jsonify({'error': "issuer must be 'self' or 'ca'"}), 400
+    try:
+        days = int(data.get('validity_days', 365))
+        ca = get_local_ca() if issuer == 'ca' else None
+        info = issue_certificate(days=days, algorithm=algorithm, out_dir=CERT_DIR, name=name,
+                                 key=key_pool.get(algorithm), ca=ca)
+    except (CertificateError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    cert_index.update([info['files']['certificate']])
+    return jsonify(certificate_entry(cert_index.get(os.path.basename(info['files']['certificate'])))), 201
+
+@app.route('/api/certificates/download/<path:filename>')
+def download_certificate(filename):
+    # Only files in the index can be downloaded, which rules out keys and paths outside certs/
+    if cert_index.get(filename) is None:
+        return jsonify({'error': f'Unknown certificate: {filename}'}), 404
+    return send_from_directory(CERT_DIR, filename, as_attachment=True)
+
+@app.route('/api/certificates/revoke/<path:filename>', methods=['POST'])
+def revoke_certificate(filename):
+    """Revoke an indexed certificate and publish the CRL. Optional body: {"reason": "keyCompromise"}"""
+    row = cert_index.get(filename)
+    if row is None:
+        return jsonify({'error': f'Unknown certificate: {filename}'}), 404
+    if row['is_ca']:
+        return jsonify({'error': 'The CA certificate cannot be revoked'}), 400
+    reason = (request.get_json(silent=True) or {}).get('reason')
+    if reason is not None and reason not in REASONS:
+        return jsonify({'error': f'Unknown revocation reason: {reason}', 'supported': sorted(REASONS)}), 400
+    try:
+        store = get_revocations()
+        # The CRLs are signed by the local CA, so they can only list certificates it issued
+        if store is None or row['issuer'] != store.ca.certificate.subject.rfc4514_string():
+            return jsonify({'error': f'{filename} was not issued by the local CA, so it cannot be revoked'}), 400
+        if not store.revoke(int(row['serial_number'], 16), reason, filename):
+            return jsonify({'error': f'{filename} is already revoked'}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    revoked_serials.refresh()
+    return jsonify({'revoked': filename, 'serial_number': row['serial_number'], 'crl': store.last_build})
+
+@app.route('/ca.crl')
+@app.route('/ca-delta.crl')
+def crl():
+    """The base CRL, or the delta CRL listing revocations since the base."""
+    delta = request.path == '/ca-delta.crl'
+    store = get_revocations()
+    try:
+        pem = store.crl_pem(delta) if store is not None else None
+    except FileNotFoundError:
+        pem = None
+    if pem is None:
+        return jsonify({'error': 'No certificates have been revoked yet'}), 404
+    return send_file(io.BytesIO(pem), mimetype='application/pkix-crl', download_name=request.path[1:])
+
+@app.route('/api/revocations')
+def revocation_metrics():
+    store = get_revocations()
+    if store is None:
+        return jsonify({'error': 'There is no local CA yet'}), 404
+    return jsonify(store.metrics())
+
+@app.route('/api/ca')
+def ca_info():
+    ca = get_local_ca()
+    return jsonify({'issued': ca.issued, **certificate_info(ca.certificate)})
+
+@app.route('/ca.crt')
+def ca_bundle():
+    """The CA certificate for clients to trust (certs/ca.crt)."""
+    return send_file(io.BytesIO(get_local_ca().bundle_pem), mimetype='application/x-pem-file',
+                     as_attachment=True, download_name='ca.crt')
+
+@app.route('/api/key-pool/metrics')
+def key_pool_metrics():
+    return jsonify(key_pool.metrics())
+
+@app.route('/api/certificates/bulk', methods=['POST'])
+def bulk_generate_certificates():
+    """Issue a batch of certificates; returns a zip archive or writes named files.
+
+    Body: {"certificates": [...], "days": 365, "algorithm": "ecdsa-p256", "output": "archive" | "files"}
+    """
+    data = request.get_json(silent=True) or {}
+    algorithm = data.get('algorithm', DEFAULT_KEY_ALGORITHM)
+    output = data.get('output', 'archive')
+    if algorithm not in KEY_ALGORITHMS:
+        return jsonify({'error': f'Unknown key algorithm: {algorithm}',
+                        'supported': sorted(KEY_ALGORITHMS)}), 400
+    if output not in ('archive', 'files'):
+        return jsonify({'error': "output must be 'archive' or 'files'"}), 400
+    try:
+        days = int(data.get('days', 365))
+        if days < 1:
+            raise CertificateError("Validity must be at least one day")
+        specs = parse_specs(data.get('certificates'))
+    except (CertificateError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        # Ensure directories exist
-        os.makedirs('certs', exist_ok=True)
-        
-        # Full paths
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'openssl.cnf')
-        cert_path = os.path.join(os.path.dirname(__file__), '..', 'certs')
-        
-        # Generate private key
-        key_cmd = f'openssl genrsa -out {os.path.join(cert_path, "server.key")} 2048'
-        process = subprocess.Popen(key_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        _, stderr = process.communicate()
-        
-        if process.returncode != 0:
-            return jsonify({'error': f'Key generation failed: {stderr.decode()}'}), 500
-            
-        # Generate certificate
-        cert_cmd = f'openssl req -x509 -new -nodes -key {os.path.join(cert_path, "server.key")} ' \
-                  f'-config {config_path} -sha256 -days {days} ' \
-                  f'-out {os.path.join(cert_path, "server.crt")}'
-        
-        process = subprocess.Popen(cert_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        _, stderr = process.communicate()
-        
-        if process.returncode != 0:
-            return jsonify({'error': f'Certificate generation failed: {stderr.decode()}'}), 500
-            
-        return jsonify({'message': 'Certificate generated successfully'})
-        
+        results = issue_many(specs, days=days, algorithm=algorithm, executor=get_bulk_pool())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    batch = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    if output == 'files':
+        manifest = write_files(results, os.path.join(BULK_DIR, batch))
+        cert_index.update([entry['files']['certificate'] for entry in manifest])
+        return jsonify({'batch': batch, 'count': len(manifest), 'certificates': manifest})
+    buffer = io.BytesIO()
+    write_archive(results, buffer)
+    buffer.seek(0)
+    return send_file(buffer, mimetype='application/zip', as_attachment=True,
+                     download_name=f'certificates-{batch}.zip')
+
 if __name__ == '__main__':
     app.run(port=5000)
\ No newline at end of file